@@ -27,19 +27,38 @@ import os, weakref
 from Lima import Core
 
 
+class MaxImageSizeCallbackGen(Core.HwMaxImageSizeCallbackGen):
+    def setMaxImageSizeCallbackActive(self, cb_active):
+        pass
+
+
 class DetInfoCtrlObj(Core.HwDetInfoCtrlObj):
     # Core.Debug.DEB_CLASS(Core.DebModCamera, "DetInfoCtrlObj")
     def __init__(self, camera):
         Core.HwDetInfoCtrlObj.__init__(self)
 
         self.__camera = weakref.ref(camera)
+        self.__mis_cb_gen = MaxImageSizeCallbackGen()
 
         # Variables
         self.__name = camera.fullName
         self.__id = camera.chip_id
-        self.__width = camera.width
-        self.__height = camera.height
+        self.__width = camera.image_width
+        self.__height = camera.image_height
+        self.__bpp = camera.bpp
+
+        camera.registerImageChangedCallback(self.__imageChanged)
+
+    def __imageChanged(self):
+        # image size/type depends on camera settings (MPX3 counter output,
+        # energy map)
+        camera = self.__camera()
+        self.__width = camera.image_width
+        self.__height = camera.image_height
         self.__bpp = camera.bpp
+        self.__mis_cb_gen.maxImageSizeChanged(
+            self.getMaxImageSize(), self.getDefImageType()
+        )
 
     # @Core.Debug.DEB_MEMBER_FUNCT
     def getMaxImageSize(self):
@@ -51,12 +70,20 @@ class DetInfoCtrlObj(Core.HwDetInfoCtrlObj):
 
     # @Core.Debug.DEB_MEMBER_FUNCT
     def getDefImageType(self):
-        if self.__bpp == 16:
+        if self.__bpp == 1:
+            return Core.Bpp1
+        elif self.__bpp == 6:
+            # MPX3 low counter depths
+            return Core.Bpp6
+        elif self.__bpp == 16:
             return Core.Bpp16
         elif self.__bpp == 12:
             return Core.Bpp12
         elif self.__bpp == 24:
             return Core.Bpp24
+        elif self.__bpp == 32:
+            # ToT calibrated energy map
+            return Core.Bpp32F
         else:
             raise Core.Exception(Core.Hardware, Core.NotSupported)
 
@@ -81,15 +108,13 @@ class DetInfoCtrlObj(Core.HwDetInfoCtrlObj):
     def getDetectorModel(self):
         return f"{self.__name} - {self.__id}"
 
-    ##@brief image size won't change so no callback
     # @Core.Debug.DEB_MEMBER_FUNCT
     def registerMaxImageSizeCallback(self, cb):
-        pass
+        self.__mis_cb_gen.registerMaxImageSizeCallback(cb)
 
-    ##@brief image size won't change so no callback
     # @Core.Debug.DEB_MEMBER_FUNCT
     def unregisterMaxImageSizeCallback(self, cb):
-        pass
+        self.__mis_cb_gen.unregisterMaxImageSizeCallback(cb)
 
     # @Core.Debug.DEB_MEMBER_FUNCT
     def get_min_exposition_time(self):
@@ -23,25 +23,41 @@
 ############################################################################
 
 import weakref
+import threading
 
 from Lima import Core
 
 from .DetInfoCtrlObj import DetInfoCtrlObj
 from .SyncCtrlObj import SyncCtrlObj
-
-from .acquisition import Camera
+from .buffer_manager import BufferManager
+from .trace import tracer
 
 
 class Interface(Core.HwInterface):
     Core.DEB_CLASS(Core.DebModCamera, "Interface")
 
-    def __init__(self, config_file=None, device_id=""):
+    def __init__(
+        self, config_file=None, device_id="", isolated_sdk=False, replay_file=None
+    ):
         Core.HwInterface.__init__(self)
 
         self.__buffer = Core.SoftBufferCtrlObj()
-        self.__camera = Camera(config_file, device_id, self.__buffer)
+        self.__buffer_manager = BufferManager(self.__buffer)
+        # imported here, pypixet must not be loaded in this process
+        # when the SDK runs in a separate worker
+        if isolated_sdk:
+            if replay_file is not None:
+                raise ValueError("Replay is not supported with an isolated SDK")
+            from .remote import RemoteCamera
+
+            self.__camera = RemoteCamera(config_file, device_id, self.__buffer)
+        else:
+            from .acquisition import Camera
+
+            self.__camera = Camera(config_file, device_id, self.__buffer, replay_file)
         self.__detInfo = DetInfoCtrlObj(self.__camera)
         self.__syncObj = SyncCtrlObj(self.__camera, self.__detInfo)
+        self.__lock = threading.Lock()
         self.__acquisition_start_flag = False
 
     def __del__(self):
@@ -61,24 +77,41 @@ class Interface(Core.HwInterface):
 
     @Core.DEB_MEMBER_FUNCT
     def prepareAcq(self):
+        with tracer.span("Interface.prepareAcq", "lima"):
+            self.__prepareAcq()
+
+    @Core.DEB_MEMBER_FUNCT
+    def __prepareAcq(self):
+        if self.__buffer_manager.memory_budget:
+            # sized by BufferManager.setup() before CtControl.prepareAcq,
+            # the buffers are only written here
+            nb_buffers = self.__buffer_manager.prepareAcq()
+            deb.Trace(f"{nb_buffers} Lima buffers written")
         self.__camera.prepareAcq()
         self.__syncObj.prepareAcq()
         self.__image_number = 0
 
     @Core.DEB_MEMBER_FUNCT
     def startAcq(self):
-        self.__acquisition_start_flag = True
-        self.__camera.startAcq()
+        with self.__lock:
+            self.__acquisition_start_flag = True
+        with tracer.span("Interface.startAcq", "lima"):
+            self.__camera.startAcq()
         self.__image_number += 1
 
     @Core.DEB_MEMBER_FUNCT
     def stopAcq(self):
-        self.__camera.stopAcq()
-        self.__acquisition_start_flag = False
+        with tracer.span("Interface.stopAcq", "lima"):
+            self.__camera.stopAcq()
+        with self.__lock:
+            self.__acquisition_start_flag = False
 
     @Core.DEB_MEMBER_FUNCT
     def getStatus(self):
-        camserverStatus = self.__camera.getStatus()
+        with tracer.span("Interface.getStatus", "lima"):
+            camserverStatus, acquiredFrames = self.__camera.getState()
+        with self.__lock:
+            acquisition_started = self.__acquisition_start_flag
         status = Core.HwInterface.StatusType()
 
         if camserverStatus == self.__camera.ERROR:
@@ -91,9 +124,9 @@ class Interface(Core.HwInterface):
                 status.acq = Core.AcqRunning
             else:
                 status.det = Core.DetIdle
-                lastAcquiredFrame = self.__camera.acquiredFrames - 1
+                lastAcquiredFrame = acquiredFrames - 1
                 requestNbFrame = self.__syncObj.getNbFrames()
-                if not self.__acquisition_start_flag or (
+                if not acquisition_started or (
                     lastAcquiredFrame >= 0 and lastAcquiredFrame == (requestNbFrame - 1)
                 ):
                     status.acq = Core.AcqReady
@@ -111,10 +144,31 @@ class Interface(Core.HwInterface):
     def getNbHwAcquiredFrames(self):
         return self.getNbAcquiredFrames()
 
+    @Core.DEB_MEMBER_FUNCT
+    def getDroppedFrames(self):
+        # frames lost by the SDK, by the ingest path and refused by Lima
+        return (
+            self.__camera.getSdkDroppedFrames(),
+            self.__camera.getIngestDroppedFrames(),
+            self.__camera.getOverrunFrames(),
+        )
+
+    @Core.DEB_MEMBER_FUNCT
+    def waitForFrame(self, nb_frames, timeout=None):
+        return self.__camera.waitForFrame(nb_frames, timeout)
+
+    @Core.DEB_MEMBER_FUNCT
+    def waitForStatus(self, status, timeout=None):
+        return self.__camera.waitForStatus(status, timeout)
+
     @property
     def camera(self):
         return self.__camera
 
+    @property
+    def buffer_manager(self):
+        return self.__buffer_manager
+
 
 def main():
     hwint = Interface()
@@ -23,6 +23,8 @@ import weakref
 
 from Lima import Core
 
+from .trace import tracer
+
 
 class SyncCtrlObj(Core.HwSyncCtrlObj):
     # Core.Debug.DEB_CLASS(Core.DebModCamera, "SyncCtrlObj")
@@ -112,6 +114,7 @@ class SyncCtrlObj(Core.HwSyncCtrlObj):
         )
 
     def prepareAcq(self):
+        tracer.instant("SyncCtrlObj.prepareAcq", "lima")
         cam = self.__camera()
         exposure = self.__exposure
         exposure_period = exposure + self.__latency
@@ -22,7 +22,11 @@
 # along with this program; if not, see <http://www.gnu.org/licenses/>.
 ############################################################################
 
-import pypixet
+try:
+    import pypixet
+except ImportError:
+    # offline, only the replay device can be used (tests, soak)
+    from .replay import ReplaySdk as pypixet
 import time, os, glob
 import threading
 import numpy
@@ -30,6 +34,17 @@ import weakref
 import enum
 import glob
 
+from .statistics import AcqStatistics
+from .threshold_scan import ThresholdScan
+from .tot_calibration import TotCalibration
+from .recorder import FrameRecorder
+from .replay import ReplayDevice
+from .trace import tracer
+from .time_slicer import TimeSlicer
+from .tiles import TileProcessor, chip_tiles, cast, subtract
+from .buffer_manager import frame_buffer
+from .refresh import RefreshScheduler
+
 try:
     from Lima import Core
 except:
@@ -51,15 +66,16 @@ class acqThread(threading.Thread):
             buffer_mgr = self.advacam.buffer_ctrl.getBuffer()
             buffer_mgr.setStartTimestamp(Core.Timestamp.now())
 
-        rc = self.advacam.detector.doAdvancedAcquisition(
-            self.advacam.acq_nb_frames,
-            self.advacam.acq_expo_time,
-            pypixet.pixet.PX_ACQTYPE_FRAMES,
-            self.advacam.trigger_mode,
-            pypixet.pixet.PX_FTYPE_AUTODETECT,
-            0,
-            "",
-        )
+        with tracer.span("doAdvancedAcquisition", "sdk"):
+            rc = self.advacam.detector.doAdvancedAcquisition(
+                self.advacam.acq_nb_frames,
+                self.advacam.acq_expo_time,
+                pypixet.pixet.PX_ACQTYPE_FRAMES,
+                self.advacam.trigger_mode,
+                pypixet.pixet.PX_FTYPE_AUTODETECT,
+                0,
+                "",
+            )
         deb.Trace(f"acq thread #{rc}: stop the Acq.")
 
         self.advacam._stopAcq()
@@ -67,6 +83,68 @@ class acqThread(threading.Thread):
         deb.Trace(f"Acq thread #{rc} finished")
 
 
+class acqWorker(acqThread):
+    Core.DEB_CLASS(Core.DebModCamera, "Advacam.Camera.acqWorker")
+
+    # scan mode: one persistent thread runs the sequences one after the
+    # other instead of a new acqThread per sequence
+    def __init__(self, advacam):
+        acqThread.__init__(self, advacam)
+        self.daemon = True
+        self.__cond = threading.Condition()
+        self.__pending = False
+        # sequences submitted and done: the end of one sequence must not
+        # mark the next one (already submitted) as done
+        self.__submitted = 0
+        self.__done = 0
+        self.__quit = False
+
+    def submit(self):
+        with self.__cond:
+            self.__pending = True
+            self.__submitted += 1
+            self.__cond.notify_all()
+
+    def waitStarted(self, timeout=5.0):
+        # the sequence is handed over to the SDK
+        with self.__cond:
+            if not self.__cond.wait_for(lambda: not self.__pending, timeout):
+                raise RuntimeError(f"Scan sequence not started after {timeout} s")
+
+    def waitIdle(self, timeout=None):
+        with self.__cond:
+            return self.__cond.wait_for(
+                lambda: self.__done >= self.__submitted, timeout
+            )
+
+    def stop(self):
+        with self.__cond:
+            self.__quit = True
+            self.__cond.notify_all()
+        self.join()
+
+    @Core.DEB_MEMBER_FUNCT
+    def run(self):
+        while True:
+            with self.__cond:
+                self.__cond.wait_for(lambda: self.__pending or self.__quit)
+                if self.__quit:
+                    return
+                self.__pending = False
+                job = self.__submitted
+                self.__cond.notify_all()
+            try:
+                acqThread.run(self)
+            except Exception as e:
+                # the worker stays up for the next sequences
+                deb.Error(f"Scan sequence failed: {e}")
+                self.advacam._acqFailed()
+            finally:
+                with self.__cond:
+                    self.__done = job
+                    self.__cond.notify_all()
+
+
 # Enum
 MODEL_TYPE = enum.Enum("MODEL_TYPE", ["UNKNOWN", "MPX3", "TPX3", "TPX_MPX"])
 
@@ -117,7 +195,20 @@ class Camera:
         PX_MPX3_GAIN_BROAD: "Broad",
     }
 
+    COUNTER_OUTPUTS = ("counter0", "counter1", "both", "window")
+
+    # batch mode histogram: batches of 1 .. MAX_BATCH_BIN - 1 frames, the
+    # last bin counts the larger ones
+    MAX_BATCH_BIN = 64
+
+    # on frames lost by the SDK: stop in ERROR, publish blank frames in
+    # place of the lost ones, or publish the next frames renumbered
+    GAP_POLICIES = ("abort", "blank", "continue")
+
+    # counterDepth() index: bits, the low depths read out faster
     MPX3_COUNTER_DEPTH_MODES = {
+        0: 1,
+        1: 6,
         2: 12,
         3: 24,
     }
@@ -154,8 +245,8 @@ class Camera:
     }
 
     @Core.DEB_MEMBER_FUNCT
-    def __init__(self, config_file=None, device_id="", buffer_ctrl=None):
-        if config_file is None:  # take the factory configuration
+    def __init__(self, config_file=None, device_id="", buffer_ctrl=None, replay_file=None):
+        if config_file is None and replay_file is None:  # take the factory configuration
             xml_file_path = glob.glob("/opt/pixet/factory/*.xml")
             nb_config_file = len(xml_file_path)
             if nb_config_file == 1:
@@ -163,27 +254,11 @@ class Camera:
             else:
                 raise RuntimeError("You should define a configuration file")
 
-        # below example code copied from pixetacq_server.py provided by ID20
-        # (https://confluence.esrf.fr/pages/viewpage.action?spaceKey=ID20WK&title=MiniPIX)
-
-        alldevices = pypixet.pixet.devices()  # get all devices (including motors, ...)
-        print(f"Found {len(alldevices)} devices:")
-        for dev in range(len(alldevices)):
-            print(f" - device num. {dev} = {alldevices[dev].fullName()}")
-
-        if not len(alldevices):
-            raise RuntimeError("No device found")
-
-        self.detector = None
-        if device_id:
-            for device in alldevices:
-                if device.deviceID() == device_id.upper():
-                    self.detector = device
-            if not self.detector:
-                raise RuntimeError(f"Device with ID {device_id} is not available")
+        if replay_file is not None:
+            # offline: frames of a FrameRecorder file instead of the detector
+            self.detector = ReplayDevice(replay_file, self.INTERNAL_TRIG_MULTI)
         else:
-            # if no device_id provided use the first (single) one !!
-            self.detector = alldevices[0]
+            self.detector = self.__findDevice(device_id)
 
         px_type = self.detector.deviceType()
         px_model_str = self.detector.fullName().split()[0].lower()
@@ -214,6 +289,9 @@ class Camera:
             self.detector.pixCfg().setModeAll(self.PX_TPX_MPX)
             self.OPERATION_MODES = self.TPX_MPX_OPERATION_MODES
             self.model = MODEL_TYPE.TPX_MPX
+        if replay_file is not None and self.model is not MODEL_TYPE.TPX_MPX:
+            # back to the recorded operation mode
+            self.detector.setOperationMode(self.detector.recorded_operation_mode)
 
         detector = self.detector
         print("DETECTOR INFO")
@@ -264,9 +342,44 @@ class Camera:
 
         self.__nb_frames = 1
         self.__expo_time = 1.0
+        # __status and __acquired_frames are updated by the SDK callback,
+        # the acquisition thread and the control calls: all the changes are
+        # made under __cond and notify the waiters
+        self.__cond = threading.Condition()
         self.__acquired_frames = 0
         self.__status = self.READY
+        self.__aborting = False
         self.acqthread = None
+        self.__buffer_mgr = None
+        self.__frame_listeners = ()
+        self.__statistics = AcqStatistics()
+        self.__threshold_scan = None
+        self.__image_changed_callbacks = ()
+        self.__counter_output = "counter0"
+        self.__counter_scratch = None
+        self.__tot_calibration = None
+        self.__energy_map = False
+        self.__recorder = None
+        self.__time_slicer = None
+        self.__tiles = TileProcessor(1)
+        self.__chip_tiles = {}
+        self.__image_dtype = numpy.int16
+        self.__depth_fps = {}
+        self.__refresh = None
+        self.__scan_mode = False
+        self.__worker = None
+        self.__registered_callback = None
+        self.__sent_settings = {}
+        self.__batch_mode = False
+        self.__event_callback = self.callback
+        self.__drain_thread = None
+        self.__drain_stop = False
+        self.__sdk_count = 0
+        self.__drained = 0
+        self.__batch_histogram = numpy.zeros(self.MAX_BATCH_BIN + 1, dtype=numpy.int64)
+        self.__gap_policy = "continue"
+        self.__published_frames = 0
+        self.__blank = None
 
         self.__trigger_mode = self.INTERNAL_TRIG
         self.__supported_trigger_mode = [self.INTERNAL_TRIG, self.INTERNAL_TRIG_MULTI]
@@ -291,6 +404,30 @@ class Camera:
         else:
             self.__buffer_ctrl = None
 
+    def __findDevice(self, device_id):
+        # below example code copied from pixetacq_server.py provided by ID20
+        # (https://confluence.esrf.fr/pages/viewpage.action?spaceKey=ID20WK&title=MiniPIX)
+
+        alldevices = pypixet.pixet.devices()  # get all devices (including motors, ...)
+        print(f"Found {len(alldevices)} devices:")
+        for dev in range(len(alldevices)):
+            print(f" - device num. {dev} = {alldevices[dev].fullName()}")
+
+        if not len(alldevices):
+            raise RuntimeError("No device found")
+
+        detector = None
+        if device_id:
+            for device in alldevices:
+                if device.deviceID() == device_id.upper():
+                    detector = device
+            if not detector:
+                raise RuntimeError(f"Device with ID {device_id} is not available")
+        else:
+            # if no device_id provided use the first (single) one !!
+            detector = alldevices[0]
+        return detector
+
     def hard_reset(self):
         pass
 
@@ -299,58 +436,452 @@ class Camera:
 
     @Core.DEB_MEMBER_FUNCT
     def quit(self):
+        if self.__worker is not None:
+            self.__worker.stop()
+        if self.__refresh is not None:
+            self.__refresh.close()
+        self.__tiles.close()
         pypixet.exit()
 
     @Core.DEB_MEMBER_FUNCT
     def callback(self, value):
         deb.Trace("Callback " + str(value))
+        if self.__aborting:
+            # stopped on a gap, the frames still coming are dropped
+            return
+        t0 = time.perf_counter()
         frame = self.detector.lastAcqFrameRefInc()
+        recorder = self.__recorder
+        if recorder is not None:
+            try:
+                with tracer.span("record", "recorder"):
+                    recorder.write(value, frame)
+            except Exception as e:
+                deb.Error(f"Frame {value - 1} recording failed: {e}")
+        if self.__time_slicer is not None:
+            self.__sliceFrame(frame)
+        # the SDK event value is the number of frames acquired so far, a
+        # jump by more than one means frames lost before reaching us
+        sdk_frame_id = value - 1
+        lost = max(0, sdk_frame_id - self.__acquired_frames)
+        policy = self.__gap_policy
+        if lost:
+            deb.Error(f"{lost} frame(s) lost by the SDK before frame {sdk_frame_id}")
+            if policy == "abort":
+                frame.destroy()
+                self.__statistics.newFrame(time.perf_counter() - t0, lost)
+                tracer.complete("callback", "sdk", t0, time.perf_counter())
+                self.__startAbortOnGap()
+                return
+
+        data = None
+        converted = True
+        try:
+            if self.__buffer_mgr or self.__frame_listeners:
+                with tracer.span("frameData", "convert"):
+                    data = self._frameData(frame)
+        except Exception as e:
+            deb.Error(f"Frame {sdk_frame_id} conversion failed: {e}")
+            self.__statistics.addIngestDropped(1)
+            converted = False
+        finally:
+            frame.destroy()
+
+        timestamp = time.time()
+        if policy == "continue":
+            # consecutive numbering, the gaps are only counted
+            if converted:
+                self.__publish(self.__published_frames, data, timestamp)
+        else:
+            # blank frames keep the Lima frame numbers on the SDK ones
+            nb_blanks = lost if converted else lost + 1
+            first_id = sdk_frame_id - lost
+            for frame_id in range(first_id, first_id + nb_blanks):
+                self.__publish(frame_id, self.__blankFrame(), timestamp)
+            if converted:
+                self.__publish(sdk_frame_id, data, timestamp)
+
+        with self.__cond:
+            if self.__acquired_frames != value:
+                self.__acquired_frames = value
+
+            if self.trigger_mode == self.INTERNAL_TRIG_MULTI:
+                self.__status = self.READY
+            self.__cond.notify_all()
+
+        t1 = time.perf_counter()
+        self.__statistics.newFrame(t1 - t0, lost)
+        tracer.complete("callback", "sdk", t0, t1)
+
+    def __batchCallback(self, value):
+        # batch mode: the SDK event only wakes the drain thread up
+        with self.__cond:
+            if value > self.__sdk_count:
+                self.__sdk_count = value
+            self.__cond.notify_all()
 
-        # data is a python list
-        if self.__buffer_mgr:
-            frame_dim = self.__buffer_mgr.getFrameDim()
-            frame_size = frame_dim.getMemSize()
-            frame_id = self.__acquired_frames
+    @Core.DEB_MEMBER_FUNCT
+    def __drainFrames(self):
+        while True:
+            with self.__cond:
+                self.__cond.wait_for(
+                    lambda: self.__sdk_count > self.__drained or self.__drain_stop
+                )
+                count = self.__sdk_count
+            if count > self.__drained:
+                try:
+                    self.__drainBatch(count)
+                except Exception as e:
+                    deb.Error(f"Frames {self.__drained}-{count - 1} drain failed: {e}")
+                    self.__statistics.addIngestDropped(count - self.__drained)
+                    self.__drained = count
+            elif self.__drain_stop:
+                break
 
-            # for the time being only event+itot mode supported and
-            # event subframe is #1 with type int16 (signed)
-            if self.model is MODEL_TYPE.TPX3:
-                r_data = frame.subFrames()[1].data()
-                name = frame.subFrames()[0].frameName()
-                ftype = frame.subFrames()[0].frameType()
-                deb.Trace(f"subframe 0 name {name} and type {ftype}")
-                name = frame.subFrames()[1].frameName()
-                ftype = frame.subFrames()[1].frameType()
-                deb.Trace(f"subFrame 1 name {name} and type {ftype}")
-            else:  # MPX3
-                r_data = frame.data()
-            # reshape data
-            data = numpy.array(r_data, dtype=numpy.int16)
-            data = data.reshape(self.width, self.height)
-
-            self.__buffer_mgr.copy_data(frame_id, data)
+    @Core.DEB_MEMBER_FUNCT
+    def __drainBatch(self, count):
+        # all the frames completed by the SDK since the last wake-up,
+        # converted as one stack and published to Lima in one pass
+        if self.__aborting:
+            self.__drained = count
+            return
+        t0 = time.perf_counter()
+        first = self.__drained
+        nb_frames = count - first
+        frames = []
+        try:
+            for i in range(first, count):
+                frames.append(self.detector.acqFrameRefInc(i))
+            recorder = self.__recorder
+            if recorder is not None:
+                try:
+                    with tracer.span("record", "recorder"):
+                        for i, frame in enumerate(frames):
+                            if frame is not None:
+                                recorder.write(first + i + 1, frame)
+                except Exception as e:
+                    deb.Error(f"Frames {first}-{count - 1} recording failed: {e}")
+
+            received = [i for i, frame in enumerate(frames) if frame is not None]
+            nb_received = len(received)
+            if self.__time_slicer is not None:
+                for i in received:
+                    self.__sliceFrame(frames[i])
+            lost = nb_frames - nb_received
+            datas = {}
+            try:
+                if received and (self.__buffer_mgr or self.__frame_listeners):
+                    with tracer.span("frameData", "convert"):
+                        datas = self.__batchData([frames[i] for i in received])
+                    datas = dict(zip(received, datas))
+            except Exception as e:
+                deb.Error(f"Frames {first}-{count - 1} conversion failed: {e}")
+                self.__statistics.addIngestDropped(len(received))
+                received = []
+        finally:
+            # whatever failed, the SDK frame references are released
+            for frame in frames:
+                if frame is not None:
+                    frame.destroy()
+
+        if lost:
+            deb.Error(f"{lost} frame(s) lost by the SDK in frames {first}-{count - 1}")
+            if self.__gap_policy == "abort":
+                self.__drained = count
+                self.__startAbortOnGap()
+                return
+
+        timestamp = time.time()
+        received = set(received)
+        for i in range(nb_frames):
+            if i in received:
+                data = datas.get(i)
+            elif self.__gap_policy == "blank":
+                data = self.__blankFrame()
+            else:
+                continue
+            if self.__gap_policy == "continue":
+                frame_id = self.__published_frames
+            else:
+                frame_id = first + i
+            self.__publish(frame_id, data, timestamp)
+
+        self.__drained = count
+        with self.__cond:
+            if self.__acquired_frames < count:
+                self.__acquired_frames = count
+            if self.trigger_mode == self.INTERNAL_TRIG_MULTI:
+                self.__status = self.READY
+            self.__cond.notify_all()
+
+        t1 = time.perf_counter()
+        self.__batch_histogram[min(nb_frames, self.MAX_BATCH_BIN)] += 1
+        self.__statistics.addSdkDropped(lost)
+        for i in range(nb_received):
+            self.__statistics.newFrame(t1 - t0)
+        tracer.complete(f"drain {nb_frames}", "sdk", t0, t1)
+
+    def __batchData(self, frames):
+        if self.__energy_map or self.__counter_output != "counter0":
+            return [self._frameData(frame) for frame in frames]
+        # one conversion for the whole batch
+        stack = numpy.array(
+            [self._rawData(frame) for frame in frames], dtype=self.__image_dtype
+        )
+        return stack.reshape(len(frames), self.width, self.height)
+
+    @Core.DEB_MEMBER_FUNCT
+    def __publish(self, frame_id, data, timestamp):
+        if data is not None and self.__blank is None:
+            self.__blank = numpy.zeros_like(data)
+        self.__published_frames = frame_id + 1
+        buffer_mgr = self.__buffer_mgr
+        if buffer_mgr:
+            with tracer.span("copy_data", "lima"):
+                self.__copyData(buffer_mgr, frame_id, data)
 
             frame_info = Core.HwFrameInfoType()
             frame_info.acq_frame_nb = frame_id
             frame_info.frame_timestamp = Core.Timestamp.now()
 
-            # raise the new frame !
-            self.__buffer_mgr.newFrameReady(frame_info)
+            # raise the new frame ! Lima refuses it on buffer overrun
+            with tracer.span("newFrameReady", "lima"):
+                ready = buffer_mgr.newFrameReady(frame_info)
+            if not ready:
+                deb.Error(f"Frame {frame_id} refused by Lima (buffer overrun)")
+                self.__statistics.addOverrun(1)
+
+        for listener in self.__frame_listeners:
+            try:
+                with tracer.span(type(listener).__name__, "listener"):
+                    listener.newFrame(frame_id, data, timestamp)
+            except Exception as e:
+                deb.Error(f"Frame listener {listener} failed: {e}")
+
+    def __copyData(self, buffer_mgr, frame_id, data):
+        # per chip tile, straight into the Lima buffer
+        buffer = None
+        if self.__tiles.nb_threads > 1:
+            buffer = frame_buffer(buffer_mgr, frame_id, data.dtype, data.size)
+        if buffer is None:
+            buffer_mgr.copy_data(frame_id, data)
+            return
+        shape = (data.size // self.width, self.width)
+        self.__tiles.run(
+            self.__chipTiles(shape), cast, buffer.reshape(shape), data.reshape(shape)
+        )
 
-        frame.destroy()
+    def __chipTiles(self, shape):
+        # (rows, width) physical layout, the counter "both" output stacks
+        # two images
+        tiles = self.__chip_tiles.get(shape)
+        if tiles is None:
+            nb_chips = self.nb_chips * max(shape[0] // self.height, 1)
+            tiles = self.__chip_tiles[shape] = chip_tiles(shape, nb_chips)
+        return tiles
+
+    def __blankFrame(self):
+        if self.__blank is None:
+            return numpy.zeros(
+                (self.image_width, self.image_height), dtype=self.__image_dtype
+            )
+        return self.__blank
 
-        if self.__acquired_frames != value:
-            self.__acquired_frames = value
+    def __startAbortOnGap(self):
+        # only the first gap stops the acquisition
+        with self.__cond:
+            if self.__aborting:
+                return
+            self.__aborting = True
+        threading.Thread(target=self.__abortOnGap, daemon=True).start()
 
-        if self.trigger_mode == self.INTERNAL_TRIG_MULTI:
-            self.__status = self.READY
+    @Core.DEB_MEMBER_FUNCT
+    def _acqFailed(self):
+        # the SDK sequence raised: end the acquisition in ERROR
+        try:
+            self._stopAcq(status=self.ERROR)
+        except Exception as e:
+            deb.Error(f"Acquisition stop failed: {e}")
+            with self.__cond:
+                self.__prepared = False
+                self.__status = self.ERROR
+                self.__cond.notify_all()
+
+    def __abortOnGap(self):
+        # not from the SDK callback thread, abortOperation waits for it
+        self._stopAcq(abort=True, status=self.ERROR)
+
+    @Core.DEB_MEMBER_FUNCT
+    def _rawData(self, frame):
+        # data is a python list
+        # for the time being only event+itot mode supported and
+        # event subframe is #1 with type int16 (signed)
+        if self.model is MODEL_TYPE.TPX3:
+            r_data = frame.subFrames()[1].data()
+            name = frame.subFrames()[0].frameName()
+            ftype = frame.subFrames()[0].frameType()
+            deb.Trace(f"subframe 0 name {name} and type {ftype}")
+            name = frame.subFrames()[1].frameName()
+            ftype = frame.subFrames()[1].frameType()
+            deb.Trace(f"subFrame 1 name {name} and type {ftype}")
+        else:  # MPX3
+            r_data = frame.data()
+        return r_data
+
+    @Core.DEB_MEMBER_FUNCT
+    def _frameData(self, frame):
+        if self.__energy_map:
+            return self.__energyData(frame)
+        if self.model is MODEL_TYPE.MPX3 and self.__counter_output != "counter0":
+            return self.__countersData(frame)
+        data = numpy.array(self._rawData(frame), dtype=self.__image_dtype)
+        # reshape data
+        return data.reshape(self.width, self.height)
+
+    def __countersData(self, frame):
+        # MPX3 SPM_2ch/CSM: one subframe per counter, both from the same
+        # exposure, converted straight into the output array
+        sub_frames = frame.subFrames()
+        if len(sub_frames) < 2:
+            raise RuntimeError(
+                f"Single counter frame, {self.__counter_output} output "
+                "needs SPM_2ch or CSM operation mode"
+            )
+        width, height = self.width, self.height
+        output = self.__counter_output
+        dtype = self.__image_dtype
+        if output == "counter1":
+            data = numpy.array(sub_frames[1].data(), dtype=dtype)
+            return data.reshape(width, height)
+        if output == "both":
+            # counter 1 image below the counter 0 one
+            data = numpy.empty((2, width * height), dtype=dtype)
+            data[0] = sub_frames[0].data()
+            data[1] = sub_frames[1].data()
+            return data.reshape(2 * width, height)
+        # window: counts between threshold 0 and threshold 1
+        # the SDK lists are converted in one call each, only the numpy
+        # subtraction is split per chip tile
+        data = numpy.empty(width * height, dtype=dtype)
+        data[:] = sub_frames[0].data()
+        scratch = self.__counter_scratch
+        if scratch is None or scratch.size != data.size or scratch.dtype != dtype:
+            scratch = self.__counter_scratch = numpy.empty_like(data)
+        scratch[:] = sub_frames[1].data()
+        shape = (height, width)
+        self.__tiles.run(
+            self.__chipTiles(shape),
+            subtract,
+            data.reshape(shape),
+            data.reshape(shape),
+            scratch.reshape(shape),
+        )
+        return data.reshape(width, height)
+
+    def __subFrame(self, frame, name, index):
+        # TPX3 subframe by name, by index if the name is unknown
+        sub_frames = frame.subFrames()
+        for sub_frame in sub_frames:
+            if sub_frame.frameName() == name:
+                return sub_frame
+        if len(sub_frames) > index:
+            return sub_frames[index]
+        return frame
+
+    def __energyData(self, frame):
+        # TPX3 ToA+ToT/ToT: ToT subframe converted to keV (float32)
+        tot = numpy.array(self.__subFrame(frame, "ToT", 1).data(), dtype=numpy.int16)
+        calibration = self.__tot_calibration
+        data = calibration.toEnergy(
+            tot, processor=self.__tiles, tiles=self.__chipTiles(calibration.shape)
+        )
+        return data.reshape(self.width, self.height)
+
+    @Core.DEB_MEMBER_FUNCT
+    def __sliceFrame(self, frame):
+        # TPX3 ToA/ToA+ToT: hits accumulated in the time slices of their ToA
+        slicer = self.__time_slicer
+        try:
+            with tracer.span("timeSlices", "convert"):
+                toa = numpy.asarray(self.__subFrame(frame, "ToA", 0).data())
+                tot = None
+                if self.detector.operationMode() == self.PX_TPX3_OPM_TOATOT:
+                    tot = numpy.asarray(self.__subFrame(frame, "ToT", 1).data())
+                slicer.add(toa, tot)
+        except Exception as e:
+            deb.Error(f"Time slicing failed: {e}")
+
+    @Core.DEB_MEMBER_FUNCT
+    def registerImageChangedCallback(self, cb):
+        # cb() is called when the image size or type changes
+        if cb not in self.__image_changed_callbacks:
+            self.__image_changed_callbacks += (cb,)
+
+    @Core.DEB_MEMBER_FUNCT
+    def unregisterImageChangedCallback(self, cb):
+        self.__image_changed_callbacks = tuple(
+            c for c in self.__image_changed_callbacks if c != cb
+        )
+
+    def _imageChanged(self):
+        for cb in self.__image_changed_callbacks:
+            cb()
+
+    @Core.DEB_MEMBER_FUNCT
+    def registerFrameListener(self, listener):
+        # tuple replaced (never modified) so the callback thread can
+        # iterate on it without lock
+        if listener not in self.__frame_listeners:
+            self.__frame_listeners += (listener,)
+
+    @Core.DEB_MEMBER_FUNCT
+    def unregisterFrameListener(self, listener):
+        self.__frame_listeners = tuple(
+            l for l in self.__frame_listeners if l is not listener
+        )
 
     @Core.DEB_MEMBER_FUNCT
     def prepareAcq(self):
-        if not self.__prepared:
-            self.detector.registerEvent(
-                pypixet.pixet.PX_EVENT_ACQ_FINISHED, self.callback, self.callback
+        self.__checkNoThresholdScan()
+        if (
+            self.__counter_output != "counter0"
+            and self.detector.operationMode() == self.PX_MPX3_OPM_SPM_1CH
+        ):
+            raise RuntimeError(
+                f"{self.__counter_output} output needs SPM_2ch or CSM operation mode"
             )
+        if self.__time_slicer is not None and self.detector.operationMode() not in (
+            self.PX_TPX3_OPM_TOATOT,
+            self.PX_TPX3_OPM_TOA,
+        ):
+            raise RuntimeError("time slicing needs ToA+ToT or ToA operation mode")
+        if self.__energy_map and self.detector.operationMode() not in (
+            self.PX_TPX3_OPM_TOATOT,
+            self.PX_TPX3_OPM_TOT_NOTOA,
+        ):
+            raise RuntimeError("energy map needs ToA+ToT or ToT operation mode")
+        if not self.__prepared:
+            if self.__batch_mode:
+                self.__event_callback = self.__batchCallback
+                self.__sdk_count = 0
+                self.__drained = 0
+                self.__drain_stop = False
+                self.__batch_histogram[:] = 0
+                self.__drain_thread = threading.Thread(
+                    target=self.__drainFrames, name="AdvacamDrain", daemon=True
+                )
+                self.__drain_thread.start()
+            else:
+                self.__event_callback = self.callback
+            if self.__registered_callback != self.__event_callback:
+                # kept registered between the sequences in scan mode
+                self.__unregisterEvent()
+                self.detector.registerEvent(
+                    pypixet.pixet.PX_EVENT_ACQ_FINISHED,
+                    self.__event_callback,
+                    self.__event_callback,
+                )
+                self.__registered_callback = self.__event_callback
             if self.buffer_ctrl:
                 # get the buffer mgr here, to be filled in the callback funct
                 self.__buffer_mgr = self.buffer_ctrl.getBuffer()
@@ -358,23 +889,76 @@ class Camera:
                 self.__buffer_mgr = None
 
             self.__prepared = True
-            self.__acquired_frames = 0
+            with self.__cond:
+                self.__acquired_frames = 0
+                self.__status = self.READY
+                self.__aborting = False
+                self.__cond.notify_all()
+            self.__published_frames = 0
+            self.__blank = None
+            self.__image_dtype = self.image_dtype
+            if self.__recorder is not None:
+                self.__recorder.setAcqInfo(*self.__acqInfo())
+            self.__statistics.reset()
+            if self.__tot_calibration is not None:
+                self.__tot_calibration.resetStatistics()
+            if self.__time_slicer is not None:
+                self.__time_slicer.reset()
+
+            for listener in self.__frame_listeners:
+                listener.prepareAcq()
 
     @Core.DEB_MEMBER_FUNCT
     def getStatus(self):
         # if self.detector.isReadyForSoftwareTrigger(0):
         return self.__status
 
+    def getState(self):
+        # consistent (status, acquired frames) snapshot
+        with self.__cond:
+            return self.__status, self.__acquired_frames
+
+    @Core.DEB_MEMBER_FUNCT
+    def waitForFrame(self, nb_frames, timeout=None):
+        # wait until nb_frames are acquired, False on timeout
+        with self.__cond:
+            return self.__cond.wait_for(
+                lambda: self.__acquired_frames >= nb_frames, timeout
+            )
+
+    @Core.DEB_MEMBER_FUNCT
+    def waitForStatus(self, status, timeout=None):
+        # wait for the camera status (READY, RUNNING, ERROR), False on timeout
+        with self.__cond:
+            return self.__cond.wait_for(lambda: self.__status == status, timeout)
+
     @Core.DEB_MEMBER_FUNCT
     def startAcq(self):
+        self.__checkNoThresholdScan()
+        if self.__scan_mode and not self.__worker.is_alive():
+            raise RuntimeError("Scan worker thread is not running")
+        with self.__cond:
+            # before the sequence start: a short sequence may end, and
+            # publish READY, before this call returns
+            self.__status = self.RUNNING
+            self.__cond.notify_all()
         if self.__acquired_frames == 0:
-            self.acqthread = acqThread(self)
-            self.acqthread.start()
-            time.sleep(0.03)
+            if self.__scan_mode:
+                self.__worker.submit()
+                self.__worker.waitStarted()
+                if self.trigger_mode == self.INTERNAL_TRIG_MULTI:
+                    self.__waitTriggerReady(0.03)
+            else:
+                self.acqthread = acqThread(self)
+                self.acqthread.start()
+                time.sleep(0.03)
 
-        self.__status = self.RUNNING
+        if self.__refresh is not None:
+            # waits for a refresh done in the gap before this frame
+            self.__refresh.startFrame(self.trigger_mode == self.INTERNAL_TRIG_MULTI)
 
-        rc = self.detector.doSoftwareTrigger(0)
+        with tracer.span("doSoftwareTrigger", "sdk"):
+            rc = self.detector.doSoftwareTrigger(0)
         deb.Trace(f"startAcq(): Trigger {self.acquiredFrames+1}")
 
     @Core.DEB_MEMBER_FUNCT
@@ -382,17 +966,193 @@ class Camera:
         self._stopAcq(abort=True)
 
     @Core.DEB_MEMBER_FUNCT
-    def _stopAcq(self, abort=False):
-        self.detector.unregisterEvent(
-            pypixet.pixet.PX_EVENT_ACQ_FINISHED, self.callback, self.callback
-        )
+    def _stopAcq(self, abort=False, status=None):
+        if not self.__scan_mode:
+            self.__unregisterEvent()
         if abort:
             self.detector.abortOperation()
-            if self.acqthread:
-                self.acqthread.join()
+            acqthread = self.acqthread
+            if acqthread:
+                acqthread.join()
                 self.acqthread = None
+            worker = self.__worker
+            if worker is not None and worker is not threading.current_thread():
+                worker.waitIdle()
+        drain_thread = self.__drain_thread
+        if drain_thread is not None and drain_thread is not threading.current_thread():
+            # the frames already signaled are drained before the end
+            with self.__cond:
+                self.__drain_stop = True
+                self.__cond.notify_all()
+            drain_thread.join()
+            self.__drain_thread = None
+
+        if self.model is MODEL_TYPE.MPX3:
+            # best frame rate reached per counter depth
+            depth = self.counter_depth
+            fps = self.__statistics.acq_fps
+            self.__depth_fps[depth] = max(fps, self.__depth_fps.get(depth, 0.0))
+
+        for listener in self.__frame_listeners:
+            try:
+                listener.endAcq()
+            except Exception as e:
+                deb.Error(f"Frame listener {listener} end failed: {e}")
+        self.__statistics.endAcq()
+        tracer.instant("endAcq", "camera")
+        try:
+            tracer.endAcq()
+        except OSError as e:
+            deb.Error(f"Trace dump failed: {e}")
+
+        # last: a step scan may prepare the next sequence as soon as READY
         self.__prepared = False
-        self.__status = self.READY
+        with self.__cond:
+            self.__status = self.READY if status is None else status
+            self.__cond.notify_all()
+
+    def __unregisterEvent(self):
+        callback = self.__registered_callback
+        if callback is not None:
+            self.detector.unregisterEvent(
+                pypixet.pixet.PX_EVENT_ACQ_FINISHED, callback, callback
+            )
+            self.__registered_callback = None
+
+    def __waitTriggerReady(self, timeout):
+        # the SDK arms the software trigger after doAdvancedAcquisition
+        # is called, timeout is the former fixed delay
+        deadline = time.monotonic() + timeout
+        while not self.detector.isReadyForSoftwareTrigger(0):
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0.0002)
+
+    def __settingSent(self, name, value):
+        # scan mode: a setting equal to the last one sent is not re-sent
+        return self.__scan_mode and self.__sent_settings.get(name) == value
+
+    @property
+    def scan_mode(self):
+        return self.__scan_mode
+
+    @scan_mode.setter
+    def scan_mode(self, value):
+        # step scans: event callback kept registered and a persistent
+        # acquisition thread across the sequences, unchanged settings
+        # not re-sent
+        value = bool(value)
+        if self.__prepared or self.__status == self.RUNNING:
+            raise RuntimeError("Acquisition in progress")
+        if value == self.__scan_mode:
+            return
+        self.__scan_mode = value
+        self.__sent_settings = {}
+        if value:
+            self.__worker = acqWorker(self)
+            self.__worker.start()
+        else:
+            self.__unregisterEvent()
+            self.__worker.stop()
+            self.__worker = None
+
+    def getScanMode(self):
+        return self.scan_mode
+
+    def setScanMode(self, value):
+        self.scan_mode = value
+
+    @Core.DEB_MEMBER_FUNCT
+    def startRecording(self, path):
+        # dump the raw frames and their metadata, see recorder.py
+        if self.__recorder is not None:
+            raise RuntimeError(f"Already recording to {self.__recorder.path}")
+        recorder = FrameRecorder(path, self.__deviceInfo())
+        recorder.setAcqInfo(*self.__acqInfo())
+        self.__recorder = recorder
+
+    @Core.DEB_MEMBER_FUNCT
+    def stopRecording(self):
+        recorder, self.__recorder = self.__recorder, None
+        if recorder is not None:
+            recorder.close()
+
+    def __acqInfo(self):
+        return (
+            self.__expo_time,
+            self.getOperationMode(),
+            self.energy_threshold0,
+            self.energy_threshold1,
+        )
+
+    def __deviceInfo(self):
+        # what the ReplayDevice needs to stand for the detector
+        detector = self.detector
+        info = {
+            "model": self.model.name,
+            "deviceType": detector.deviceType(),
+            "deviceID": detector.deviceID(),
+            "fullName": detector.fullName(),
+            "width": detector.width(),
+            "height": detector.height(),
+            "chipCount": self.nb_chips,
+            "chipIDs": list(detector.chipIDs()),
+            "operationMode": self.getOperationMode(),
+            "threshold0": self.energy_threshold0,
+            "threshold1": self.energy_threshold1,
+            "bias": self.bias_voltage,
+            "temperature": self.temperature,
+        }
+        if self.model is MODEL_TYPE.MPX3:
+            info["counterDepth"] = detector.counterDepth()
+        return info
+
+    @Core.DEB_MEMBER_FUNCT
+    def startThresholdScan(self, thresholds, expo_time):
+        if self.__prepared or self.__status == self.RUNNING:
+            raise RuntimeError("Acquisition in progress")
+        if self.__threshold_scan is not None and self.__threshold_scan.running:
+            raise RuntimeError("Threshold scan already running")
+        scan = ThresholdScan(self, thresholds, expo_time)
+        # the scan registers its own event callback
+        self.__unregisterEvent()
+        # busy for Lima until the scan ends
+        with self.__cond:
+            self.__status = self.RUNNING
+            self.__cond.notify_all()
+        self.__threshold_scan = scan
+        scan.start()
+
+    def _thresholdScanDone(self):
+        # called by the scan thread
+        with self.__cond:
+            self.__status = self.READY
+            self.__cond.notify_all()
+
+    def __checkNoThresholdScan(self):
+        # both would run doAdvancedAcquisition on the detector
+        if self.__threshold_scan is not None and self.__threshold_scan.running:
+            raise RuntimeError("Threshold scan running")
+
+    @Core.DEB_MEMBER_FUNCT
+    def thresholdScan(self, thresholds, expo_time):
+        # returns the (n, width, height) counts, edge and width images
+        self.startThresholdScan(thresholds, expo_time)
+        scan = self.__threshold_scan
+        scan.wait()
+        if scan.error is not None:
+            raise scan.error
+        return scan.counts, scan.edge, scan.width
+
+    @Core.DEB_MEMBER_FUNCT
+    def abortThresholdScan(self):
+        if self.__threshold_scan is not None and self.__threshold_scan.running:
+            self.__threshold_scan.abort()
+            self.__threshold_scan.wait()
+
+    @property
+    def threshold_scan(self):
+        return self.__threshold_scan
 
     @property
     def acq_nb_frames(self):
@@ -414,6 +1174,15 @@ class Camera:
     def acquiredFrames(self):
         return self.__acquired_frames
 
+    @property
+    def publishedFrames(self):
+        # next frame id to publish, differs from acquiredFrames on lost frames
+        return self.__published_frames
+
+    @property
+    def statistics(self):
+        return self.__statistics
+
     @property
     def fullName(self):
         return self.detector.fullName()
@@ -426,8 +1195,22 @@ class Camera:
     def height(self):
         return self.detector.height()
 
+    @property
+    def image_width(self):
+        return self.width
+
+    @property
+    def image_height(self):
+        # both MPX3 counter images are stacked
+        if self.__counter_output == "both":
+            return 2 * self.height
+        return self.height
+
     @property
     def bpp(self):
+        if self.__energy_map:
+            # float32 energy image
+            return 32
         if self.model is MODEL_TYPE.TPX3:
             # According to the doc "AdvaPIX\ TPX3\ &\ MiniPIX\ TPX3\ -\ User\ Manual.pdf", page 7:
             # ToT & ToA: Tot 14bit, ToA 10bit, Fast ToA 4bit@640MHz
@@ -435,13 +1218,103 @@ class Camera:
             # Event Count & Integral ToT: Integral ToT 14bit, Hit Counter: 10bit
             return 16
         elif self.model is MODEL_TYPE.MPX3:
-            return self.MPX3_COUNTER_DEPTH_MODES[self.detector.counterDepth()]
+            return self.counter_depth
         elif self.model is MODEL_TYPE.TPX_MPX:
             return 16
 
+    @property
+    def image_dtype(self):
+        # numpy type of the published frames, Lima image depth for bpp
+        bpp = self.bpp
+        if bpp == 32:
+            return numpy.float32
+        if bpp <= 8:
+            return numpy.uint8
+        if bpp <= 16:
+            return numpy.int16
+        return numpy.int32
+
+    @property
+    def model_name(self):
+        return self.model.name
+
+    @property
+    def counter_depth(self):
+        # MPX3 counter depth in bits
+        if self.model is not MODEL_TYPE.MPX3:
+            raise ValueError("Counter depth is only supported by MPX3 chip model")
+        return self.MPX3_COUNTER_DEPTH_MODES[self.detector.counterDepth()]
+
+    @counter_depth.setter
+    def counter_depth(self, value):
+        if self.model is not MODEL_TYPE.MPX3:
+            raise ValueError("Counter depth is only settable on MPX3 chip model")
+        depths = self.MPX3_COUNTER_DEPTH_MODES
+        if value not in depths.values():
+            raise ValueError(f"Invalid counter depth, must be in {list(depths.values())}")
+        if self.__prepared:
+            raise RuntimeError("Acquisition in progress")
+        if value == self.counter_depth:
+            return
+        mode = list(depths.keys())[list(depths.values()).index(value)]
+        self.detector.setCounterDepth(mode)
+        self._imageChanged()
+
+    @property
+    def counter_depth_fps(self):
+        # best frame rate measured per counter depth, 0 if never used
+        return {
+            depth: self.__depth_fps.get(depth, 0.0)
+            for depth in self.MPX3_COUNTER_DEPTH_MODES.values()
+        }
+
     @property
     def buffer_ctrl(self):
-        return self.__buffer_ctrl()
+        # None without Lima buffer (SDK worker process)
+        return self.__buffer_ctrl() if self.__buffer_ctrl else None
+
+    @Core.DEB_MEMBER_FUNCT
+    def setSensorRefresh(self, period=0.0, dose=0.0, between_frames=False):
+        # refresh every period s and/or dose counts, in the acquisition
+        # gaps, see refresh.py; period and dose 0 disable it
+        if self.__prepared:
+            raise RuntimeError("Acquisition in progress")
+        if self.__refresh is not None:
+            self.unregisterFrameListener(self.__refresh)
+            self.__refresh.close()
+            self.__refresh = None
+        if period <= 0 and dose <= 0:
+            return
+        if self.detector.isSensorRefreshSupported() != 1:
+            raise ValueError("Sensor refresh is not supported by this detector")
+        self.__refresh = RefreshScheduler(self.detector, period, dose, between_frames)
+        self.registerFrameListener(self.__refresh)
+
+    @property
+    def refresh_scheduler(self):
+        return self.__refresh
+
+    def getRefreshDuration(self):
+        return self.__refresh.refresh_duration if self.__refresh is not None else 0.0
+
+    def getTimeToRefresh(self):
+        # -1 without scheduled refresh
+        if self.__refresh is None:
+            return -1.0
+        remaining = self.__refresh.time_to_refresh
+        return remaining if remaining != float("inf") else -1.0
+
+    def getRefreshCount(self):
+        return self.__refresh.nb_refreshes if self.__refresh is not None else 0
+
+    def getRefreshFailures(self):
+        return self.__refresh.nb_failures if self.__refresh is not None else 0
+
+    def getRefreshError(self):
+        # last refresh failure, empty after a successful refresh
+        if self.__refresh is None or self.__refresh.error is None:
+            return ""
+        return str(self.__refresh.error)
 
     @property
     def trigger_mode(self):
@@ -476,6 +1349,8 @@ class Camera:
         # do not know the valid range !! suppose up to 120 keV
         if value < 0 or value > 120:
             raise ValueError("Invalid energy threshold, range = [0,120] keV")
+        if self.__settingSent("threshold0", value):
+            return
         if self.model is MODEL_TYPE.TPX3:
             for ch in range(self.nb_chips):
                 self.detector.setThreshold(ch, value, self.PX_THLFLG_ENERGY)
@@ -485,6 +1360,7 @@ class Camera:
         else:
             for ch in range(self.nb_chips):
                 self.detector.setThreshold(ch, value, self.PX_THLFLG_ENERGY)
+        self.__sent_settings["threshold0"] = value
 
     @property
     def energy_threshold1(self):
@@ -511,8 +1387,11 @@ class Camera:
             for ch in range(self.nb_chips):
                 self.detector.setThreshold(ch, value, self.PX_THLFLG_ENERGY)
         else:  # MPX3
+            if self.__settingSent("threshold1", value):
+                return
             for ch in range(self.nb_chips):
                 self.detector.setThreshold(ch, 1, value, self.PX_THLFLG_ENERGY)
+            self.__sent_settings["threshold1"] = value
 
     @property
     def bias_voltage(self):
@@ -520,7 +1399,10 @@ class Camera:
 
     @bias_voltage.setter
     def bias_voltage(self, value):
+        if self.__settingSent("bias", value):
+            return
         self.detector.setBias(value)
+        self.__sent_settings["bias"] = value
 
     @property
     def sensed_bias_voltage(self):
@@ -550,7 +1432,130 @@ class Camera:
             raise ValueError("Invalid operation mode")
         d = self.OPERATION_MODES
         mode = list(d.keys())[list(d.values()).index(value)]
+        if self.__settingSent("operation_mode", mode):
+            return
         self.detector.setOperationMode(mode)
+        self.__sent_settings["operation_mode"] = mode
+
+    @property
+    def counter_output(self):
+        return self.__counter_output
+
+    @counter_output.setter
+    def counter_output(self, value):
+        # which MPX3 counter image(s) are published:
+        # counter0, counter1, both (stacked) or window (counter0 - counter1)
+        if value not in self.COUNTER_OUTPUTS:
+            raise ValueError(f"Invalid counter output, must be in {self.COUNTER_OUTPUTS}")
+        if value != "counter0" and self.model is not MODEL_TYPE.MPX3:
+            raise ValueError("Only MPX3 chip model has 2 counters")
+        if self.__prepared:
+            raise RuntimeError("Acquisition in progress")
+        changed = (value == "both") != (self.__counter_output == "both")
+        self.__counter_output = value
+        if changed:
+            self._imageChanged()
+
+    @Core.DEB_MEMBER_FUNCT
+    def setTimeSlicing(self, nb_slices, t_min, t_max, period=0.0, weight_tot=False):
+        # ToA (ns) slices accumulated over the frames, nb_slices 0 disables
+        if self.__prepared:
+            raise RuntimeError("Acquisition in progress")
+        if not nb_slices:
+            self.__time_slicer = None
+            return
+        if self.model is not MODEL_TYPE.TPX3:
+            raise ValueError("Time slicing is only supported by TPX3 chip model")
+        self.__time_slicer = TimeSlicer(
+            (self.width, self.height), nb_slices, t_min, t_max, period, weight_tot
+        )
+
+    @property
+    def conversion_threads(self):
+        return self.__tiles.nb_threads
+
+    @conversion_threads.setter
+    def conversion_threads(self, value):
+        # window subtraction, energy map and Lima buffer copy of the
+        # multi-chip frames done per chip tile by a thread pool
+        if value < 1:
+            raise ValueError("At least one conversion thread is needed")
+        if self.__prepared:
+            raise RuntimeError("Acquisition in progress")
+        self.__tiles.close()
+        self.__tiles = TileProcessor(value if self.nb_chips > 1 else 1)
+
+    @property
+    def time_slicer(self):
+        return self.__time_slicer
+
+    @property
+    def batch_mode(self):
+        return self.__batch_mode
+
+    @batch_mode.setter
+    def batch_mode(self, value):
+        # drain the frames by batch from a thread instead of one by one
+        # in the SDK callback
+        if self.__prepared:
+            raise RuntimeError("Acquisition in progress")
+        self.__batch_mode = bool(value)
+
+    @property
+    def batch_size_histogram(self):
+        return self.__batch_histogram.copy()
+
+    @property
+    def gap_policy(self):
+        return self.__gap_policy
+
+    @gap_policy.setter
+    def gap_policy(self, value):
+        if value not in self.GAP_POLICIES:
+            raise ValueError(f"Invalid gap policy, must be in {self.GAP_POLICIES}")
+        self.__gap_policy = value
+
+    @property
+    def energy_calibration(self):
+        # path of the loaded ToT calibration, empty if none
+        if self.__tot_calibration is None:
+            return ""
+        return self.__tot_calibration.path
+
+    @energy_calibration.setter
+    def energy_calibration(self, path):
+        if self.model is not MODEL_TYPE.TPX3:
+            raise ValueError("ToT calibration is only supported by TPX3 chip model")
+        if not path:
+            if self.__energy_map:
+                raise RuntimeError("energy map needs a ToT calibration")
+            self.__tot_calibration = None
+            return
+        # matrices of rows, as the frame data and the Pixet export
+        self.__tot_calibration = TotCalibration.fromFile(
+            path, (self.height, self.width)
+        )
+
+    @property
+    def tot_calibration(self):
+        return self.__tot_calibration
+
+    @property
+    def energy_map(self):
+        return self.__energy_map
+
+    @energy_map.setter
+    def energy_map(self, value):
+        # publish the calibrated energy (keV, float32) instead of the counts
+        value = bool(value)
+        if value and self.__tot_calibration is None:
+            raise RuntimeError("energy map needs a ToT calibration")
+        if self.__prepared:
+            raise RuntimeError("Acquisition in progress")
+        changed = value != self.__energy_map
+        self.__energy_map = value
+        if changed:
+            self._imageChanged()
 
     # for pytango automatic wrapping
 
@@ -597,6 +1602,137 @@ class Camera:
     def setOperationMode(self, value):
         self.operation_mode = value
 
+    def getFps(self):
+        return self.__statistics.fps
+
+    def getFramesAcquired(self):
+        return self.__statistics.frames_acquired
+
+    def getFramesDropped(self):
+        return self.__statistics.frames_dropped
+
+    def getCallbackLatencyP99(self):
+        return self.__statistics.latency_p99
+
+    def getSdkDroppedFrames(self):
+        return self.__statistics.sdk_dropped
+
+    def getIngestDroppedFrames(self):
+        return self.__statistics.ingest_dropped
+
+    def getOverrunFrames(self):
+        return self.__statistics.overrun
+
+    def getCounterDepth(self):
+        return self.counter_depth
+
+    def setCounterDepth(self, value):
+        self.counter_depth = value
+
+    def getCounterDepthFps(self):
+        # in the MPX3_COUNTER_DEPTH_MODES order
+        return list(self.counter_depth_fps.values())
+
+    def getConversionThreads(self):
+        return self.conversion_threads
+
+    def setConversionThreads(self, value):
+        self.conversion_threads = value
+
+    def getTimeSlices(self):
+        # slices stacked vertically: (nb_slices * width, height)
+        slicer = self.__time_slicer
+        if slicer is None:
+            return numpy.zeros((0, 0), dtype=numpy.float64)
+        stack = slicer.stack()
+        return stack.reshape(-1, stack.shape[-1]).astype(numpy.float64)
+
+    def resetTimeSlices(self):
+        # restart the accumulation, the slices stay configured
+        slicer = self.__time_slicer
+        if slicer is not None:
+            slicer.reset()
+
+    def getTimeSliceEdges(self):
+        slicer = self.__time_slicer
+        return slicer.edges if slicer is not None else numpy.zeros(0)
+
+    def getTimeSliceRepetitions(self):
+        slicer = self.__time_slicer
+        return slicer.repetitions if slicer is not None else 0
+
+    def getBatchMode(self):
+        return self.batch_mode
+
+    def setBatchMode(self, value):
+        self.batch_mode = value
+
+    def getBatchSizeHistogram(self):
+        return self.batch_size_histogram
+
+    def getGapPolicy(self):
+        return self.gap_policy
+
+    def setGapPolicy(self, value):
+        self.gap_policy = value
+
+    def getCounterOutput(self):
+        return self.counter_output
+
+    def setCounterOutput(self, value):
+        self.counter_output = value
+
+    def getRecording(self):
+        recorder = self.__recorder
+        return recorder.path if recorder is not None else ""
+
+    def setRecording(self, path):
+        # path to start, "" to stop
+        self.stopRecording()
+        if path:
+            self.startRecording(path)
+
+    def getRecordedFrames(self):
+        recorder = self.__recorder
+        return recorder.nb_frames if recorder is not None else 0
+
+    def getEnergyCalibration(self):
+        return self.energy_calibration
+
+    def setEnergyCalibration(self, path):
+        self.energy_calibration = path
+
+    def getEnergyMap(self):
+        return self.energy_map
+
+    def setEnergyMap(self, value):
+        self.energy_map = value
+
+    def getEnergyConversionTime(self):
+        # mean per frame ToT to energy conversion time in s
+        calibration = self.__tot_calibration
+        return calibration.mean_conversion_time if calibration is not None else 0.0
+
+    def getThresholdScanRunning(self):
+        scan = self.__threshold_scan
+        return scan is not None and scan.running
+
+    def getThresholdScanProgress(self):
+        scan = self.__threshold_scan
+        return scan.nb_frames if scan is not None else 0
+
+    def getThresholdScanEdge(self):
+        scan = self.__threshold_scan
+        if scan is None or scan.edge is None:
+            return numpy.zeros((0, 0), dtype=numpy.float32)
+        return scan.edge
+
+    def getThresholdScanWidth(self):
+        scan = self.__threshold_scan
+        if scan is None or scan.width is None:
+            return numpy.zeros((0, 0), dtype=numpy.float32)
+        return scan.width
+
 
 def main():
     advacam = Camera()
@@ -0,0 +1,235 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import asyncio
+
+from Lima import Core
+
+from .listener import FrameListener
+
+
+class FrameOverrun(RuntimeError):
+    pass
+
+
+class _LoopListener(FrameListener):
+    # hand over the camera events from the SDK thread to the asyncio loop
+    def __init__(self, owner, loop):
+        self.__owner = owner
+        self.__loop = loop
+
+    def newFrame(self, frame_id, data, timestamp):
+        self.__loop.call_soon_threadsafe(
+            self.__owner._newFrame, frame_id, data, timestamp
+        )
+
+    def endAcq(self):
+        self.__loop.call_soon_threadsafe(self.__owner._endAcq)
+
+
+class _ImageStatusCallback(Core.CtControl.ImageStatusCallback):
+    def __init__(self, owner, loop):
+        Core.CtControl.ImageStatusCallback.__init__(self)
+        self.__owner = owner
+        self.__loop = loop
+
+    def imageStatusChanged(self, image_status):
+        self.__loop.call_soon_threadsafe(
+            self.__owner._imageStatusChanged,
+            image_status.LastImageReady,
+            image_status.LastImageSaved,
+        )
+
+
+class AsyncCamera:
+    """asyncio facade over the Advacam Interface (or a CtControl built on it).
+
+    >>> acam = AsyncCamera(hwint, ct)
+    >>> await acam.prepare()
+    >>> await acam.start()
+    >>> async for frame_id, timestamp, data in acam.frames():
+    ...     process(data)
+    >>> await acam.wait_ready()
+
+    Frames come from the SDK callback, at most max_queued_frames wait for
+    the consumer: on overflow the acquisition is stopped (overflow="stop",
+    frames() raises FrameOverrun) or the new frames are dropped
+    (overflow="drop"). Cancelling or leaving frames() before the end of the
+    acquisition stops it.
+    """
+
+    def __init__(self, interface, control=None, max_queued_frames=16, overflow="stop"):
+        if overflow not in ("stop", "drop"):
+            raise ValueError("Invalid overflow policy, must be 'stop' or 'drop'")
+        self.__interface = interface
+        self.__camera = interface.camera
+        self.__control = control
+        self.__target = control if control is not None else interface
+        self.__max_queued_frames = max_queued_frames
+        self.__overflow = overflow
+
+        self.__loop = None
+        self.__listener = None
+        self.__image_status_cb = None
+        self.__queue = None
+        self.__ready = None
+        self.__running = False
+        self.__overrun = False
+        self.__nb_frames = 0
+        self.__received = 0
+        self.__lima_done = False
+        self.__camera_done = False
+        self.__saving = False
+        self.dropped = 0
+
+    def __bind(self, loop):
+        if self.__loop is loop:
+            return
+        self.close()
+        self.__loop = loop
+        self.__listener = _LoopListener(self, loop)
+        self.__camera.registerFrameListener(self.__listener)
+        if self.__control is not None:
+            self.__image_status_cb = _ImageStatusCallback(self, loop)
+            self.__control.registerImageStatusCallback(self.__image_status_cb)
+
+    def close(self):
+        if self.__listener is not None:
+            self.__camera.unregisterFrameListener(self.__listener)
+            self.__listener = None
+        if self.__image_status_cb is not None:
+            self.__control.unregisterImageStatusCallback(self.__image_status_cb)
+            self.__image_status_cb = None
+        self.__loop = None
+
+    async def __run(self, func, *args):
+        return await self.__loop.run_in_executor(None, func, *args)
+
+    async def prepare(self):
+        loop = asyncio.get_running_loop()
+        self.__bind(loop)
+        self.__queue = asyncio.Queue()
+        self.__ready = loop.create_future()
+        self.__overrun = False
+        self.dropped = 0
+        self.__received = 0
+        self.__lima_done = False
+        self.__camera_done = False
+        if self.__control is not None:
+            acq = self.__control.acquisition()
+            self.__nb_frames = acq.getAcqNbFrames()
+            saving = self.__control.saving()
+            self.__saving = saving.getSavingMode() != Core.CtSaving.Manual
+            buffer_manager = self.__interface.buffer_manager
+            if buffer_manager.memory_budget:
+                # before CtControl.prepareAcq allocates the buffers
+                buffer_manager.setup()
+        await self.__run(self.__target.prepareAcq)
+        self.__running = True
+
+    async def start(self):
+        if self.__ready is None:
+            raise RuntimeError("prepare() must be called before start()")
+        await self.__run(self.__target.startAcq)
+
+    async def stop(self):
+        await self.__run(self.__target.stopAcq)
+        self.__setReady()
+
+    async def wait_ready(self, timeout=None):
+        if self.__ready is None:
+            return
+        await asyncio.wait_for(asyncio.shield(self.__ready), timeout)
+        if self.__overrun:
+            raise FrameOverrun("Acquisition stopped, frames were not consumed")
+
+    async def frames(self):
+        queue = self.__queue
+        if queue is None:
+            raise RuntimeError("prepare() must be called before frames()")
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield item
+            if self.__overrun:
+                raise FrameOverrun("Acquisition stopped, frames were not consumed")
+        finally:
+            # consumer gone (cancelled, break, ...) while still acquiring
+            if self.__running:
+                await self.stop()
+
+    def __setReady(self):
+        self.__running = False
+        if self.__ready is None or self.__ready.done():
+            return
+        self.__queue.put_nowait(None)
+        self.__ready.set_result(None)
+
+    # called in the loop thread
+    def _newFrame(self, frame_id, data, timestamp):
+        queue = self.__queue
+        if queue is None or not self.__running:
+            return
+        self.__received += 1
+        if queue.qsize() >= self.__max_queued_frames:
+            if self.__overflow == "drop":
+                self.dropped += 1
+                return
+            if not self.__overrun:
+                self.__overrun = True
+                self.__loop.create_task(self.stop())
+            return
+        queue.put_nowait((frame_id, timestamp, data))
+        self.__checkReady()
+
+    def _endAcq(self):
+        # without CtControl the end of the camera acquisition is the end,
+        # otherwise wait for Lima to process (and save) the last image
+        self.__camera_done = True
+        if self.__control is None or self.__overrun:
+            self.__setReady()
+        else:
+            self.__checkReady()
+
+    def __checkReady(self):
+        # Lima status callbacks can overtake the listener frames (newFrameReady
+        # is called first): only end once all the frames reached the queue
+        if not self.__lima_done:
+            return
+        if self.__received < self.__nb_frames and not self.__camera_done:
+            return
+        self.__setReady()
+
+    def _imageStatusChanged(self, last_image_ready, last_image_saved):
+        if not self.__running:
+            return
+        last_image = self.__nb_frames - 1
+        if last_image_ready < last_image:
+            return
+        if self.__saving and last_image_saved < last_image:
+            return
+        self.__lima_done = True
+        self.__checkReady()
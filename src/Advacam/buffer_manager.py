@@ -0,0 +1,260 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import os
+import time
+import ctypes
+import threading
+import collections
+
+import numpy
+
+from Lima import Core
+
+
+def frame_buffer(buffer_mgr, frame_id, dtype, size):
+    """numpy view on the Lima buffer of frame_id, None if this buffer does
+    not hold size items of dtype."""
+    nbytes = numpy.dtype(dtype).itemsize * size
+    if buffer_mgr.getFrameDim().getMemSize() != nbytes:
+        return None
+    ptr = buffer_mgr.getFrameBufferPtr(frame_id % buffer_mgr.getNbBuffers())
+    raw = (ctypes.c_uint8 * nbytes).from_address(int(ptr))
+    return numpy.frombuffer(raw, dtype=dtype)
+
+
+class _ConsumerMonitor(Core.CtControl.ImageStatusCallback):
+    # how far the Lima consumers (processing, saving) lag behind the
+    # acquisition, called from the Lima threads so kept minimal
+    def __init__(self, control):
+        Core.CtControl.ImageStatusCallback.__init__(self)
+        self.__control = control
+        self.reset()
+
+    def reset(self):
+        self.start = None
+        self.max_lag = 0
+        self.last_acquired = -1
+        self.last_consumed = -1
+        self.acquired_time = None
+        self.consumed_time = None
+        self.__saving = (
+            self.__control.saving().getSavingMode() != Core.CtSaving.Manual
+        )
+
+    def imageStatusChanged(self, image_status):
+        now = time.monotonic()
+        acquired = image_status.LastImageAcquired
+        consumed = image_status.LastImageReady
+        if self.__saving:
+            consumed = min(consumed, image_status.LastImageSaved)
+        if self.start is None and acquired >= 0:
+            self.start = now
+        if acquired > self.last_acquired:
+            self.last_acquired = acquired
+            self.acquired_time = now
+        if consumed > self.last_consumed:
+            self.last_consumed = consumed
+            self.consumed_time = now
+        self.max_lag = max(self.max_lag, acquired - consumed)
+
+    def summary(self):
+        # (acquisition fps, consumer drain fps, max lag), None if unknown
+        if self.start is None or self.last_consumed < 1:
+            return None
+        acquired_fps = consumed_fps = 0.0
+        if self.acquired_time > self.start:
+            acquired_fps = self.last_acquired / (self.acquired_time - self.start)
+        if self.consumed_time > self.start:
+            consumed_fps = self.last_consumed / (self.consumed_time - self.start)
+        return acquired_fps, consumed_fps, self.max_lag
+
+
+class BufferManager:
+    """Number of Lima buffers chosen before each CtControl prepareAcq.
+
+    The buffers needed are the peak lag of the consumers observed in the
+    last acquisitions (times lag_margin), plus the backlog growing during
+    the acquisition when the measured drain rate is below the target
+    frame rate. Without history the whole memory budget is used. The
+    count is bounded by the memory budget and by the number of frames.
+
+    setup() sets it through the CtBuffer max memory, CtBuffer allocates
+    the buffers in CtControl.prepareAcq, then the hardware prepareAcq
+    writes them once so no page fault happens during the acquisition.
+    The max memory is a % of the host memory: it is rounded down, and an
+    allocation above the budget is refused. setup() must be called while
+    the acquisition is idle, it takes the consumers lag seen since the
+    previous call in the history. A memory_budget of 0 keeps the Lima
+    (CtBuffer) sizing.
+    """
+
+    def __init__(
+        self, buffer_ctrl, memory_budget=0, min_buffers=4, lag_margin=2.0, nb_history=8
+    ):
+        self.__buffer_ctrl = buffer_ctrl
+        self.memory_budget = memory_budget
+        self.min_buffers = min_buffers
+        self.lag_margin = lag_margin
+        self.__history = collections.deque(maxlen=nb_history)
+        self.__lock = threading.Lock()
+        self.__control = None
+        self.__monitor = None
+        self.__report = {}
+
+    def attachControl(self, control):
+        self.detachControl()
+        self.__control = control
+        self.__monitor = _ConsumerMonitor(control)
+        control.registerImageStatusCallback(self.__monitor)
+
+    def detachControl(self):
+        if self.__monitor is not None:
+            self.__control.unregisterImageStatusCallback(self.__monitor)
+            self.__control = None
+            self.__monitor = None
+
+    def clearHistory(self):
+        with self.__lock:
+            self.__history.clear()
+
+    def setup(self):
+        """Size the Lima buffers of the next CtControl prepareAcq from the
+        acquisition parameters, returns the buffer count CtBuffer will
+        allocate."""
+        control = self.__control
+        if control is None:
+            raise RuntimeError("No CtControl attached")
+        if control.getStatus().AcquisitionStatus == Core.AcqRunning:
+            raise RuntimeError("Acquisition in progress")
+        self.__collectHistory()
+        acq = control.acquisition()
+        nb_frames = acq.getAcqNbFrames()
+        period = acq.getAcqExpoTime() + acq.getLatencyTime()
+        frame_size = control.image().getImageDim().getMemSize()
+        nb_buffers, report = self.nbBuffers(frame_size, 1.0 / period, nb_frames)
+
+        # CtBuffer counts in % of the host memory (at least 1 %), rounded
+        # down not to go above the budget
+        total_memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        max_buffers = max(total_memory // frame_size, 1)
+        percent = min(max(100 * nb_buffers // max_buffers, 1), 100)
+        allocated = max(max_buffers * percent // 100, 1)
+        if nb_frames:
+            allocated = min(allocated, nb_frames)
+        self.__checkBudget(allocated, frame_size)
+        control.buffer().setMaxMemory(percent)
+        report["max_memory_percent"] = percent
+        self.__report = report
+        return allocated
+
+    def __checkBudget(self, nb_buffers, frame_size):
+        if nb_buffers * frame_size > self.memory_budget:
+            raise RuntimeError(
+                f"{nb_buffers} Lima buffers of {frame_size} bytes are above the "
+                f"{self.memory_budget} bytes budget (CtBuffer sizes by 1 % of the "
+                "host memory)"
+            )
+
+    def __collectHistory(self):
+        # consumers lag of the acquisitions since the last call
+        monitor = self.__monitor
+        if monitor is None:
+            return
+        with self.__lock:
+            summary = monitor.summary()
+            if summary is not None:
+                self.__history.append(summary)
+            monitor.reset()
+
+    def nbBuffers(self, frame_size, fps, nb_frames):
+        """(buffer count, report) for an acquisition, nb_frames 0 is an
+        endless acquisition."""
+        with self.__lock:
+            history = tuple(self.__history)
+
+        max_buffers = max(int(self.memory_budget // frame_size), 1)
+        if nb_frames:
+            max_buffers = min(max_buffers, nb_frames)
+
+        if history:
+            max_lag = max(lag for _, _, lag in history)
+            drain_fps = min(drain for _, drain, _ in history)
+            needed = max_lag * self.lag_margin
+            if fps > drain_fps:
+                if nb_frames:
+                    needed += nb_frames * (1 - drain_fps / fps)
+                else:
+                    # endless and the consumers are too slow: overrun anyway
+                    needed = max_buffers
+            needed = max(int(needed + 0.5), self.min_buffers)
+            nb_buffers = min(needed, max_buffers)
+        else:
+            max_lag = drain_fps = None
+            needed = None
+            nb_buffers = max_buffers
+
+        report = {
+            "nb_buffers": nb_buffers,
+            "needed_buffers": needed,
+            "headroom_frames": None if needed is None else nb_buffers - needed,
+            "headroom_bytes": None
+            if needed is None
+            else (nb_buffers - needed) * frame_size,
+            "memory": nb_buffers * frame_size,
+            "drain_fps": drain_fps,
+            "max_lag": max_lag,
+        }
+        return nb_buffers, report
+
+    def prepareAcq(self):
+        """Write the buffers allocated by CtBuffer (never resized here),
+        returns their count."""
+        buffer_mgr = self.__buffer_ctrl.getBuffer()
+        nb_buffers = buffer_mgr.getNbBuffers()
+        frame_size = buffer_mgr.getFrameDim().getMemSize()
+        # the host memory seen by CtBuffer may differ from ours
+        self.__checkBudget(nb_buffers, frame_size)
+        t0 = time.perf_counter()
+        for i in range(nb_buffers):
+            ptr = buffer_mgr.getFrameBufferPtr(i)
+            ctypes.memset(int(ptr), 0, frame_size)
+        report = self.__report
+        needed = report.get("needed_buffers")
+        # the CtBuffer count, rounded down from the max memory %
+        report["nb_buffers"] = nb_buffers
+        report["memory"] = nb_buffers * frame_size
+        if needed is not None:
+            report["headroom_frames"] = nb_buffers - needed
+            report["headroom_bytes"] = (nb_buffers - needed) * frame_size
+        report["touch_time"] = time.perf_counter() - t0
+        return nb_buffers
+
+    @property
+    def headroom(self):
+        # buffers above the estimated need, None without history
+        return self.__report.get("headroom_frames")
+
+    def report(self):
+        return dict(self.__report)
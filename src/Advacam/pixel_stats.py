@@ -0,0 +1,122 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+
+import time
+import threading
+
+import numpy
+
+from .listener import FrameListener
+
+# classification of PixelStatistics.classify()
+HOT, DEAD, NOISY = 1, 2, 4
+
+
+class PixelStatistics(FrameListener):
+    """Running per pixel mean and variance of the published frames.
+
+    Each frame updates the statistics in place with a vectorized Welford
+    step (no frame kept, float64 accumulators, two preallocated scratch
+    arrays), typically over a dark or flat field acquisition. classify()
+    then flags the hot, dead and noisy pixels from a single pass.
+    """
+
+    def __init__(self, auto_reset=True):
+        self.__auto_reset = auto_reset
+        self.__lock = threading.Lock()
+        self.__shape = None
+        self.nb_frames = 0
+        self.last_update_time = 0.0
+
+    def reset(self):
+        with self.__lock:
+            self.__shape = None
+            self.nb_frames = 0
+
+    def __allocate(self, shape):
+        self.__shape = shape
+        self.__mean = numpy.zeros(shape, dtype=numpy.float64)
+        self.__m2 = numpy.zeros(shape, dtype=numpy.float64)
+        self.__delta = numpy.empty(shape, dtype=numpy.float64)
+        self.__delta2 = numpy.empty(shape, dtype=numpy.float64)
+        self.nb_frames = 0
+
+    def prepareAcq(self):
+        if self.__auto_reset:
+            self.reset()
+
+    def newFrame(self, frame_id, data, timestamp):
+        t0 = time.perf_counter()
+        with self.__lock:
+            if data.shape != self.__shape:
+                self.__allocate(data.shape)
+            self.nb_frames += 1
+            mean, delta, delta2 = self.__mean, self.__delta, self.__delta2
+            numpy.subtract(data, mean, out=delta)
+            numpy.multiply(delta, 1.0 / self.nb_frames, out=delta2)
+            mean += delta2
+            numpy.subtract(data, mean, out=delta2)
+            delta *= delta2
+            self.__m2 += delta
+        self.last_update_time = time.perf_counter() - t0
+
+    def mean(self):
+        with self.__lock:
+            if self.__shape is None:
+                return numpy.zeros((0, 0))
+            return self.__mean.copy()
+
+    def variance(self):
+        # unbiased, 0 before the second frame
+        with self.__lock:
+            if self.__shape is None:
+                return numpy.zeros((0, 0))
+            if self.nb_frames < 2:
+                return numpy.zeros(self.__shape)
+            return self.__m2 / (self.nb_frames - 1)
+
+    def classify(self, hot_sigma=5.0, dead_fraction=0.0, noisy_factor=3.0):
+        """HOT | DEAD | NOISY flags per pixel (uint8).
+
+        hot: mean above the median by hot_sigma robust standard deviations
+        (MAD, at least the Poisson sqrt(median)). dead: mean at most
+        dead_fraction of the median, for flat fields (0: no dead pixel,
+        as in dark runs). noisy: variance above noisy_factor times the
+        Poisson one (the mean, at least 1). 0 disables a test.
+        """
+        mean, variance = self.mean(), self.variance()
+        flags = numpy.zeros(mean.shape, dtype=numpy.uint8)
+        if not mean.size:
+            return flags
+        median = numpy.median(mean)
+        if hot_sigma > 0:
+            sigma = 1.4826 * numpy.median(numpy.abs(mean - median))
+            sigma = max(sigma, numpy.sqrt(max(median, 1.0)))
+            flags[mean > median + hot_sigma * sigma] |= HOT
+        if dead_fraction > 0:
+            flags[mean <= dead_fraction * median] |= DEAD
+        if noisy_factor > 0 and self.nb_frames > 1:
+            flags[variance > noisy_factor * numpy.maximum(mean, 1.0)] |= NOISY
+        return flags
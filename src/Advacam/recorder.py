@@ -0,0 +1,249 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+# Recording file layout, append only:
+#
+#   file header (4096 bytes: prefix + JSON device description) | record 0 | ...
+#
+# A record is a record header (SDK frame value, timestamps, acquisition
+# settings) followed by the subframes, each one a subframe header and the
+# raw data padded to 8 bytes. The prefix holds the end of the last complete
+# record, updated after each record, so a recording interrupted by a crash
+# can still be read up to its last frame.
+
+import os
+import json
+import mmap
+import time
+import struct
+import threading
+import collections
+
+import numpy
+
+FILE_MAGIC = b"ADVREC1\0"
+# magic, end of the records, JSON header size
+FILE_PREFIX = struct.Struct("<8sQI")
+FILE_HEADER_SIZE = 4096
+
+RECORD_MAGIC = b"FRAM"
+# magic, record size, SDK value, timestamp, monotonic time, exposure time,
+# operation mode, threshold 0, threshold 1, nb of subframes (0: no subframe)
+RECORD_HEADER = struct.Struct("<4sIqdddiddI")
+# frame type (Camera.DT_*), name, data size
+SUBFRAME_HEADER = struct.Struct("<I16sQ")
+
+# Camera.DT_* frame data types
+DT_DTYPES = {
+    0: numpy.int8,
+    1: numpy.uint8,
+    2: numpy.int16,
+    3: numpy.uint16,
+    4: numpy.int32,
+    5: numpy.uint32,
+    6: numpy.int64,
+    7: numpy.uint64,
+    8: numpy.float32,
+    9: numpy.float64,
+    10: numpy.bool_,
+}
+
+RecordedFrame = collections.namedtuple(
+    "RecordedFrame",
+    [
+        "value",
+        "timestamp",
+        "monotonic",
+        "expo_time",
+        "mode",
+        "threshold0",
+        "threshold1",
+        "has_subframes",
+        "subframes",
+    ],
+)
+
+RecordedSubFrame = collections.namedtuple(
+    "RecordedSubFrame", ["name", "frame_type", "data"]
+)
+
+
+def _align(size):
+    return (size + 7) // 8 * 8
+
+
+class FrameRecorder:
+    """Append the raw SDK frames to a memory mapped recording file.
+
+    write() is called from the SDK callback with the frame still
+    referenced: its subframes are copied as they are (no conversion) into
+    the mapping, the file grows by chunk_size.
+    """
+
+    def __init__(self, path, device_info, chunk_size=64 * 1024 * 1024):
+        header = json.dumps(device_info).encode()
+        if FILE_PREFIX.size + len(header) > FILE_HEADER_SIZE:
+            raise ValueError("Device description too large")
+        self.path = path
+        self.__chunk_size = chunk_size
+        self.__lock = threading.Lock()
+        self.__file = open(path, "w+b")
+        self.__mmap = None
+        self.__size = 0
+        self.__grow(FILE_HEADER_SIZE + chunk_size)
+        self.__end = FILE_HEADER_SIZE
+        FILE_PREFIX.pack_into(self.__mmap, 0, FILE_MAGIC, self.__end, len(header))
+        self.__mmap[FILE_PREFIX.size : FILE_PREFIX.size + len(header)] = header
+        self.__acq_info = (0.0, -1, numpy.nan, numpy.nan)
+        self.nb_frames = 0
+
+    def __grow(self, size):
+        if self.__mmap is not None:
+            self.__mmap.close()
+        os.ftruncate(self.__file.fileno(), size)
+        self.__mmap = mmap.mmap(self.__file.fileno(), size)
+        self.__size = size
+
+    @property
+    def nbytes(self):
+        return self.__end
+
+    def setAcqInfo(self, expo_time, mode, threshold0, threshold1):
+        # recorded with each frame
+        self.__acq_info = (expo_time, mode, threshold0, threshold1)
+
+    def write(self, value, frame):
+        timestamp = time.time()
+        monotonic = time.monotonic()
+        sub_frames = frame.subFrames()
+        arrays = []
+        for sub_frame in sub_frames or (frame,):
+            frame_type = sub_frame.frameType()
+            data = numpy.asarray(
+                sub_frame.data(), dtype=DT_DTYPES.get(frame_type, numpy.float64)
+            )
+            arrays.append((frame_type, sub_frame.frameName(), data))
+        size = RECORD_HEADER.size + sum(
+            SUBFRAME_HEADER.size + _align(data.nbytes) for _, _, data in arrays
+        )
+        size = _align(size)
+
+        with self.__lock:
+            if self.__mmap is None:
+                return
+            offset = self.__end
+            if offset + size > self.__size:
+                self.__grow(offset + size + self.__chunk_size)
+            mm = self.__mmap
+            RECORD_HEADER.pack_into(
+                mm,
+                offset,
+                RECORD_MAGIC,
+                size,
+                value,
+                timestamp,
+                monotonic,
+                *self.__acq_info,
+                len(sub_frames),
+            )
+            pos = offset + RECORD_HEADER.size
+            for frame_type, name, data in arrays:
+                SUBFRAME_HEADER.pack_into(
+                    mm, pos, frame_type, name.encode()[:16], data.nbytes
+                )
+                pos += SUBFRAME_HEADER.size
+                dest = numpy.frombuffer(mm, numpy.uint8, data.nbytes, pos)
+                dest[:] = data.reshape(-1).view(numpy.uint8)
+                del dest
+                pos += _align(data.nbytes)
+            self.__end = offset + size
+            # record complete
+            struct.pack_into("<Q", mm, 8, self.__end)
+            self.nb_frames += 1
+
+    def close(self):
+        with self.__lock:
+            if self.__mmap is None:
+                return
+            self.__mmap.flush()
+            self.__mmap.close()
+            self.__mmap = None
+            os.ftruncate(self.__file.fileno(), self.__end)
+            self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class RecordingReader:
+    """Read a recording file, the subframe data are views on the mapping."""
+
+    def __init__(self, path):
+        self.path = path
+        self.__file = open(path, "rb")
+        self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.__end, header_size = FILE_PREFIX.unpack_from(self.__mmap, 0)
+        if magic != FILE_MAGIC:
+            raise ValueError(f"{path} is not an Advacam recording")
+        header = self.__mmap[FILE_PREFIX.size : FILE_PREFIX.size + header_size]
+        self.header = json.loads(header)
+
+    def frames(self):
+        mm = self.__mmap
+        offset = FILE_HEADER_SIZE
+        while offset < self.__end:
+            record = RECORD_HEADER.unpack_from(mm, offset)
+            if record[0] != RECORD_MAGIC:
+                raise ValueError(f"Corrupted record at {offset}")
+            size = record[1]
+            nb_subframes = record[-1]
+            pos = offset + RECORD_HEADER.size
+            subframes = []
+            for _ in range(max(nb_subframes, 1)):
+                frame_type, name, nbytes = SUBFRAME_HEADER.unpack_from(mm, pos)
+                pos += SUBFRAME_HEADER.size
+                dtype = numpy.dtype(DT_DTYPES.get(frame_type, numpy.float64))
+                data = numpy.frombuffer(mm, dtype, nbytes // dtype.itemsize, pos)
+                name = name.rstrip(b"\0").decode()
+                subframes.append(RecordedSubFrame(name, frame_type, data))
+                pos += _align(nbytes)
+            yield RecordedFrame(*record[2:-1], nb_subframes > 0, subframes)
+            offset += size
+
+    def __iter__(self):
+        return self.frames()
+
+    def close(self):
+        # the frames data must not be used anymore
+        self.__mmap.close()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
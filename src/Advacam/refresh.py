@@ -0,0 +1,191 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+
+import time
+import threading
+
+from .listener import FrameListener
+from .trace import tracer
+
+
+class RefreshScheduler(FrameListener):
+    """Sensor refresh run in the idle gaps of the acquisitions.
+
+    A refresh is due every period seconds and/or once dose counts (sum of
+    the published images) were collected since the previous one. A due
+    refresh is deferred while a sequence runs, it is done by the
+    scheduler thread between two sequences or, with between_frames, in
+    IntTrigMult mode between the end of a frame and the next trigger.
+    Starting a sequence or a frame waits for a running refresh to end.
+
+    A failed refresh (exception or negative SDK return code) is counted in
+    nb_failures and kept in error: the timer and the dose are not reset,
+    the refresh is retried retry_delay seconds later.
+
+    Registered as a frame listener of the camera, which calls startFrame()
+    before each trigger.
+    """
+
+    def __init__(
+        self,
+        detector,
+        period=0.0,
+        dose=0.0,
+        between_frames=False,
+        poll=0.1,
+        retry_delay=10.0,
+    ):
+        if period <= 0 and dose <= 0:
+            raise ValueError("A refresh period or dose is needed")
+        self.__detector = detector
+        self.period = period
+        self.dose = dose
+        self.between_frames = between_frames
+        self.retry_delay = retry_delay
+        self.__poll = poll
+        self.__cond = threading.Condition()
+        self.__running = False
+        self.__exposing = False
+        self.__frame_gaps = False
+        self.__refreshing = False
+        self.__stop = False
+        self.__last_refresh = time.monotonic()
+        self.__dose = 0.0
+        self.__was_due = False
+        self.__retry_at = 0.0
+        self.nb_refreshes = 0
+        self.nb_deferred = 0
+        self.nb_failures = 0
+        self.refresh_duration = 0.0
+        self.error = None
+        self.__thread = threading.Thread(
+            target=self.__run, name="AdvacamRefresh", daemon=True
+        )
+        self.__thread.start()
+
+    def close(self):
+        with self.__cond:
+            self.__stop = True
+            self.__cond.notify_all()
+        self.__thread.join()
+
+    # FrameListener
+    def prepareAcq(self):
+        with self.__cond:
+            self.__cond.wait_for(lambda: not self.__refreshing)
+            self.__running = True
+            self.__exposing = False
+            self.__frame_gaps = False
+
+    def startFrame(self, frame_gaps=False):
+        # frame_gaps: one frame per trigger (IntTrigMult), the detector
+        # waits for the next trigger after it
+        with self.__cond:
+            self.__cond.wait_for(lambda: not self.__refreshing)
+            self.__exposing = True
+            self.__frame_gaps = frame_gaps
+
+    def newFrame(self, frame_id, data, timestamp):
+        dose = float(data.sum()) if data is not None and self.dose > 0 else 0.0
+        with self.__cond:
+            self.__dose += dose
+            if self.__frame_gaps:
+                self.__exposing = False
+                self.__cond.notify_all()
+
+    def endAcq(self):
+        with self.__cond:
+            self.__running = False
+            self.__exposing = False
+            self.__cond.notify_all()
+
+    @property
+    def accumulated_dose(self):
+        return self.__dose
+
+    @property
+    def time_to_refresh(self):
+        # s, 0 when due: estimated from the mean dose rate for the dose
+        now = time.monotonic()
+        with self.__cond:
+            elapsed = now - self.__last_refresh
+            dose = self.__dose
+        remaining = float("inf")
+        if self.period > 0:
+            remaining = self.period - elapsed
+        if self.dose > 0 and dose > 0 and elapsed > 0:
+            remaining = min(remaining, (self.dose - dose) * elapsed / dose)
+        return max(0.0, remaining)
+
+    def __due(self):
+        if time.monotonic() < self.__retry_at:
+            return False
+        if self.period > 0 and time.monotonic() - self.__last_refresh >= self.period:
+            return True
+        return self.dose > 0 and self.__dose >= self.dose
+
+    def __idle(self):
+        if not self.__running:
+            return True
+        return self.between_frames and self.__frame_gaps and not self.__exposing
+
+    def __run(self):
+        while True:
+            with self.__cond:
+                self.__cond.wait(self.__poll)
+                if self.__stop:
+                    return
+                if not self.__due():
+                    continue
+                if not self.__idle():
+                    if not self.__was_due:
+                        self.__was_due = True
+                        self.nb_deferred += 1
+                    continue
+                self.__refreshing = True
+            t0 = time.perf_counter()
+            error = None
+            try:
+                with tracer.span("sensor refresh", "sdk"):
+                    rc = self.__detector.doSensorRefresh()
+                if isinstance(rc, int) and rc < 0:
+                    raise RuntimeError(f"doSensorRefresh failed ({rc})")
+            except Exception as e:
+                error = e
+            t1 = time.perf_counter()
+            with self.__cond:
+                self.refresh_duration = t1 - t0
+                self.error = error
+                if error is None:
+                    self.nb_refreshes += 1
+                    self.__last_refresh = time.monotonic()
+                    self.__dose = 0.0
+                    self.__was_due = False
+                else:
+                    # still due, retried later
+                    self.nb_failures += 1
+                    self.__retry_at = time.monotonic() + self.retry_delay
+                self.__refreshing = False
+                self.__cond.notify_all()
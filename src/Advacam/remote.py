@@ -0,0 +1,596 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+# Out of process pixet SDK: a worker process owns pypixet and the real
+# Camera, RemoteCamera is a proxy with the same API living in the device
+# server. Control calls go through a multiprocessing Pipe, frames come back
+# through a SharedFrameRing.
+#
+# This module must not import .acquisition: that would start pypixet in
+# the device server process.
+
+import os
+import time
+import uuid
+import weakref
+import builtins
+import threading
+import multiprocessing
+
+from Lima import Core
+
+from .listener import FrameListener
+from .shm_ring import SharedFrameRing, SharedFrameRingReader
+from .statistics import AcqStatistics
+
+PLAIN_TYPES = (bool, int, float, str)
+
+# settings changing the image size or type
+IMAGE_SETTINGS = (
+    "counter_output",
+    "setCounterOutput",
+    "energy_map",
+    "setEnergyMap",
+    "counter_depth",
+    "setCounterDepth",
+)
+
+
+def _is_plain(value):
+    # only values which can be unpickled without importing pypixet
+    if isinstance(value, PLAIN_TYPES):
+        return True
+    if isinstance(value, (list, tuple)):
+        return all(_is_plain(v) for v in value)
+    if isinstance(value, dict):
+        return all(_is_plain(k) and _is_plain(v) for k, v in value.items())
+    return False
+
+
+def _describe(camera):
+    constants = {}
+    methods = []
+    properties = []
+    cls = type(camera)
+    for name in dir(cls):
+        if name.startswith("_"):
+            continue
+        attr = getattr(cls, name)
+        if isinstance(attr, property):
+            properties.append(name)
+        elif callable(attr):
+            methods.append(name)
+        elif _is_plain(attr):
+            constants[name] = attr
+    for name, value in vars(camera).items():
+        if not name.startswith("_") and _is_plain(value):
+            constants[name] = value
+    constants["model_name"] = camera.model.name
+    return constants, methods, properties
+
+
+class _EndNotifier(FrameListener):
+    # the end of the acquisitions sent to the device server, with the
+    # number of frames published: they are all in the ring before
+    def __init__(self, camera, conn):
+        self.__camera = camera
+        self.__conn = conn
+        self.__lock = threading.Lock()
+
+    def endAcq(self):
+        with self.__lock:
+            try:
+                self.__conn.send(("endAcq", self.__camera.publishedFrames))
+            except OSError:
+                pass
+
+
+def _worker_main(conn, events, config_file, device_id):
+    from .acquisition import Camera
+
+    try:
+        camera = Camera(config_file, device_id)
+    except Exception as e:
+        conn.send(("error", (type(e).__name__, str(e))))
+        return
+    conn.send(("ok", _describe(camera)))
+    camera.registerFrameListener(_EndNotifier(camera, events))
+
+    ring = None
+    while True:
+        try:
+            op, name, args = conn.recv()
+        except EOFError:
+            break
+        if op == "quit":
+            break
+        try:
+            if op == "get":
+                value = getattr(camera, name)
+            elif op == "set":
+                setattr(camera, name, args)
+                value = None
+            elif op == "call":
+                value = getattr(camera, name)(*args)
+            elif op == "status":
+                value = (
+                    camera.getStatus(),
+                    camera.acquiredFrames,
+                    camera.getSdkDroppedFrames(),
+                    camera.publishedFrames,
+                    camera.getIngestDroppedFrames(),
+                )
+            elif op == "thresholdScanResult":
+                scan = camera.threshold_scan
+                if scan is None:
+                    raise RuntimeError("No threshold scan")
+                if scan.error is not None:
+                    raise scan.error
+                value = (scan.counts, scan.edge, scan.width)
+            elif op == "ring":
+                ring = SharedFrameRing(name, create=False)
+                camera.registerFrameListener(ring)
+                value = None
+            else:
+                raise ValueError(f"Unknown request {op}")
+            reply = ("ok", value)
+        except Exception as e:
+            reply = ("error", (type(e).__name__, str(e)))
+        conn.send(reply)
+
+    if ring is not None:
+        camera.unregisterFrameListener(ring)
+        ring.close()
+    camera.quit()
+
+
+def _rebuild_exception(error):
+    name, msg = error
+    exc_type = getattr(builtins, name, None)
+    if not (isinstance(exc_type, type) and issubclass(exc_type, Exception)):
+        exc_type = RuntimeError
+        msg = f"{name}: {msg}"
+    return exc_type(msg)
+
+
+class RemoteCamera:
+    """Camera proxy, the pixet SDK runs in a separate worker process.
+
+    Properties and methods of the remote Camera are forwarded, the
+    settings are replayed when the worker is restarted with restartWorker().
+    Requests not answered in timeout s (stop_timeout s for the stop calls,
+    which join the acquisition thread) mark the worker as wedged.
+    """
+
+    Core.DEB_CLASS(Core.DebModCamera, "Advacam.RemoteCamera")
+
+    ERROR, READY, RUNNING = range(3)
+
+    @Core.DEB_MEMBER_FUNCT
+    def __init__(
+        self,
+        config_file=None,
+        device_id="",
+        buffer_ctrl=None,
+        nb_slots=64,
+        timeout=10.0,
+        startup_timeout=120.0,
+        stop_timeout=60.0,
+    ):
+        self.__config_file = config_file
+        self.__device_id = device_id
+        self.__timeout = timeout
+        self.__startup_timeout = startup_timeout
+        self.__stop_timeout = stop_timeout
+        self.__lock = threading.Lock()
+        self.__ctx = multiprocessing.get_context("spawn")
+        self.__process = None
+        self.__conn = None
+        self.__events = None
+        self.__wedged = False
+        self.__constants = {}
+        self.__methods = ()
+        self.__properties = ()
+        self.__settings = {}
+
+        self.__cond = threading.Condition()
+        self.__acquired_frames = 0
+        self.__worker_ingest_dropped = 0
+        # published frames of the ended worker acquisition, None while running
+        self.__end_lock = threading.Lock()
+        self.__end_at = None
+        self.__buffer_mgr = None
+        self.__frame_listeners = ()
+        self.__image_changed_callbacks = ()
+        self.__statistics = AcqStatistics()
+        if buffer_ctrl:
+            self.__buffer_ctrl = weakref.ref(buffer_ctrl)
+        else:
+            self.__buffer_ctrl = None
+
+        self.__startWorker()
+
+        # the ring is owned by the device server, it survives worker restarts
+        slot_size = self.width * self.height * 4 * 2
+        self.__ring_name = f"advacam_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        self.__ring = SharedFrameRing(self.__ring_name, nb_slots, slot_size)
+        self.__reader = SharedFrameRingReader(self.__ring_name)
+        self._request("ring", self.__ring_name)
+
+        self.__pump_stop = threading.Event()
+        self.__pump = threading.Thread(target=self.__pumpFrames, daemon=True)
+        self.__pump.start()
+
+    def __startWorker(self):
+        parent_conn, child_conn = self.__ctx.Pipe()
+        # worker events, not mixed with the request answers
+        events, child_events = self.__ctx.Pipe(duplex=False)
+        process = self.__ctx.Process(
+            target=_worker_main,
+            args=(child_conn, child_events, self.__config_file, self.__device_id),
+            name="AdvacamPixetWorker",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        child_events.close()
+        if not parent_conn.poll(self.__startup_timeout):
+            process.kill()
+            events.close()
+            raise RuntimeError("Pixet worker did not start")
+        status, value = parent_conn.recv()
+        if status == "error":
+            process.join()
+            events.close()
+            raise _rebuild_exception(value)
+        constants, methods, properties = value
+        self.__constants = constants
+        self.__methods = tuple(methods)
+        self.__properties = tuple(properties)
+        self.__process = process
+        self.__conn = parent_conn
+        self.__events = events
+        self.__wedged = False
+
+    def __stopWorker(self, timeout=5.0):
+        process = self.__process
+        if process is None:
+            return
+        if not self.__wedged:
+            try:
+                self.__conn.send(("quit", None, None))
+            except OSError:
+                pass
+            process.join(timeout)
+        if process.is_alive():
+            process.terminate()
+            process.join(timeout)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        self.__conn.close()
+        self.__events.close()
+        self.__process = None
+        self.__conn = None
+        self.__events = None
+
+    @Core.DEB_MEMBER_FUNCT
+    def restartWorker(self):
+        with self.__lock:
+            self.__stopWorker()
+            self.__startWorker()
+        self._request("ring", self.__ring_name)
+        for (op, name), args in list(self.__settings.items()):
+            self._request(op, name, args)
+
+    @property
+    def worker_pid(self):
+        return self.__process.pid if self.__process else None
+
+    def _request(self, op, name, args=None, timeout=None):
+        if timeout is None:
+            timeout = self.__timeout
+        with self.__lock:
+            if self.__process is None or not self.__process.is_alive():
+                raise RuntimeError("Pixet worker is not running, use restartWorker()")
+            if self.__wedged:
+                raise RuntimeError("Pixet worker is not responding, use restartWorker()")
+            self.__conn.send((op, name, args))
+            if not self.__conn.poll(timeout):
+                # a late answer would shift all the next ones
+                self.__wedged = True
+                raise RuntimeError(
+                    f"Pixet worker did not answer to {name} in {timeout} s"
+                )
+            status, value = self.__conn.recv()
+        if status == "error":
+            raise _rebuild_exception(value)
+        if op == "set" or (op == "call" and name.startswith("set")):
+            # keep the last value, moved at the end to respect the order
+            self.__settings.pop((op, name), None)
+            self.__settings[(op, name)] = args
+            if name in IMAGE_SETTINGS:
+                for cb in self.__image_changed_callbacks:
+                    cb()
+        return value
+
+    def __getattr__(self, name):
+        # only called for names which are not RemoteCamera attributes
+        d = self.__dict__
+        if name in d.get("_RemoteCamera__constants", {}):
+            return d["_RemoteCamera__constants"][name]
+        if name in d.get("_RemoteCamera__properties", ()):
+            return self._request("get", name)
+        if name in d.get("_RemoteCamera__methods", ()):
+            return lambda *args: self._request("call", name, args)
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name in self.__dict__.get("_RemoteCamera__properties", ()):
+            self._request("set", name, value)
+        else:
+            object.__setattr__(self, name, value)
+
+    ###############################
+    # Local part of the acquisition
+    ###############################
+    @property
+    def buffer_ctrl(self):
+        return self.__buffer_ctrl() if self.__buffer_ctrl else None
+
+    @property
+    def acquiredFrames(self):
+        return self.__acquired_frames
+
+    @property
+    def statistics(self):
+        return self.__statistics
+
+    def getFps(self):
+        return self.__statistics.fps
+
+    def getFramesAcquired(self):
+        return self.__statistics.frames_acquired
+
+    def getFramesDropped(self):
+        return self.__statistics.frames_dropped
+
+    def getCallbackLatencyP99(self):
+        return self.__statistics.latency_p99
+
+    def getSdkDroppedFrames(self):
+        return self.__statistics.sdk_dropped
+
+    def getIngestDroppedFrames(self):
+        return self.__statistics.ingest_dropped
+
+    def getOverrunFrames(self):
+        return self.__statistics.overrun
+
+    def registerImageChangedCallback(self, cb):
+        if cb not in self.__image_changed_callbacks:
+            self.__image_changed_callbacks += (cb,)
+
+    def unregisterImageChangedCallback(self, cb):
+        self.__image_changed_callbacks = tuple(
+            c for c in self.__image_changed_callbacks if c != cb
+        )
+
+    def registerFrameListener(self, listener):
+        if listener not in self.__frame_listeners:
+            self.__frame_listeners += (listener,)
+
+    def unregisterFrameListener(self, listener):
+        self.__frame_listeners = tuple(
+            l for l in self.__frame_listeners if l is not listener
+        )
+
+    @Core.DEB_MEMBER_FUNCT
+    def prepareAcq(self):
+        self._request("call", "prepareAcq", ())
+        with self.__end_lock:
+            # the end of the previous acquisition, sent before the answer
+            self.__pollEvents()
+            self.__end_at = None
+            self.__reader.skip()
+            with self.__cond:
+                self.__acquired_frames = 0
+                self.__cond.notify_all()
+            if self.buffer_ctrl:
+                self.__buffer_mgr = self.buffer_ctrl.getBuffer()
+            else:
+                self.__buffer_mgr = None
+            for listener in self.__frame_listeners:
+                listener.prepareAcq()
+            # after the worker one, not to take its previous SDK drops again
+            self.__statistics.reset()
+            self.__worker_ingest_dropped = 0
+
+    @Core.DEB_MEMBER_FUNCT
+    def startAcq(self):
+        if self.__acquired_frames == 0 and self.__buffer_mgr:
+            self.__buffer_mgr.setStartTimestamp(Core.Timestamp.now())
+        self._request("call", "startAcq", ())
+
+    @Core.DEB_MEMBER_FUNCT
+    def stopAcq(self):
+        # the local end comes with the worker end event
+        self._request("call", "stopAcq", (), self.__stop_timeout)
+
+    @Core.DEB_MEMBER_FUNCT
+    def abortThresholdScan(self):
+        self._request("call", "abortThresholdScan", (), self.__stop_timeout)
+
+    @Core.DEB_MEMBER_FUNCT
+    def thresholdScan(self, thresholds, expo_time, check_period=0.1):
+        # polled: a scan lasts longer than the request timeout
+        self._request("call", "startThresholdScan", (thresholds, expo_time))
+        while self._request("call", "getThresholdScanRunning", ()):
+            time.sleep(check_period)
+        return self._request("thresholdScanResult", None)
+
+    @Core.DEB_MEMBER_FUNCT
+    def getStatus(self):
+        try:
+            status, _, sdk_dropped, published_frames, ingest_dropped = self._request(
+                "status", None
+            )
+        except RuntimeError as e:
+            deb.Error(str(e))
+            return self.ERROR
+        # frames lost by the SDK are only known by the worker
+        sdk_dropped -= self.__statistics.sdk_dropped
+        if sdk_dropped > 0:
+            self.__statistics.addSdkDropped(sdk_dropped)
+        # so are the frames it failed to convert
+        if ingest_dropped > self.__worker_ingest_dropped:
+            self.__statistics.addIngestDropped(
+                ingest_dropped - self.__worker_ingest_dropped
+            )
+            self.__worker_ingest_dropped = ingest_dropped
+        # frames published by the worker but not yet in the Lima buffers,
+        # not the SDK count: lost frames are not published (gap policy)
+        if status == self.READY and self.__acquired_frames < published_frames:
+            return self.RUNNING
+        return status
+
+    def getState(self):
+        return self.getStatus(), self.__acquired_frames
+
+    @Core.DEB_MEMBER_FUNCT
+    def waitForFrame(self, nb_frames, timeout=None):
+        with self.__cond:
+            return self.__cond.wait_for(
+                lambda: self.__acquired_frames >= nb_frames, timeout
+            )
+
+    @Core.DEB_MEMBER_FUNCT
+    def waitForStatus(self, status, timeout=None, check_period=0.1):
+        # the worker status is only known by asking, it is checked again
+        # on every frame pumped and every check_period
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.getStatus() != status:
+            if deadline is None:
+                wait = check_period
+            else:
+                wait = min(check_period, deadline - time.monotonic())
+                if wait <= 0:
+                    return False
+            with self.__cond:
+                self.__cond.wait(wait)
+        return True
+
+    @Core.DEB_MEMBER_FUNCT
+    def quit(self):
+        self.__pump_stop.set()
+        self.__pump.join()
+        with self.__lock:
+            self.__stopWorker()
+        self.__reader.close()
+        self.__ring.close()
+
+    def hard_reset(self):
+        self.restartWorker()
+
+    def __pollEvents(self):
+        # under __end_lock
+        events = self.__events
+        try:
+            while events is not None and events.poll():
+                kind, value = events.recv()
+                if kind == "endAcq":
+                    self.__end_at = value
+        except (EOFError, OSError):
+            # worker stopped or restarted
+            pass
+
+    @Core.DEB_MEMBER_FUNCT
+    def __checkEnd(self, idle):
+        # the worker acquisition ended: local end once its frames are
+        # pumped, or nothing is left in the ring (lost frames)
+        with self.__end_lock:
+            self.__pollEvents()
+            end_at = self.__end_at
+            if end_at is None or (not idle and self.__acquired_frames < end_at):
+                return
+            self.__end_at = None
+            with self.__cond:
+                self.__cond.notify_all()
+            self.__statistics.endAcq()
+            for listener in self.__frame_listeners:
+                try:
+                    listener.endAcq()
+                except Exception as e:
+                    deb.Error(f"Frame listener {listener} end failed: {e}")
+
+    @Core.DEB_MEMBER_FUNCT
+    def __pumpFrames(self):
+        reader = self.__reader
+        lost = reader.lost
+        while not self.__pump_stop.is_set():
+            frame = reader.next(timeout=0.1)
+            if frame is None:
+                self.__checkEnd(True)
+                continue
+            if reader.lost != lost:
+                self.__statistics.addIngestDropped(reader.lost - lost)
+                lost = reader.lost
+            frame_id = frame.frame_id
+            buffer_mgr = self.__buffer_mgr
+            if buffer_mgr:
+                buffer_mgr.copy_data(frame_id, frame.data)
+            if not frame.valid:
+                deb.Error(f"Frame {frame_id} overwritten in the ring, increase nb_slots")
+                self.__statistics.addIngestDropped(1)
+                with self.__cond:
+                    self.__acquired_frames = frame_id + 1
+                    self.__cond.notify_all()
+                self.__checkEnd(False)
+                continue
+            if buffer_mgr:
+                frame_info = Core.HwFrameInfoType()
+                frame_info.acq_frame_nb = frame_id
+                frame_info.frame_timestamp = Core.Timestamp.now()
+                if not buffer_mgr.newFrameReady(frame_info):
+                    deb.Error(f"Frame {frame_id} refused by Lima (buffer overrun)")
+                    self.__statistics.addOverrun(1)
+
+            listeners = self.__frame_listeners
+            if listeners:
+                try:
+                    data = frame.copy()
+                except RuntimeError as e:
+                    deb.Error(str(e))
+                    listeners = ()
+                for listener in listeners:
+                    try:
+                        listener.newFrame(frame_id, data, frame.timestamp)
+                    except Exception as e:
+                        deb.Error(f"Frame listener {listener} failed: {e}")
+            with self.__cond:
+                self.__acquired_frames = frame_id + 1
+                self.__cond.notify_all()
+            # latency from the worker callback to the Lima buffers
+            self.__statistics.newFrame(time.time() - frame.timestamp)
+            self.__checkEnd(False)
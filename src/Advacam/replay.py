@@ -0,0 +1,312 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import time
+import threading
+
+from .recorder import RecordingReader
+
+
+class ReplayFrame:
+    # stands for a pypixet frame (or subframe), device counts the
+    # references taken on the frames until destroy()
+    def __init__(self, record, index=0, device=None):
+        self.__record = record
+        self.__index = index
+        self.__device = device
+
+    def subFrames(self):
+        record = self.__record
+        if not record.has_subframes:
+            return []
+        return [ReplayFrame(record, i) for i in range(len(record.subframes))]
+
+    def data(self):
+        return self.__record.subframes[self.__index].data
+
+    def frameName(self):
+        return self.__record.subframes[self.__index].name
+
+    def frameType(self):
+        return self.__record.subframes[self.__index].frame_type
+
+    def destroy(self):
+        device, self.__device = self.__device, None
+        if device is not None:
+            device._frameReleased()
+
+
+class ReplayDevice:
+    """pypixet device replaying a FrameRecorder file.
+
+    Implements the part of the device API used by the Camera, the frames
+    go through the Camera callback as the detector ones: doAdvancedAcquisition
+    fires the registered events at the recorded timing (realtime) or as
+    fast as possible, waiting for doSoftwareTrigger in the triggered mode.
+    The SDK frame counter gaps of the recording are reproduced. The
+    recording is replayed in a loop. open_frames counts the frame
+    references taken and not destroyed yet.
+    """
+
+    def __init__(self, path, trigger_mode_multi, realtime=True):
+        self.__reader = RecordingReader(path)
+        self.__records = list(self.__reader.frames())
+        if not self.__records:
+            raise ValueError(f"No frame in {path}")
+        self.__info = dict(self.__reader.header)
+        self.recorded_operation_mode = self.__info["operationMode"]
+        self.__trigger_mode_multi = trigger_mode_multi
+        self.realtime = realtime
+        self.__callbacks = {}
+        self.__cond = threading.Condition()
+        self.__nb_triggers = 0
+        self.__abort = False
+        self.__position = 0
+        self.__current = None
+        self.__acq_frames = []
+        self.__refs_lock = threading.Lock()
+        self.__armed = False
+        self.open_frames = 0
+
+    # device description
+    def deviceType(self):
+        return self.__info["deviceType"]
+
+    def deviceID(self):
+        return self.__info["deviceID"]
+
+    def fullName(self):
+        return self.__info["fullName"]
+
+    def width(self):
+        return self.__info["width"]
+
+    def height(self):
+        return self.__info["height"]
+
+    def pixelCount(self):
+        return self.__info["width"] * self.__info["height"]
+
+    def chipCount(self):
+        return self.__info["chipCount"]
+
+    def chipIDs(self):
+        return self.__info["chipIDs"]
+
+    def loadConfigFromFile(self, config_file):
+        pass
+
+    def operationMode(self):
+        return self.__info["operationMode"]
+
+    def setOperationMode(self, mode):
+        if self.__info["model"] == "TPX_MPX":
+            # as the Timepix (MPX mode) devices
+            raise AttributeError("setOperationMode")
+        self.__info["operationMode"] = mode
+
+    def pixCfg(self):
+        return self
+
+    def setModeAll(self, mode):
+        pass
+
+    def counterDepth(self):
+        return self.__info.get("counterDepth", 2)
+
+    def setCounterDepth(self, depth):
+        self.__info["counterDepth"] = depth
+
+    def threshold(self, *args):
+        # (chip, flag) for TPX3, (chip, index, flag) for MPX3
+        index = args[1] if len(args) == 3 else 0
+        return self.__info[f"threshold{index}"]
+
+    def setThreshold(self, *args):
+        index = args[1] if len(args) == 4 else 0
+        self.__info[f"threshold{index}"] = args[-2]
+
+    def bias(self):
+        return self.__info["bias"]
+
+    def setBias(self, value):
+        self.__info["bias"] = value
+
+    def biasVoltageSense(self):
+        return self.__info["bias"]
+
+    def biasCurrentSense(self):
+        return 0.0
+
+    def temperature(self):
+        return self.__info["temperature"]
+
+    def isSensorRefreshSupported(self):
+        return 0
+
+    # acquisition
+    def registerEvent(self, event, callback, user_data):
+        self.__callbacks[callback] = event
+
+    def unregisterEvent(self, event, callback, user_data):
+        self.__callbacks.pop(callback, None)
+
+    def __frameRef(self, record):
+        with self.__refs_lock:
+            self.open_frames += 1
+        return ReplayFrame(record, device=self)
+
+    def _frameReleased(self):
+        with self.__refs_lock:
+            self.open_frames -= 1
+
+    def lastAcqFrameRefInc(self):
+        return self.__frameRef(self.__current)
+
+    def acqFrameCount(self):
+        return len(self.__acq_frames)
+
+    def acqFrameRefInc(self, index):
+        # None for the frames lost in the recording
+        record = self.__acq_frames[index]
+        return self.__frameRef(record) if record is not None else None
+
+    def isReadyForSoftwareTrigger(self, index):
+        return self.__armed
+
+    def doSoftwareTrigger(self, index):
+        with self.__cond:
+            self.__nb_triggers += 1
+            self.__cond.notify_all()
+        return 0
+
+    def abortOperation(self):
+        with self.__cond:
+            self.__abort = True
+            self.__cond.notify_all()
+        return 0
+
+    def doAdvancedAcquisition(
+        self, nb_frames, expo_time, acq_type, trigger_mode, file_type, file_flags, file_name
+    ):
+        triggered = trigger_mode == self.__trigger_mode_multi
+        with self.__cond:
+            self.__abort = False
+            self.__nb_triggers = 0
+        self.__acq_frames = []
+        self.__armed = triggered
+        try:
+            return self.__acquire(nb_frames, triggered)
+        finally:
+            self.__armed = False
+
+    def __acquire(self, nb_frames, triggered):
+        records = self.__records
+        start = time.monotonic()
+        first = previous = None
+        value = 0
+        for i in range(nb_frames):
+            record = records[self.__position]
+            self.__position = (self.__position + 1) % len(records)
+            if first is None or record.monotonic < previous.monotonic:
+                # start (or loop back to the start) of the recording
+                start = time.monotonic()
+                first = record
+            with self.__cond:
+                if triggered:
+                    self.__cond.wait_for(
+                        lambda: self.__abort or self.__nb_triggers > i
+                    )
+                elif self.realtime:
+                    delay = start + record.monotonic - first.monotonic
+                    self.__cond.wait_for(
+                        lambda: self.__abort, delay - time.monotonic()
+                    )
+                if self.__abort:
+                    return -1
+            # recorded counter gaps (lost frames) are kept
+            step = record.value - previous.value if previous is not None else 1
+            value += step if step > 0 else 1
+            previous = record
+            self.__current = record
+            self.__acq_frames += [None] * (value - 1 - len(self.__acq_frames))
+            self.__acq_frames.append(record)
+            for callback in list(self.__callbacks):
+                callback(value)
+        return 0
+
+    def close(self):
+        # no record may keep a view on the mapped file
+        self.__current = None
+        self.__acq_frames = []
+        self.__records = None
+        self.__reader.close()
+
+
+class ReplaySdk:
+    """Stands for the pypixet module where the pixet SDK is not installed.
+
+    Only a ReplayDevice can be used then: no device is found and the pixet
+    constants used by the Camera get stand-in values, distinct within each
+    group. A recording stores the SDK operation mode value: replay the
+    detector recordings where the SDK is installed, the synthetic ones
+    made with Camera constants replay with or without it.
+    """
+
+    class pixet:
+        PX_THLFLG_ENERGY = 1
+
+        PX_TPX3_OPM_TOATOT = 0
+        PX_TPX3_OPM_TOA = 1
+        PX_TPX3_OPM_EVENT_ITOT = 2
+        PX_TPX3_OPM_TOT_NOTOA = 3
+
+        PX_MPX3_OPM_SPM_1CH = 0
+        PX_MPX3_OPM_SPM_2CH = 1
+        PX_MPX3_OPM_CSM = 2
+
+        PX_MPX3_GAIN_SUPER_NARROW = 0
+        PX_MPX3_GAIN_NARROW = 1
+        PX_MPX3_GAIN_BROAD = 2
+
+        PX_TPXMODE_MEDIPIX = 0
+
+        PX_ACQMODE_NORMAL = 0
+        PX_ACQMODE_TRG_SWSTART = 4
+
+        PX_ACQTYPE_FRAMES = 1
+        PX_FTYPE_AUTODETECT = 0
+        PX_EVENT_ACQ_FINISHED = "AcqFinished"
+
+        @staticmethod
+        def devices():
+            return []
+
+    @staticmethod
+    def start():
+        pass
+
+    @staticmethod
+    def exit():
+        pass
@@ -0,0 +1,166 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+
+import time
+import threading
+
+import numpy
+
+from .listener import FrameListener
+
+
+class RoiCounters(FrameListener):
+    """Sum and hit count (pixels > 0) of many ROIs, computed per frame.
+
+    Rectangles (x, y, width, height), x being the column, are read from
+    the integral images of the frame and of its hits: 4 lookups each,
+    vectorized over all the rectangles, so the cost does not depend on
+    their number or size. Mask ROIs are precomputed flat index sets,
+    reduced with one numpy.add.reduceat for all of them.
+
+    The results of the last nb_slots frames are kept in a preallocated
+    ring: frame id, timestamp, one sum and one count per ROI (rectangles
+    first, then masks).
+    """
+
+    def __init__(self, nb_slots=10000, auto_reset=True):
+        if nb_slots < 1:
+            raise ValueError("nb_slots must be positive")
+        self.__nb_slots = nb_slots
+        self.__auto_reset = auto_reset
+        self.__lock = threading.Lock()
+        self.__rects = numpy.zeros((0, 4), dtype=numpy.intp)
+        self.__mask_index = numpy.zeros(0, dtype=numpy.intp)
+        self.__mask_starts = numpy.zeros(0, dtype=numpy.intp)
+        self.__mask_size = None
+        self.__integral = None
+        self.__hits = None
+        self.names = ()
+        self.last_update_time = 0.0
+        self.__allocate()
+
+    @property
+    def nb_rois(self):
+        return len(self.names)
+
+    def setRois(self, rects=(), masks=None):
+        """rects: [(x, y, width, height)], masks: {name: boolean mask}"""
+        rects = numpy.asarray(rects, dtype=numpy.intp).reshape(-1, 4)
+        if (rects[:, 2:] <= 0).any() or (rects[:, :2] < 0).any():
+            raise ValueError("Invalid rectangle")
+        masks = masks or {}
+        indices = [numpy.flatnonzero(masks[name]) for name in masks]
+        if any(not len(index) for index in indices):
+            raise ValueError("Empty mask")
+        sizes = {numpy.size(masks[name]) for name in masks}
+        if len(sizes) > 1:
+            raise ValueError("Masks of different sizes")
+        names = tuple(f"rect{i}" for i in range(len(rects))) + tuple(masks)
+        with self.__lock:
+            # x0, y0, x1, y1 in the integral image
+            self.__rects = numpy.column_stack(
+                (rects[:, 0], rects[:, 1], rects[:, 0] + rects[:, 2], rects[:, 1] + rects[:, 3])
+            )
+            if indices:
+                self.__mask_index = numpy.concatenate(indices)
+                self.__mask_starts = numpy.cumsum([0] + [len(i) for i in indices[:-1]])
+                self.__mask_size = sizes.pop()
+            else:
+                self.__mask_index = numpy.zeros(0, dtype=numpy.intp)
+                self.__mask_starts = numpy.zeros(0, dtype=numpy.intp)
+                self.__mask_size = None
+            self.names = names
+            self.__allocate()
+
+    def reset(self):
+        with self.__lock:
+            self.__allocate()
+
+    def __allocate(self):
+        nb_slots, nb_rois = self.__nb_slots, len(self.names)
+        self.__frame_ids = numpy.full(nb_slots, -1, dtype=numpy.int64)
+        self.__timestamps = numpy.zeros(nb_slots, dtype=numpy.float64)
+        self.__sums = numpy.zeros((nb_slots, nb_rois), dtype=numpy.float64)
+        self.__counts = numpy.zeros((nb_slots, nb_rois), dtype=numpy.int64)
+        self.nb_frames = 0
+
+    def prepareAcq(self):
+        if self.__auto_reset:
+            self.reset()
+
+    def __integrals(self, data):
+        shape = (data.shape[0] + 1, data.shape[1] + 1)
+        if self.__integral is None or self.__integral.shape != shape:
+            self.__integral = numpy.zeros(shape, dtype=numpy.float64)
+            self.__hits = numpy.zeros(shape, dtype=numpy.int64)
+        integral, hits = self.__integral, self.__hits
+        numpy.cumsum(data, axis=0, out=integral[1:, 1:])
+        numpy.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+        numpy.cumsum(data > 0, axis=0, out=hits[1:, 1:])
+        numpy.cumsum(hits[1:, 1:], axis=1, out=hits[1:, 1:])
+        return integral, hits
+
+    def newFrame(self, frame_id, data, timestamp):
+        t0 = time.perf_counter()
+        with self.__lock:
+            slot = self.nb_frames % self.__nb_slots
+            sums, counts = self.__sums[slot], self.__counts[slot]
+            rects = self.__rects
+            nb_rects = len(rects)
+            if nb_rects:
+                integral, hits = self.__integrals(data)
+                x0, y0, x1, y1 = rects.T
+                # out of frame rectangles clipped by the integral image
+                h, w = data.shape
+                x0, x1 = numpy.minimum(x0, w), numpy.minimum(x1, w)
+                y0, y1 = numpy.minimum(y0, h), numpy.minimum(y1, h)
+                for table, out in ((integral, sums), (hits, counts)):
+                    out[:nb_rects] = (
+                        table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+                    )
+            if len(self.__mask_starts) and data.size == self.__mask_size:
+                values = data.reshape(-1)[self.__mask_index]
+                starts = self.__mask_starts
+                sums[nb_rects:] = numpy.add.reduceat(values, starts, dtype=numpy.float64)
+                counts[nb_rects:] = numpy.add.reduceat(values > 0, starts, dtype=numpy.int64)
+            self.__frame_ids[slot] = frame_id
+            self.__timestamps[slot] = timestamp
+            self.nb_frames += 1
+        self.last_update_time = time.perf_counter() - t0
+
+    def read(self, after=-1):
+        """(frame_ids, timestamps, sums, counts) of the frames in the ring
+        with an id above after, in acquisition order (copies)."""
+        with self.__lock:
+            nb = min(self.nb_frames, self.__nb_slots)
+            first = self.nb_frames - nb
+            order = numpy.arange(first, self.nb_frames) % self.__nb_slots
+            order = order[self.__frame_ids[order] > after]
+            return (
+                self.__frame_ids[order],
+                self.__timestamps[order],
+                self.__sums[order],
+                self.__counts[order],
+            )
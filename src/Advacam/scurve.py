@@ -0,0 +1,77 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import numpy
+
+
+def fit_scurves(thresholds, counts):
+    """Per pixel S-curve edge position and width of a threshold scan.
+
+    counts[i] is the image taken at thresholds[i]. The S-curve of a pixel is
+    an error function, so its derivative is a gaussian: the edge is the
+    mean and the width the standard deviation of the derivative, computed
+    from its moments with one vectorized pass per threshold step (no
+    per pixel loop, no (n, height, width) float temporary).
+
+    Pixels without any count change get NaN.
+    """
+    thresholds = numpy.asarray(thresholds, dtype=numpy.float64)
+    if thresholds.ndim != 1 or len(thresholds) != len(counts):
+        raise ValueError("One image per threshold is needed")
+    if len(thresholds) < 2:
+        raise ValueError("At least 2 thresholds are needed")
+    order = numpy.argsort(thresholds)
+    thresholds = thresholds[order]
+
+    shape = counts.shape[1:]
+    # integral spectrum: counts decrease when the threshold increases,
+    # unless scanning up in the noise: follow the global trend per pixel
+    first = counts[order[0]].astype(numpy.float32)
+    last = counts[order[-1]].astype(numpy.float32)
+    sign = numpy.where(first >= last, 1.0, -1.0).astype(numpy.float32)
+
+    s0 = numpy.zeros(shape, dtype=numpy.float64)
+    s1 = numpy.zeros(shape, dtype=numpy.float64)
+    s2 = numpy.zeros(shape, dtype=numpy.float64)
+    step = numpy.empty(shape, dtype=numpy.float32)
+    prev = first
+    for i in range(1, len(thresholds)):
+        curr = counts[order[i]].astype(numpy.float32)
+        # derivative between two steps, noise going the wrong way ignored
+        numpy.subtract(prev, curr, out=step)
+        step *= sign
+        numpy.maximum(step, 0, out=step)
+        center = 0.5 * (thresholds[i - 1] + thresholds[i])
+        s0 += step
+        s1 += center * step
+        s2 += center * center * step
+        prev = curr
+
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        edge = s1 / s0
+        width = numpy.sqrt(numpy.maximum(s2 / s0 - edge * edge, 0))
+    invalid = s0 == 0
+    edge[invalid] = numpy.nan
+    width[invalid] = numpy.nan
+    return edge.astype(numpy.float32), width.astype(numpy.float32)
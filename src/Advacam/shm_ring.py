@@ -0,0 +1,302 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+# Shared memory layout:
+#
+#   ring header (64 bytes) | slot 0 header (64 bytes) | slot 0 data | slot 1 ...
+#
+# Each slot header holds a sequence number used as a seqlock: it is odd while
+# the writer fills the slot and 2 * (n + 1) once the n-th frame written in the
+# ring is complete. A reader checks it before and after using the data to know
+# if the slot has been overwritten in between.
+
+import sys
+import time
+
+import numpy
+from multiprocessing import shared_memory
+
+from .listener import FrameListener
+
+RING_MAGIC = b"ADVRING"
+RING_VERSION = 1
+
+RING_HEADER_DTYPE = numpy.dtype(
+    {
+        "names": ["magic", "version", "nb_slots", "slot_size", "write_seq"],
+        "formats": ["S8", "<u4", "<u4", "<u8", "<u8"],
+        "itemsize": 64,
+    }
+)
+
+SLOT_HEADER_DTYPE = numpy.dtype(
+    {
+        "names": ["seq", "frame_id", "timestamp", "dtype", "ndim", "shape", "nbytes"],
+        "formats": ["<u8", "<i8", "<f8", "S8", "<u4", ("<u4", (3,)), "<u8"],
+        "itemsize": 64,
+    }
+)
+
+ALIGNMENT = 64
+
+# rings created by this process, still registered to its resource tracker
+_owned = set()
+
+
+def _slot_stride(slot_size):
+    size = SLOT_HEADER_DTYPE.itemsize + slot_size
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _attach(name):
+    # the segment is only unlinked by its owner: the resource tracker of an
+    # attached process must not unlink it when this process exits
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if shm._name not in _owned:
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _check_header(header, name):
+    if header["magic"].item() != RING_MAGIC:
+        raise RuntimeError(f"{name} is not an Advacam frame ring")
+    if int(header["version"]) != RING_VERSION:
+        raise RuntimeError(f"Unsupported ring version {header['version']}")
+
+
+class _Ring:
+    def __init__(self, shm):
+        self._shm = shm
+        buf = shm.buf
+        self._header = numpy.ndarray((), dtype=RING_HEADER_DTYPE, buffer=buf)
+
+    def _map_slots(self, nb_slots, slot_size):
+        buf = self._shm.buf
+        stride = _slot_stride(slot_size)
+        offset = RING_HEADER_DTYPE.itemsize
+        self._slots = numpy.ndarray(
+            (nb_slots,),
+            dtype=SLOT_HEADER_DTYPE,
+            buffer=buf,
+            offset=offset,
+            strides=(stride,),
+        )
+        self._data = [
+            numpy.ndarray(
+                (slot_size,),
+                dtype=numpy.uint8,
+                buffer=buf,
+                offset=offset + i * stride + SLOT_HEADER_DTYPE.itemsize,
+            )
+            for i in range(nb_slots)
+        ]
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def nb_slots(self):
+        return int(self._header["nb_slots"])
+
+    @property
+    def slot_size(self):
+        return int(self._header["slot_size"])
+
+    @property
+    def write_seq(self):
+        return int(self._header["write_seq"])
+
+
+class SharedFrameRing(_Ring, FrameListener):
+    """Mirror the published frames into a multiprocessing.shared_memory ring.
+
+    slot_size is the max frame size in bytes, readers of other processes
+    attach with SharedFrameRingReader(name).
+    """
+
+    def __init__(self, name=None, nb_slots=16, slot_size=256 * 256 * 4, create=True):
+        self.__owner = create
+        if not create:
+            # take over the writing of an existing ring (e.g. created by
+            # another process), its geometry is read from the header
+            shm = _attach(name)
+            _Ring.__init__(self, shm)
+            _check_header(self._header, name)
+            self._map_slots(self.nb_slots, self.slot_size)
+            return
+        if nb_slots < 2:
+            raise ValueError("Invalid number of slots, must be >= 2")
+        size = RING_HEADER_DTYPE.itemsize + nb_slots * _slot_stride(slot_size)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _owned.add(shm._name)
+        _Ring.__init__(self, shm)
+        self._header["magic"] = RING_MAGIC
+        self._header["version"] = RING_VERSION
+        self._header["nb_slots"] = nb_slots
+        self._header["slot_size"] = slot_size
+        self._header["write_seq"] = 0
+        self._map_slots(nb_slots, slot_size)
+        self._slots["seq"] = 0
+
+    def close(self):
+        if self._shm is None:
+            return
+        del self._header, self._slots, self._data
+        self._shm.close()
+        if self.__owner:
+            _owned.discard(self._shm._name)
+            self._shm.unlink()
+        self._shm = None
+
+    def newFrame(self, frame_id, data, timestamp):
+        if data.nbytes > self.slot_size:
+            raise ValueError(
+                f"Frame of {data.nbytes} bytes does not fit in ring slots "
+                f"of {self.slot_size} bytes"
+            )
+        if data.ndim > 3:
+            raise ValueError("Only frames up to 3 dimensions are supported")
+        n = self.write_seq
+        index = n % self.nb_slots
+        slot = self._slots[index]
+
+        slot["seq"] = 2 * n + 1
+        dst = self._data[index][: data.nbytes].view(data.dtype).reshape(data.shape)
+        numpy.copyto(dst, data)
+        slot["frame_id"] = frame_id
+        slot["timestamp"] = timestamp
+        slot["dtype"] = data.dtype.str.encode()
+        slot["ndim"] = data.ndim
+        slot["shape"] = tuple(data.shape) + (1,) * (3 - data.ndim)
+        slot["nbytes"] = data.nbytes
+        slot["seq"] = 2 * n + 2
+
+        self._header["write_seq"] = n + 1
+
+
+class SharedFrame:
+    # zero-copy view on one ring slot, valid only while the writer
+    # has not reused the slot
+    def __init__(self, ring, seq, index):
+        self.__ring = ring
+        self.__seq = seq
+        slot = ring._slots[index]
+        self.__slot = slot
+        self.frame_id = int(slot["frame_id"])
+        self.timestamp = float(slot["timestamp"])
+        shape = tuple(int(d) for d in slot["shape"][: int(slot["ndim"])])
+        dtype = numpy.dtype(bytes(slot["dtype"]).decode())
+        nbytes = int(slot["nbytes"])
+        self.data = ring._data[index][:nbytes].view(dtype).reshape(shape)
+        self.data.flags.writeable = False
+
+    @property
+    def valid(self):
+        return int(self.__slot["seq"]) == 2 * self.__seq + 2
+
+    def copy(self):
+        data = self.data.copy()
+        if not self.valid:
+            raise RuntimeError(f"Frame {self.frame_id} overwritten while copied")
+        return data
+
+
+class SharedFrameRingReader(_Ring):
+    """Read the frames of a SharedFrameRing from another process.
+
+    >>> reader = SharedFrameRingReader("advacam")
+    >>> for frame in reader.frames():
+    ...     total = frame.data.sum()
+    ...     if not frame.valid:
+    ...         continue  # overwritten while being used
+    """
+
+    def __init__(self, name):
+        shm = _attach(name)
+        _Ring.__init__(self, shm)
+        _check_header(self._header, name)
+        self._map_slots(self.nb_slots, self.slot_size)
+        self.__next_seq = self.write_seq
+        self.lost = 0
+
+    def close(self):
+        if self._shm is None:
+            return
+        del self._header, self._slots, self._data
+        self._shm.close()
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def read(self, seq):
+        # return the seq-th frame written in the ring, or None if it
+        # was already overwritten
+        index = seq % self.nb_slots
+        if int(self._slots[index]["seq"]) != 2 * seq + 2:
+            return None
+        frame = SharedFrame(self, seq, index)
+        return frame if frame.valid else None
+
+    def skip(self):
+        # forget the frames written so far, next() waits for a new one
+        self.__next_seq = self.write_seq
+
+    def latest(self):
+        seq = self.write_seq - 1
+        return self.read(seq) if seq >= 0 else None
+
+    def next(self, timeout=None, poll_interval=1e-4):
+        # next frame not read yet, skipping (and counting) the overwritten ones
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            write_seq = self.write_seq
+            if write_seq - self.__next_seq > self.nb_slots:
+                self.lost += write_seq - self.nb_slots - self.__next_seq
+                self.__next_seq = write_seq - self.nb_slots
+            while self.__next_seq < write_seq:
+                seq = self.__next_seq
+                self.__next_seq += 1
+                frame = self.read(seq)
+                if frame is not None:
+                    return frame
+                self.lost += 1
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    def frames(self, timeout=None, poll_interval=1e-4):
+        while True:
+            frame = self.next(timeout, poll_interval)
+            if frame is None:
+                return
+            yield frame
@@ -0,0 +1,157 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import time
+import threading
+
+import numpy
+
+from .listener import FrameListener
+
+
+class SpectrumAccumulator(FrameListener):
+    """Cumulative ToT (or energy) spectrum of the sensor and of ROIs.
+
+    Each frame updates the histograms in place: only the hit (> 0) pixels
+    are binned, with one numpy.bincount for the whole sensor and one per
+    ROI, so the cost follows the occupancy, not the sensor size.
+    Bin i holds the values in [i * bin_width, (i + 1) * bin_width), the
+    last bin also gets the overflows. The spectra can be read (copied) or
+    reset at any time from another thread.
+    """
+
+    def __init__(self, nb_bins=1024, bin_width=1.0, auto_reset=True):
+        if nb_bins < 1 or bin_width <= 0:
+            raise ValueError("nb_bins and bin_width must be positive")
+        self.__nb_bins = int(nb_bins)
+        self.__bin_width = float(bin_width)
+        self.__auto_reset = auto_reset
+        self.__lock = threading.Lock()
+        self.__roi_names = ()
+        self.__roi_masks = ()
+        self.__spectrum = numpy.zeros(self.__nb_bins, dtype=numpy.int64)
+        self.__roi_spectra = numpy.zeros((0, self.__nb_bins), dtype=numpy.int64)
+        self.nb_frames = 0
+        self.last_update_time = 0.0
+
+    @property
+    def nb_bins(self):
+        return self.__nb_bins
+
+    @property
+    def bin_width(self):
+        return self.__bin_width
+
+    def setBinning(self, nb_bins, bin_width):
+        if nb_bins < 1 or bin_width <= 0:
+            raise ValueError("nb_bins and bin_width must be positive")
+        with self.__lock:
+            self.__nb_bins = int(nb_bins)
+            self.__bin_width = float(bin_width)
+            self.__reset()
+
+    @property
+    def bins(self):
+        # lower edge of each bin
+        return numpy.arange(self.__nb_bins) * self.__bin_width
+
+    @property
+    def roi_names(self):
+        return self.__roi_names
+
+    def setRois(self, rois, shape=None):
+        """rois: {name: boolean mask with the frame shape}, checked against
+        shape if given."""
+        names = tuple(rois)
+        masks = tuple(numpy.ascontiguousarray(rois[n], dtype=bool) for n in names)
+        shapes = {mask.shape for mask in masks}
+        if len(shapes) > 1:
+            raise ValueError("Masks of different shapes")
+        if shape is not None and shapes and shapes != {tuple(shape)}:
+            raise ValueError(
+                f"Mask shape {shapes.pop()} is not the frame shape {tuple(shape)}"
+            )
+        with self.__lock:
+            self.__roi_names = names
+            self.__roi_masks = masks
+            self.__reset()
+
+    def reset(self):
+        with self.__lock:
+            self.__reset()
+
+    def __reset(self):
+        self.__spectrum = numpy.zeros(self.__nb_bins, dtype=numpy.int64)
+        self.__roi_spectra = numpy.zeros(
+            (len(self.__roi_masks), self.__nb_bins), dtype=numpy.int64
+        )
+        self.nb_frames = 0
+
+    def spectrum(self):
+        with self.__lock:
+            return self.__spectrum.copy()
+
+    def roiSpectra(self):
+        # one row per ROI, in roi_names order
+        with self.__lock:
+            return self.__roi_spectra.copy()
+
+    def prepareAcq(self):
+        if self.__auto_reset:
+            self.reset()
+
+    def newFrame(self, frame_id, data, timestamp):
+        t0 = time.perf_counter()
+        flat = data.reshape(-1)
+        hits = numpy.flatnonzero(flat > 0)
+        values = flat[hits]
+        with self.__lock:
+            masks = self.__roi_masks
+            if masks and masks[0].size != flat.size:
+                # frame size changed since setRois
+                raise ValueError(
+                    f"Frame of {flat.size} pixels, ROI masks of {masks[0].size}"
+                )
+            nb_bins = self.__nb_bins
+            if values.dtype.kind == "f":
+                bins = (values * (1.0 / self.__bin_width)).astype(numpy.intp)
+            elif self.__bin_width == 1.0:
+                bins = values.astype(numpy.intp)
+            else:
+                bins = values // self.__bin_width
+                bins = bins.astype(numpy.intp)
+            numpy.minimum(bins, nb_bins - 1, out=bins)
+            self.__spectrum += numpy.bincount(bins, minlength=nb_bins)
+            for mask, spectrum in zip(masks, self.__roi_spectra):
+                in_roi = mask.reshape(-1)[hits]
+                spectrum += numpy.bincount(bins[in_roi], minlength=nb_bins)
+            self.nb_frames += 1
+        self.last_update_time = time.perf_counter() - t0
+
+
+def rectangle_mask(shape, x, y, width, height):
+    """Boolean mask of the (x, y, width, height) rectangle, x is the column."""
+    mask = numpy.zeros(shape, dtype=bool)
+    mask[y : y + height, x : x + width] = True
+    return mask
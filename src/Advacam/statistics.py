@@ -0,0 +1,178 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import time
+import threading
+import collections
+
+import numpy
+
+
+class AcqStatistics:
+    """Acquisition statistics updated from the frame callback.
+
+    fps is computed over the last window seconds, the latency percentile
+    over the last nb_latencies frames. Dropped frames are counted by cause:
+    lost by the SDK (gap in its frame numbering), lost in our ingest path
+    (conversion/copy failure, ring overwrite) and refused by Lima (buffer
+    overrun). The registered callbacks are called
+    with a snapshot() at most every push_period seconds, and at the end of
+    the acquisition.
+    """
+
+    def __init__(self, window=1.0, nb_latencies=1000, push_period=0.5):
+        self.__window = window
+        self.__push_period = push_period
+        self.__lock = threading.Lock()
+        self.__callbacks = ()
+        self.__frame_times = collections.deque()
+        self.__latencies = numpy.zeros(nb_latencies)
+        self.reset()
+
+    def reset(self):
+        with self.__lock:
+            self.__frames_acquired = 0
+            self.__sdk_dropped = 0
+            self.__ingest_dropped = 0
+            self.__overrun = 0
+            self.__frame_times.clear()
+            self.__first_frame = self.__last_frame = 0.0
+            self.__nb_latencies = 0
+            self.__last_push = 0
+
+    @property
+    def push_period(self):
+        return self.__push_period
+
+    @push_period.setter
+    def push_period(self, value):
+        self.__push_period = value
+
+    def registerCallback(self, cb):
+        if cb not in self.__callbacks:
+            self.__callbacks += (cb,)
+
+    def unregisterCallback(self, cb):
+        self.__callbacks = tuple(c for c in self.__callbacks if c != cb)
+
+    def newFrame(self, latency, sdk_dropped=0):
+        now = time.monotonic()
+        with self.__lock:
+            self.__frames_acquired += 1
+            self.__sdk_dropped += sdk_dropped
+            if self.__frames_acquired == 1:
+                self.__first_frame = now
+            self.__last_frame = now
+            times = self.__frame_times
+            times.append(now)
+            while times[0] < now - self.__window:
+                times.popleft()
+            latencies = self.__latencies
+            latencies[self.__nb_latencies % len(latencies)] = latency
+            self.__nb_latencies += 1
+            push = now - self.__last_push >= self.__push_period
+            if push:
+                self.__last_push = now
+        if push:
+            self.__notify()
+
+    def addSdkDropped(self, dropped):
+        with self.__lock:
+            self.__sdk_dropped += dropped
+
+    def addIngestDropped(self, dropped):
+        with self.__lock:
+            self.__ingest_dropped += dropped
+
+    def addOverrun(self, overrun):
+        with self.__lock:
+            self.__overrun += overrun
+
+    def endAcq(self):
+        self.__notify()
+
+    def __notify(self):
+        callbacks = self.__callbacks
+        if not callbacks:
+            return
+        snapshot = self.snapshot()
+        for cb in callbacks:
+            cb(snapshot)
+
+    @property
+    def frames_acquired(self):
+        return self.__frames_acquired
+
+    @property
+    def frames_dropped(self):
+        return self.__sdk_dropped + self.__ingest_dropped + self.__overrun
+
+    @property
+    def sdk_dropped(self):
+        return self.__sdk_dropped
+
+    @property
+    def ingest_dropped(self):
+        return self.__ingest_dropped
+
+    @property
+    def overrun(self):
+        return self.__overrun
+
+    @property
+    def fps(self):
+        now = time.monotonic()
+        with self.__lock:
+            times = self.__frame_times
+            if len(times) < 2 or times[-1] < now - self.__window:
+                return 0.0
+            return (len(times) - 1) / (times[-1] - times[0])
+
+    @property
+    def acq_fps(self):
+        # mean frame rate over the whole acquisition
+        with self.__lock:
+            duration = self.__last_frame - self.__first_frame
+            if self.__frames_acquired < 2 or duration <= 0:
+                return 0.0
+            return (self.__frames_acquired - 1) / duration
+
+    @property
+    def latency_p99(self):
+        with self.__lock:
+            nb = min(self.__nb_latencies, len(self.__latencies))
+            if not nb:
+                return 0.0
+            return float(numpy.percentile(self.__latencies[:nb], 99))
+
+    def snapshot(self):
+        return {
+            "fps": self.fps,
+            "frames_acquired": self.frames_acquired,
+            "frames_dropped": self.frames_dropped,
+            "sdk_dropped_frames": self.sdk_dropped,
+            "ingest_dropped_frames": self.ingest_dropped,
+            "overrun_frames": self.overrun,
+            "callback_latency_p99": self.latency_p99,
+        }
@@ -0,0 +1,274 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import os
+import socket
+import struct
+import threading
+import collections
+
+import numpy
+
+from .listener import FrameListener
+
+# wire format of one frame: fixed size header followed by the raw data
+# magic, frame_id, timestamp, dtype (numpy dtype.str), ndim, 3 dims, data size
+FRAME_HEADER = struct.Struct("<4sqd8sI3IQ")
+FRAME_MAGIC = b"ADVF"
+
+
+def _pack_header(frame_id, data, timestamp):
+    shape = tuple(data.shape) + (1,) * (3 - data.ndim)
+    return FRAME_HEADER.pack(
+        FRAME_MAGIC,
+        frame_id,
+        timestamp,
+        data.dtype.str.encode(),
+        data.ndim,
+        *shape,
+        data.nbytes,
+    )
+
+
+class _Subscriber(threading.Thread):
+    # one sender thread per connected client, so a slow client only
+    # fills (and drops) its own queue
+    def __init__(self, publisher, sock, high_water_mark):
+        threading.Thread.__init__(self, daemon=True)
+        self.__publisher = publisher
+        self.__sock = sock
+        self.__high_water_mark = high_water_mark
+        self.__queue = collections.deque()
+        self.__cond = threading.Condition()
+        self.__running = True
+
+        self.sent = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.max_queue_depth = 0
+
+    def push(self, message):
+        with self.__cond:
+            if len(self.__queue) >= self.__high_water_mark:
+                self.dropped += 1
+                return
+            self.__queue.append(message)
+            self.max_queue_depth = max(self.max_queue_depth, len(self.__queue))
+            self.__cond.notify()
+
+    def close(self):
+        with self.__cond:
+            self.__running = False
+            self.__cond.notify()
+
+    @property
+    def queue_depth(self):
+        return len(self.__queue)
+
+    def run(self):
+        try:
+            while True:
+                with self.__cond:
+                    while self.__running and not self.__queue:
+                        self.__cond.wait()
+                    if not self.__running:
+                        break
+                    header, payload = self.__queue.popleft()
+                self.__sock.sendall(header)
+                self.__sock.sendall(payload)
+                self.sent += 1
+                self.bytes_sent += len(header) + len(payload)
+        except OSError:
+            # client went away
+            pass
+        finally:
+            self.__sock.close()
+            self.__publisher._removeSubscriber(self)
+
+
+class FramePublisher(FrameListener):
+    """Push the published frames to local clients over a Unix domain socket.
+
+    Every decimation-th frame is sent to all the connected FrameSubscriber,
+    a client having more than high_water_mark frames waiting is skipped
+    (the frame is counted as dropped for that client only).
+    """
+
+    def __init__(self, path, decimation=1, high_water_mark=16):
+        if decimation < 1:
+            raise ValueError("Invalid decimation, must be >= 1")
+        if high_water_mark < 1:
+            raise ValueError("Invalid high water mark, must be >= 1")
+        self.__path = path
+        self.__decimation = decimation
+        self.__high_water_mark = high_water_mark
+        self.__subscribers = ()
+        self.__lock = threading.Lock()
+        self.__server = None
+        self.__thread = None
+        self.published = 0
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def decimation(self):
+        return self.__decimation
+
+    @decimation.setter
+    def decimation(self, value):
+        if value < 1:
+            raise ValueError("Invalid decimation, must be >= 1")
+        self.__decimation = value
+
+    @property
+    def high_water_mark(self):
+        return self.__high_water_mark
+
+    def start(self):
+        if self.__server is not None:
+            return
+        if os.path.exists(self.__path):
+            os.unlink(self.__path)
+        self.__server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.__server.bind(self.__path)
+        self.__server.listen()
+        self.__thread = threading.Thread(target=self.__accept, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        if self.__server is None:
+            return
+        # shutdown() wakes up the accept() of the server thread
+        try:
+            self.__server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.__server.close()
+        self.__server = None
+        self.__thread.join()
+        self.__thread = None
+        for subscriber in self.__subscribers:
+            subscriber.close()
+        if os.path.exists(self.__path):
+            os.unlink(self.__path)
+
+    def __accept(self):
+        server = self.__server
+        while True:
+            try:
+                sock, _ = server.accept()
+            except OSError:
+                break
+            subscriber = _Subscriber(self, sock, self.__high_water_mark)
+            with self.__lock:
+                self.__subscribers += (subscriber,)
+            subscriber.start()
+
+    def _removeSubscriber(self, subscriber):
+        with self.__lock:
+            self.__subscribers = tuple(
+                s for s in self.__subscribers if s is not subscriber
+            )
+
+    @property
+    def nb_subscribers(self):
+        return len(self.__subscribers)
+
+    def getSubscriberStatistics(self):
+        return [
+            {
+                "sent": s.sent,
+                "dropped": s.dropped,
+                "bytes_sent": s.bytes_sent,
+                "queue_depth": s.queue_depth,
+                "max_queue_depth": s.max_queue_depth,
+            }
+            for s in self.__subscribers
+        ]
+
+    def newFrame(self, frame_id, data, timestamp):
+        subscribers = self.__subscribers
+        if not subscribers or frame_id % self.__decimation:
+            return
+        # a single copy of the data, shared by all the subscribers
+        message = (_pack_header(frame_id, data, timestamp), data.tobytes())
+        for subscriber in subscribers:
+            subscriber.push(message)
+        self.published += 1
+
+
+class FrameSubscriber:
+    """Client side of FramePublisher.
+
+    >>> sub = FrameSubscriber("/tmp/advacam.sock")
+    >>> for frame_id, timestamp, data in sub:
+    ...     print(frame_id, data.mean())
+    """
+
+    def __init__(self, path, timeout=None):
+        self.__sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.__sock.settimeout(timeout)
+        self.__sock.connect(path)
+
+    def close(self):
+        self.__sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __recv_exactly(self, size):
+        buff = bytearray(size)
+        view = memoryview(buff)
+        received = 0
+        while received < size:
+            n = self.__sock.recv_into(view[received:])
+            if not n:
+                raise EOFError("Publisher closed the connection")
+            received += n
+        return buff
+
+    def recv(self):
+        header = self.__recv_exactly(FRAME_HEADER.size)
+        magic, frame_id, timestamp, dtype, ndim, *shape, size = FRAME_HEADER.unpack(
+            header
+        )
+        if magic != FRAME_MAGIC:
+            raise RuntimeError("Invalid frame header")
+        shape = shape[:ndim]
+        buff = self.__recv_exactly(size)
+        dtype = numpy.dtype(dtype.rstrip(b"\0").decode())
+        data = numpy.frombuffer(buff, dtype=dtype).reshape(shape)
+        return frame_id, timestamp, data
+
+    def __iter__(self):
+        while True:
+            try:
+                yield self.recv()
+            except EOFError:
+                return
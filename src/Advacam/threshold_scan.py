@@ -0,0 +1,160 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import time
+import queue
+import threading
+
+import numpy
+
+from .scurve import fit_scurves
+
+
+class ThresholdScan:
+    """Energy threshold scan run as a single software triggered sequence.
+
+    The SDK callback only takes a reference on the frame, the conversion
+    into the preallocated counts[i] is done by a converter thread while the
+    scan thread already writes the next threshold and triggers the next
+    frame. The readout is not overlapped: the next threshold is only
+    written once the SDK delivered the previous frame.
+    """
+
+    def __init__(self, camera, thresholds, expo_time, frame_timeout=10.0):
+        thresholds = numpy.asarray(thresholds, dtype=numpy.float64)
+        if thresholds.ndim != 1 or len(thresholds) < 2:
+            raise ValueError("At least 2 thresholds are needed")
+        self.__camera = camera
+        self.__expo_time = expo_time
+        self.__frame_timeout = frame_timeout
+        self.thresholds = thresholds
+        self.counts = numpy.zeros(
+            (len(thresholds), camera.width, camera.height), dtype=numpy.int32
+        )
+        self.edge = None
+        self.width = None
+        self.error = None
+        self.nb_frames = 0
+
+        self.__frames = queue.Queue()
+        self.__frame_done = threading.Semaphore(0)
+        self.__abort = False
+        self.__finished = False
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__converter = threading.Thread(target=self.__convert, daemon=True)
+
+    def start(self):
+        self.__thread.start()
+
+    def wait(self, timeout=None):
+        self.__thread.join(timeout)
+        return not self.__thread.is_alive()
+
+    def abort(self):
+        self.__abort = True
+        self.__camera.detector.abortOperation()
+        # wake up the scan thread waiting for a frame
+        self.__frame_done.release()
+
+    @property
+    def running(self):
+        return self.__thread.is_alive() and not self.__finished
+
+    def __callback(self, value):
+        self.__frames.put(self.__camera.detector.lastAcqFrameRefInc())
+        self.__frame_done.release()
+
+    def __convert(self):
+        for i in range(len(self.thresholds)):
+            frame = self.__frames.get()
+            if frame is None:
+                break
+            try:
+                self.counts[i].flat[:] = self.__camera._rawData(frame)
+            finally:
+                frame.destroy()
+            self.nb_frames = i + 1
+
+    def __run(self):
+        try:
+            self.__scan()
+            self.edge, self.width = fit_scurves(self.thresholds, self.counts)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.__finished = True
+            self.__camera._thresholdScanDone()
+
+    def __scan(self):
+        camera = self.__camera
+        detector = camera.detector
+        px = camera.px
+        nb_frames = len(self.thresholds)
+        saved_threshold = camera.energy_threshold0
+
+        detector.registerEvent(px.PX_EVENT_ACQ_FINISHED, self.__callback, self.__callback)
+        try:
+            acq = threading.Thread(
+                target=detector.doAdvancedAcquisition,
+                args=(
+                    nb_frames,
+                    self.__expo_time,
+                    px.PX_ACQTYPE_FRAMES,
+                    camera.INTERNAL_TRIG_MULTI,
+                    px.PX_FTYPE_AUTODETECT,
+                    0,
+                    "",
+                ),
+            )
+            self.__converter.start()
+            try:
+                acq.start()
+                # as Camera.startAcq, give the SDK the time to arm
+                time.sleep(0.03)
+                for threshold in self.thresholds:
+                    if self.__abort:
+                        raise RuntimeError("Threshold scan aborted")
+                    # the previous frame is being converted meanwhile
+                    camera.energy_threshold0 = threshold
+                    detector.doSoftwareTrigger(0)
+                    done = self.__frame_done.acquire(
+                        timeout=self.__expo_time + self.__frame_timeout
+                    )
+                    if self.__abort:
+                        raise RuntimeError("Threshold scan aborted")
+                    if not done:
+                        raise RuntimeError(f"Threshold scan: no frame at {threshold} keV")
+            except Exception:
+                detector.abortOperation()
+                raise
+            finally:
+                if acq.ident is not None:
+                    acq.join()
+                self.__frames.put(None)
+                self.__converter.join()
+        finally:
+            detector.unregisterEvent(
+                px.PX_EVENT_ACQ_FINISHED, self.__callback, self.__callback
+            )
+            camera.energy_threshold0 = saved_threshold
@@ -0,0 +1,108 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import concurrent.futures
+
+import numpy
+
+CHIP_SIZE = 256
+
+
+def chip_tiles(shape, nb_chips, chip_size=CHIP_SIZE):
+    """(row slice, column slice) of each chip of a (rows, columns) frame.
+
+    Frames not made of a nb_chips grid of chip_size x chip_size chips are
+    split in nb_chips bands of rows.
+    """
+    rows, cols = shape
+    nb_rows, nb_cols = rows // chip_size, cols // chip_size
+    if (
+        nb_rows * nb_cols == nb_chips
+        and rows == nb_rows * chip_size
+        and cols == nb_cols * chip_size
+    ):
+        return [
+            (
+                slice(r * chip_size, (r + 1) * chip_size),
+                slice(c * chip_size, (c + 1) * chip_size),
+            )
+            for r in range(nb_rows)
+            for c in range(nb_cols)
+        ]
+    bounds = numpy.linspace(0, rows, nb_chips + 1).astype(int)
+    return [(slice(a, b), slice(None)) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+class TileProcessor:
+    """Run a per tile numpy operation on a persistent thread pool.
+
+    run(tiles, func, out, *inputs) calls func(out[tile], *[x[tile] for x
+    in inputs]) for every tile, the tiles are disjoint so the threads
+    write their own part of out without lock. Each thread (the caller
+    included) gets an equal share of the tiles; the numpy operations
+    release the GIL, so they run in parallel. Only numpy arrays are split:
+    converting the Python list given by the SDK holds the GIL.
+    """
+
+    def __init__(self, nb_threads):
+        self.nb_threads = max(1, nb_threads)
+        self.__pool = None
+        if self.nb_threads > 1:
+            self.__pool = concurrent.futures.ThreadPoolExecutor(
+                self.nb_threads - 1, thread_name_prefix="AdvacamTile"
+            )
+
+    @staticmethod
+    def __runTiles(tiles, func, out, inputs):
+        for tile in tiles:
+            func(out[tile], *(x[tile] for x in inputs))
+
+    def run(self, tiles, func, out, *inputs):
+        nb_groups = min(self.nb_threads, len(tiles))
+        if self.__pool is None or nb_groups < 2:
+            func(out, *inputs)
+            return out
+        groups = [tiles[i::nb_groups] for i in range(nb_groups)]
+        futures = [
+            self.__pool.submit(self.__runTiles, group, func, out, inputs)
+            for group in groups[1:]
+        ]
+        # the caller thread takes its share
+        self.__runTiles(groups[0], func, out, inputs)
+        for future in futures:
+            future.result()
+        return out
+
+    def close(self):
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+
+
+def cast(out, src):
+    numpy.copyto(out, src, casting="unsafe")
+
+
+def subtract(out, a, b):
+    numpy.subtract(a, b, out=out, casting="unsafe")
@@ -0,0 +1,89 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import threading
+
+import numpy
+
+
+class TimeSlicer:
+    """Stroboscopic image stack from the TPX3 per pixel time of arrival.
+
+    Each hit pixel of a frame goes in the slice of its ToA between t_min
+    and t_max (nb_slices equal time bins), folded by period if not 0 (e.g.
+    a chopper period within a long exposure). The stack accumulates the
+    hits (or their ToT) of all the frames in place, so one long
+    acquisition gives the same stack as many short ones.
+    A frame has at most one ToA per pixel, so the (slice, pixel) indexes
+    of a frame are unique and are added with a single fancy indexing, no
+    per frame full size histogram is needed.
+    """
+
+    def __init__(self, shape, nb_slices, t_min, t_max, period=0.0, weight_tot=False):
+        if nb_slices < 1 or t_max <= t_min:
+            raise ValueError("Invalid time slicing, needs nb_slices > 0 and t_max > t_min")
+        self.shape = tuple(shape)
+        self.nb_slices = int(nb_slices)
+        self.t_min = float(t_min)
+        self.t_max = float(t_max)
+        self.period = float(period)
+        self.weight_tot = weight_tot
+        self.edges = numpy.linspace(self.t_min, self.t_max, self.nb_slices + 1)
+        self.__nb_pixels = int(numpy.prod(self.shape))
+        dtype = numpy.float64 if weight_tot else numpy.int64
+        self.__stack = numpy.zeros(self.nb_slices * self.__nb_pixels, dtype=dtype)
+        self.__lock = threading.Lock()
+        self.repetitions = 0
+
+    def reset(self):
+        with self.__lock:
+            self.__stack[:] = 0
+            self.repetitions = 0
+
+    def add(self, toa, tot=None):
+        toa = numpy.asarray(toa).reshape(-1)
+        if toa.size != self.__nb_pixels:
+            raise ValueError(f"Frame has {toa.size} pixels, expected {self.__nb_pixels}")
+        if tot is not None:
+            tot = numpy.asarray(tot).reshape(-1)
+            hits = numpy.flatnonzero(tot > 0)
+        else:
+            hits = numpy.flatnonzero(toa > 0)
+        t = toa[hits]
+        if self.period:
+            t = numpy.fmod(t, self.period)
+        slices = numpy.digitize(t, self.edges) - 1
+        inside = (slices >= 0) & (slices < self.nb_slices)
+        index = slices[inside] * self.__nb_pixels + hits[inside]
+        with self.__lock:
+            if self.weight_tot and tot is not None:
+                self.__stack[index] += tot[hits[inside]]
+            else:
+                self.__stack[index] += 1
+            self.repetitions += 1
+
+    def stack(self):
+        # (nb_slices,) + shape copy
+        with self.__lock:
+            return self.__stack.reshape((self.nb_slices,) + self.shape).copy()
@@ -0,0 +1,174 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import os
+import time
+import threading
+
+import numpy
+
+# Pixet calibration export, one matrix file per parameter
+CALIBRATION_FILES = {
+    "a": "caliba.txt",
+    "b": "calibb.txt",
+    "c": "calibc.txt",
+    "t": "calibt.txt",
+}
+
+
+class TotCalibration:
+    """Per pixel TPX3 ToT to energy (keV) conversion.
+
+    The ToT of a pixel follows the surrogate function
+    ToT = a*E + b - c / (E - t), inverted as the largest root of
+    a*E^2 + (b - a*t - ToT)*E + (ToT*t - b*t - c) = 0.
+    All the per pixel terms not depending on the ToT are computed once at
+    load time and cached as contiguous float32 arrays, a frame conversion
+    is then a few in-place vectorized operations. Uncalibrated pixels
+    (a <= 0) and pixels without hit give 0 keV. The matrices are
+    (height, width): one row per detector line.
+    """
+
+    def __init__(self, a, b, c, t, path=""):
+        a, b, c, t = (numpy.asarray(x, dtype=numpy.float64) for x in (a, b, c, t))
+        if not a.shape == b.shape == c.shape == t.shape:
+            raise ValueError("Calibration matrices must have the same shape")
+        self.path = path
+        self.shape = a.shape
+        valid = numpy.isfinite(a + b + c + t) & (a > 0)
+        a, b, c, t = (numpy.where(valid, x, 0) for x in (a, b, c, t))
+
+        def cache(x):
+            return numpy.ascontiguousarray(x, dtype=numpy.float32).ravel()
+
+        # u = ToT - p ; disc = u^2 + q - s*ToT ; E = (u + sqrt(disc)) * h
+        self.__p = cache(b - a * t)
+        self.__q = cache(4 * a * (b * t + c))
+        self.__s = cache(4 * a * t)
+        self.__h = cache(numpy.divide(0.5, a, out=numpy.zeros_like(a), where=valid))
+
+        self.__lock = threading.Lock()
+        self.__scratch = numpy.empty((2, a.size), dtype=numpy.float32)
+        self.last_conversion_time = 0.0
+        self.nb_conversions = 0
+        self.__total_time = 0.0
+
+    @classmethod
+    def fromFile(cls, path, shape=None):
+        """Load a .npz (a, b, c and t arrays) or a directory of Pixet
+        caliba.txt, calibb.txt, calibc.txt and calibt.txt matrices."""
+        if os.path.isdir(path):
+            params = {
+                name: numpy.loadtxt(os.path.join(path, filename))
+                for name, filename in CALIBRATION_FILES.items()
+            }
+        else:
+            with numpy.load(path) as npz:
+                params = {name: npz[name] for name in CALIBRATION_FILES}
+        if shape is not None:
+            for name, value in params.items():
+                if value.size != numpy.prod(shape):
+                    raise ValueError(
+                        f"Calibration {name} has {value.size} pixels, "
+                        f"detector has {numpy.prod(shape)}"
+                    )
+                params[name] = value.reshape(shape)
+        return cls(path=path, **params)
+
+    @property
+    def mean_conversion_time(self):
+        if not self.nb_conversions:
+            return 0.0
+        return self.__total_time / self.nb_conversions
+
+    def resetStatistics(self):
+        self.last_conversion_time = 0.0
+        self.nb_conversions = 0
+        self.__total_time = 0.0
+
+    def toEnergy(self, tot, out=None, processor=None, tiles=None):
+        """ToT image (any shape with the calibration pixel count) to a
+        float32 energy image. With a TileProcessor and tiles of the
+        calibration shape, each tile is converted by a pool thread."""
+        t0 = time.perf_counter()
+        tot = numpy.asarray(tot)
+        if tot.size != self.__p.size:
+            raise ValueError(
+                f"Frame has {tot.size} pixels, calibration has {self.__p.size}"
+            )
+        if out is None:
+            out = numpy.empty(tot.shape, dtype=numpy.float32)
+        shape = self.shape if processor is not None and tiles else (-1,)
+        params = [x.reshape(shape) for x in (self.__p, self.__q, self.__s, self.__h)]
+        with self.__lock:
+            scratch = [x.reshape(shape) for x in self.__scratch]
+            if processor is None or not tiles:
+                _energy(out.reshape(shape), tot.reshape(shape), *params, *scratch)
+            else:
+                processor.run(
+                    tiles,
+                    _energy,
+                    out.reshape(shape),
+                    tot.reshape(shape),
+                    *params,
+                    *scratch,
+                )
+        self.__account(t0)
+        return out
+
+    def hitsToEnergy(self, x, y, tot):
+        """Energies of a hit list (pixel column x, row y, ToT), shape is
+        (height, width)."""
+        t0 = time.perf_counter()
+        tot = numpy.asarray(tot, dtype=numpy.float32)
+        index = numpy.ravel_multi_index(
+            (numpy.asarray(y), numpy.asarray(x)), self.shape
+        )
+        u = tot - self.__p[index]
+        disc = u * u + self.__q[index] - self.__s[index] * tot
+        numpy.maximum(disc, 0, out=disc)
+        energy = (u + numpy.sqrt(disc)) * self.__h[index]
+        energy[tot <= 0] = 0
+        self.__account(t0)
+        return energy
+
+    def __account(self, t0):
+        dt = time.perf_counter() - t0
+        self.last_conversion_time = dt
+        self.nb_conversions += 1
+        self.__total_time += dt
+
+
+def _energy(u, tot, p, q, s, h, disc, s_tot):
+    # E = (ToT - p + sqrt((ToT - p)^2 + q - s*ToT)) * h, in place in u
+    numpy.subtract(tot, p, out=u)
+    numpy.multiply(u, u, out=disc)
+    disc += q
+    numpy.multiply(tot, s, out=s_tot)
+    disc -= s_tot
+    numpy.maximum(disc, 0, out=disc)
+    numpy.sqrt(disc, out=disc)
+    u += disc
+    u *= h
+    numpy.copyto(u, 0, where=tot <= 0)
@@ -0,0 +1,154 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import os
+import json
+import time
+import threading
+import contextlib
+import collections
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+class _Span:
+    __slots__ = ("_events", "_thread", "_name", "_cat", "_t0")
+
+    def __init__(self, events, thread, name, cat):
+        self._events = events
+        self._thread = thread
+        self._name = name
+        self._cat = cat
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self._events.append(
+            (self._thread, self._name, self._cat, self._t0, time.perf_counter())
+        )
+
+
+class Tracer:
+    """Opt-in timeline of the acquisition, dumped as Chrome trace JSON
+    (chrome://tracing, https://ui.perfetto.dev).
+
+    >>> with tracer.span("copy_data", "lima"):
+    ...     buffer_mgr.copy_data(frame_id, data)
+
+    All the threads append their spans to one ring of the last max_events
+    (deque appends are atomic, no lock is taken on the recording path), so
+    the threads of the past acquisitions do not keep any buffer; disabled,
+    span() returns a shared no-op context.
+    """
+
+    def __init__(self, max_events=100000):
+        self.enabled = False
+        self.dump_path = ""
+        self.max_events = max_events
+        self.__local = threading.local()
+        self.__events = collections.deque(maxlen=max_events)
+        self.__t0 = time.perf_counter()
+
+    def enable(self, dump_path=""):
+        # dump_path: written (and the spans cleared) at each acquisition end
+        self.dump_path = dump_path
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def __thread(self):
+        # (native id, name) of the calling thread
+        thread = getattr(self.__local, "thread", None)
+        if thread is None:
+            thread = (threading.get_native_id(), threading.current_thread().name)
+            self.__local.thread = thread
+        return thread
+
+    def span(self, name, cat=""):
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self.__events, self.__thread(), name, cat)
+
+    def complete(self, name, cat, start, end):
+        # span measured by the caller (time.perf_counter() values)
+        if self.enabled:
+            self.__events.append((self.__thread(), name, cat, start, end))
+
+    def instant(self, name, cat=""):
+        if self.enabled:
+            now = time.perf_counter()
+            self.__events.append((self.__thread(), name, cat, now, None))
+
+    def clear(self):
+        self.__events.clear()
+
+    def events(self):
+        pid = os.getpid()
+        t0 = self.__t0
+        trace = []
+        threads = set()
+        for (tid, thread_name), name, cat, start, end in list(self.__events):
+            if tid not in threads:
+                threads.add(tid)
+                trace.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": pid,
+                        "tid": tid,
+                        "args": {"name": thread_name},
+                    }
+                )
+            event = {
+                "name": name,
+                "cat": cat,
+                "pid": pid,
+                "tid": tid,
+                "ts": (start - t0) * 1e6,
+            }
+            if end is None:
+                event.update(ph="i", s="t")
+            else:
+                event.update(ph="X", dur=(end - start) * 1e6)
+            trace.append(event)
+        return trace
+
+    def dump(self, path=None):
+        path = path or self.dump_path
+        if not path:
+            raise ValueError("No trace file")
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, f)
+        return path
+
+    def endAcq(self):
+        if self.enabled and self.dump_path:
+            self.dump()
+            self.clear()
+
+
+tracer = Tracer()
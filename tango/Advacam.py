@@ -42,13 +42,35 @@
 #         (c) - BCU - ESRF
 # =============================================================================
 #
+import threading
+import contextlib
+
+import numpy
+
 import PyTango
 from Lima import Core
 from Advacam.Interface import Interface
-from Advacam.acquisition import Camera
+from Advacam.streaming import FramePublisher
+from Advacam.shm_ring import SharedFrameRing
+from Advacam.spectrum import SpectrumAccumulator, rectangle_mask
+from Advacam.pixel_stats import PixelStatistics, HOT, DEAD, NOISY
+from Advacam.roi_counters import RoiCounters
+from Advacam.trace import tracer
 
 from Lima.Server import AttrHelper
 
+# attributes pushed with change/archive events during the acquisition
+STATISTICS_ATTRIBUTES = (
+    "fps",
+    "frames_acquired",
+    "frames_dropped",
+    "sdk_dropped_frames",
+    "ingest_dropped_frames",
+    "overrun_frames",
+    "callback_latency_p99",
+    "buffer_fill_level",
+)
+
 
 class Advacam(PyTango.LatestDeviceImpl):
     Core.DEB_CLASS(Core.DebModApplication, "LimaCCDs")
@@ -69,6 +91,24 @@ class Advacam(PyTango.LatestDeviceImpl):
     #    Device destructor
     # ------------------------------------------------------------------
     def delete_device(self):
+        _AdvacamCamera.statistics.unregisterCallback(self.__statisticsChanged)
+        self.__statistics_stop = True
+        self.__statistics_event.set()
+        self.__statistics_thread.join()
+        if self.__publisher is not None:
+            _AdvacamCamera.unregisterFrameListener(self.__publisher)
+            self.__publisher.stop()
+            self.__publisher = None
+        if self.__shm_ring is not None:
+            _AdvacamCamera.unregisterFrameListener(self.__shm_ring)
+            self.__shm_ring.close()
+            self.__shm_ring = None
+        if self.__spectrum_enabled:
+            _AdvacamCamera.unregisterFrameListener(self.__spectrum)
+        if self.__pixel_calibration:
+            _AdvacamCamera.unregisterFrameListener(self.__pixel_stats)
+        if self.__roi_counters_enabled:
+            _AdvacamCamera.unregisterFrameListener(self.__roi_counters)
         _AdvacamCamera.quit()
 
     # ------------------------------------------------------------------
@@ -83,9 +123,433 @@ class Advacam(PyTango.LatestDeviceImpl):
         for mode in _AdvacamCamera.OPERATION_MODES:
             self.__OperationMode[_AdvacamCamera.OPERATION_MODES[mode]] = mode
 
+        self.__CounterOutput = {v: v for v in _AdvacamCamera.COUNTER_OUTPUTS}
+        self.__GapPolicy = {v: v for v in _AdvacamCamera.GAP_POLICIES}
+
+        if self.gap_policy:
+            _AdvacamCamera.setGapPolicy(self.gap_policy)
+
         if self.energy_threshold:
             _AdvacamCamera.setEnergyThreshold(self.energy_threshold)
 
+        if self.energy_calibration:
+            _AdvacamCamera.setEnergyCalibration(self.energy_calibration)
+
+        if self.conversion_threads > 1:
+            _AdvacamCamera.setConversionThreads(self.conversion_threads)
+
+        if self.refresh_period or self.refresh_dose:
+            _AdvacamCamera.setSensorRefresh(self.refresh_period, self.refresh_dose)
+
+        if self.trace_file:
+            # dumped at the end of each acquisition
+            tracer.enable(self.trace_file)
+
+        if self.buffer_memory_budget:
+            # MB
+            buffer_manager = _AdvacamInterface.buffer_manager
+            buffer_manager.memory_budget = self.buffer_memory_budget * 1024 * 1024
+            self.__setupBuffers()
+
+        self.__publisher = None
+        if self.stream_path:
+            self.__publisher = FramePublisher(
+                self.stream_path,
+                self.stream_decimation or 1,
+                self.stream_high_water_mark or 16,
+            )
+            self.__publisher.start()
+            _AdvacamCamera.registerFrameListener(self.__publisher)
+
+        self.__shm_ring = None
+        if self.shm_ring_name:
+            # room for 32 bits pixels and the 2 MPX3 counters
+            slot_size = _AdvacamCamera.width * _AdvacamCamera.height * 4 * 2
+            self.__shm_ring = SharedFrameRing(
+                self.shm_ring_name, self.shm_ring_slots or 16, slot_size
+            )
+            _AdvacamCamera.registerFrameListener(self.__shm_ring)
+
+        self.__spectrum = SpectrumAccumulator(
+            self.spectrum_nb_bins or 1024, self.spectrum_bin_width or 1.0
+        )
+        self.__spectrum_enabled = False
+
+        self.__pixel_stats = PixelStatistics()
+        self.__pixel_calibration = False
+        self.__pixel_flags = numpy.zeros((0, 0), dtype=numpy.uint8)
+
+        self.__roi_counters = RoiCounters(self.roi_counter_slots or 10000)
+        self.__roi_counters_enabled = False
+
+        # the acquisition path only hands over a snapshot (at most every
+        # statistics_push_period), events are pushed from our own thread
+        for name in STATISTICS_ATTRIBUTES:
+            self.set_change_event(name, True, False)
+            self.set_archive_event(name, True, False)
+        self.__statistics = None
+        self.__statistics_stop = False
+        self.__statistics_event = threading.Event()
+        self.__statistics_thread = threading.Thread(
+            target=self.__pushStatistics, daemon=True
+        )
+        self.__statistics_thread.start()
+        statistics = _AdvacamCamera.statistics
+        if self.statistics_push_period:
+            statistics.push_period = self.statistics_push_period
+        statistics.registerCallback(self.__statisticsChanged)
+
+    def __statisticsChanged(self, snapshot):
+        self.__statistics = snapshot
+        self.__statistics_event.set()
+
+    def __pushStatistics(self):
+        ensure_omni_thread = getattr(PyTango, "EnsureOmniThread", None)
+        with ensure_omni_thread() if ensure_omni_thread else contextlib.nullcontext():
+            while True:
+                self.__statistics_event.wait()
+                self.__statistics_event.clear()
+                if self.__statistics_stop:
+                    break
+                snapshot = dict(self.__statistics)
+                snapshot["buffer_fill_level"] = self.__bufferFillLevel()
+                for name, value in snapshot.items():
+                    try:
+                        self.push_change_event(name, value)
+                        self.push_archive_event(name, value)
+                    except PyTango.DevFailed as e:
+                        print(f"Advacam: failed to push {name} event: {e}")
+
+    def __setupBuffers(self):
+        # LimaCCDs calls CtControl.prepareAcq itself: the buffers are sized
+        # from the current parameters at init and when buffer_budget is
+        # written, the camera being idle
+        try:
+            _AdvacamInterface.buffer_manager.setup()
+        except Exception as e:
+            print(f"Advacam: Lima buffers sizing failed: {e}")
+
+    def __bufferFillLevel(self):
+        # frames in the Lima buffers not yet processed (or saved), in %
+        if _AdvacamControl is None:
+            return 0.0
+        counters = _AdvacamControl.getStatus().ImageCounters
+        pending = counters.LastImageAcquired - counters.LastImageReady
+        saving_mode = _AdvacamControl.saving().getSavingMode()
+        if saving_mode != Core.CtSaving.Manual:
+            pending = max(pending, counters.LastImageAcquired - counters.LastImageSaved)
+        nb_buffers = _AdvacamControl.buffer().getNumber()
+        return 100.0 * max(pending, 0) / nb_buffers if nb_buffers else 0.0
+
+    def read_buffer_fill_level(self, attr):
+        attr.set_value(self.__bufferFillLevel())
+
+    def read_buffer_headroom(self, attr):
+        headroom = _AdvacamInterface.buffer_manager.headroom
+        attr.set_value(-1 if headroom is None else headroom)
+
+    def read_buffer_budget(self, attr):
+        attr.set_value(_AdvacamInterface.buffer_manager.memory_budget / (1024 * 1024))
+
+    def write_buffer_budget(self, attr):
+        # MB, written again (even unchanged) to size the next acquisition
+        # from its parameters and the consumers lag seen since
+        budget = attr.get_write_value()
+        if _AdvacamControl.getStatus().AcquisitionStatus == Core.AcqRunning:
+            PyTango.Except.throw_exception(
+                "Advacam_Error", "Acquisition in progress", "Advacam.buffer_budget"
+            )
+        buffer_manager = _AdvacamInterface.buffer_manager
+        buffer_manager.memory_budget = budget * 1024 * 1024
+        if budget:
+            try:
+                buffer_manager.setup()
+            except RuntimeError as e:
+                PyTango.Except.throw_exception(
+                    "Advacam_Error", str(e), "Advacam.buffer_budget"
+                )
+
+    def read_buffer_count(self, attr):
+        attr.set_value(_AdvacamControl.buffer().getNumber())
+
+    def read_spectrum_enabled(self, attr):
+        attr.set_value(self.__spectrum_enabled)
+
+    def write_spectrum_enabled(self, attr):
+        enabled = attr.get_write_value()
+        if enabled == self.__spectrum_enabled:
+            return
+        if enabled:
+            _AdvacamCamera.registerFrameListener(self.__spectrum)
+        else:
+            _AdvacamCamera.unregisterFrameListener(self.__spectrum)
+        self.__spectrum_enabled = enabled
+
+    def read_spectrum(self, attr):
+        attr.set_value(self.__spectrum.spectrum())
+
+    def read_spectrum_bins(self, attr):
+        attr.set_value(self.__spectrum.bins)
+
+    def read_roi_spectra(self, attr):
+        attr.set_value(self.__spectrum.roiSpectra())
+
+    def read_spectrum_update_time(self, attr):
+        attr.set_value(self.__spectrum.last_update_time)
+
+    def read_roi_counters_enabled(self, attr):
+        attr.set_value(self.__roi_counters_enabled)
+
+    def write_roi_counters_enabled(self, attr):
+        enabled = attr.get_write_value()
+        if enabled == self.__roi_counters_enabled:
+            return
+        if enabled:
+            _AdvacamCamera.registerFrameListener(self.__roi_counters)
+        else:
+            _AdvacamCamera.unregisterFrameListener(self.__roi_counters)
+        self.__roi_counters_enabled = enabled
+
+    def read_roi_counter_frames(self, attr):
+        attr.set_value(self.__roi_counters.read()[0])
+
+    def read_roi_counter_sums(self, attr):
+        attr.set_value(self.__roi_counters.read()[2])
+
+    def read_roi_counter_counts(self, attr):
+        attr.set_value(self.__roi_counters.read()[3])
+
+    def read_roi_counter_update_time(self, attr):
+        attr.set_value(self.__roi_counters.last_update_time)
+
+    def read_pixel_calibration(self, attr):
+        attr.set_value(self.__pixel_calibration)
+
+    def write_pixel_calibration(self, attr):
+        # per pixel statistics of the next acquisitions (dark or flat)
+        enabled = attr.get_write_value()
+        if enabled == self.__pixel_calibration:
+            return
+        if enabled:
+            _AdvacamCamera.registerFrameListener(self.__pixel_stats)
+        else:
+            _AdvacamCamera.unregisterFrameListener(self.__pixel_stats)
+        self.__pixel_calibration = enabled
+
+    def read_pixel_calibration_frames(self, attr):
+        attr.set_value(self.__pixel_stats.nb_frames)
+
+    def read_pixel_mean(self, attr):
+        attr.set_value(self.__pixel_stats.mean())
+
+    def read_pixel_variance(self, attr):
+        attr.set_value(self.__pixel_stats.variance())
+
+    def read_pixel_flags(self, attr):
+        attr.set_value(self.__pixel_flags)
+
+    def read_pixel_stats_update_time(self, attr):
+        attr.set_value(self.__pixel_stats.last_update_time)
+
+    # ------------------------------------------------------------------
+    #    classifyPixels command:
+    #
+    #    Description: flag the hot, dead and noisy pixels (pixel_flags)
+    #                 from the pixel calibration statistics
+    #    argin: DevVarDoubleArray [hot sigma, dead fraction, noisy factor],
+    #           0 disables a test
+    #    argout: DevVarLongArray [hot, dead, noisy] pixel counts
+    # ------------------------------------------------------------------
+    @Core.DEB_MEMBER_FUNCT
+    def classifyPixels(self, argin):
+        if len(argin) != 3:
+            PyTango.Except.throw_exception(
+                "Advacam_Error",
+                "Expected [hot sigma, dead fraction, noisy factor]",
+                "Advacam.classifyPixels",
+            )
+        flags = self.__pixel_stats.classify(*argin)
+        self.__pixel_flags = flags
+        return [int(numpy.count_nonzero(flags & flag)) for flag in (HOT, DEAD, NOISY)]
+
+    def is_counter_depth_allowed(self, req_type):
+        # TPX3/TPX devices have no counter depth
+        return _AdvacamCamera.model_name == "MPX3"
+
+    def is_counter_depth_fps_allowed(self, req_type):
+        return self.is_counter_depth_allowed(req_type)
+
+    def read_trace_enabled(self, attr):
+        attr.set_value(tracer.enabled)
+
+    def write_trace_enabled(self, attr):
+        if attr.get_write_value():
+            tracer.enable(tracer.dump_path)
+        else:
+            tracer.disable()
+
+    # ------------------------------------------------------------------
+    #    dumpTrace command:
+    #
+    #    Description: write the acquisition timeline as Chrome trace JSON
+    #    argin: DevString file, trace_file property if empty
+    #    argout: DevString file written
+    # ------------------------------------------------------------------
+    @Core.DEB_MEMBER_FUNCT
+    def dumpTrace(self, argin):
+        try:
+            return tracer.dump(argin)
+        except (ValueError, OSError) as e:
+            PyTango.Except.throw_exception(
+                "Advacam_Error", str(e), "Advacam.dumpTrace"
+            )
+
+    # ------------------------------------------------------------------
+    #    setSensorRefresh command:
+    #
+    #    Description: sensor refresh scheduled in the acquisition gaps
+    #    argin: DevVarDoubleArray [period (s), dose (counts),
+    #           between IntTrigMult frames (0/1)], period and dose 0: off
+    # ------------------------------------------------------------------
+    @Core.DEB_MEMBER_FUNCT
+    def setSensorRefresh(self, argin):
+        if len(argin) not in (2, 3):
+            PyTango.Except.throw_exception(
+                "Advacam_Error",
+                "Expected [period, dose, between frames]",
+                "Advacam.setSensorRefresh",
+            )
+        between_frames = bool(argin[2]) if len(argin) > 2 else False
+        _AdvacamCamera.setSensorRefresh(argin[0], argin[1], between_frames)
+
+    # ------------------------------------------------------------------
+    #    setTimeSlicing command:
+    #
+    #    Description: TPX3 ToA time slices accumulated over the frames
+    #    argin: DevVarDoubleArray [nb slices (0: disable), t_min (ns),
+    #           t_max (ns), period (ns, 0: none), ToT weighted (0/1)]
+    # ------------------------------------------------------------------
+    @Core.DEB_MEMBER_FUNCT
+    def setTimeSlicing(self, argin):
+        if len(argin) not in (1, 3, 4, 5):
+            PyTango.Except.throw_exception(
+                "Advacam_Error",
+                "Expected [nb slices, t_min, t_max, period, ToT weighted]",
+                "Advacam.setTimeSlicing",
+            )
+        nb_slices = int(argin[0])
+        if not nb_slices:
+            _AdvacamCamera.setTimeSlicing(0, 0, 0)
+            return
+        period = argin[3] if len(argin) > 3 else 0.0
+        weight_tot = bool(argin[4]) if len(argin) > 4 else False
+        _AdvacamCamera.setTimeSlicing(nb_slices, argin[1], argin[2], period, weight_tot)
+
+    @Core.DEB_MEMBER_FUNCT
+    def resetTimeSlices(self):
+        # a Camera call: with isolated_sdk the slicer is in the worker
+        _AdvacamCamera.resetTimeSlices()
+
+    # ------------------------------------------------------------------
+    #    resetSpectrum command:
+    #
+    #    Description: clear the accumulated spectra
+    # ------------------------------------------------------------------
+    @Core.DEB_MEMBER_FUNCT
+    def resetSpectrum(self):
+        self.__spectrum.reset()
+
+    # ------------------------------------------------------------------
+    #    setSpectrumRois command:
+    #
+    #    Description: set the spectrum ROIs, one roi_spectra row each
+    #    argin: DevVarLongArray [x0, y0, width0, height0, x1, ...]
+    # ------------------------------------------------------------------
+    @Core.DEB_MEMBER_FUNCT
+    def setSpectrumRois(self, argin):
+        if len(argin) % 4:
+            PyTango.Except.throw_exception(
+                "Advacam_Error",
+                "Expected [x0, y0, width0, height0, x1, ...]",
+                "Advacam.setSpectrumRois",
+            )
+        # frames are published as (width, height) arrays
+        shape = (_AdvacamCamera.image_width, _AdvacamCamera.image_height)
+        rois = {}
+        for i in range(0, len(argin), 4):
+            rois[f"roi{i // 4}"] = rectangle_mask(shape, *argin[i : i + 4])
+        try:
+            self.__spectrum.setRois(rois, shape)
+        except ValueError as e:
+            PyTango.Except.throw_exception(
+                "Advacam_Error", str(e), "Advacam.setSpectrumRois"
+            )
+
+    # ------------------------------------------------------------------
+    #    setRoiCounters command:
+    #
+    #    Description: set the counter ROIs, one roi_counter_sums column each
+    #    argin: DevVarLongArray [x0, y0, width0, height0, x1, ...]
+    # ------------------------------------------------------------------
+    @Core.DEB_MEMBER_FUNCT
+    def setRoiCounters(self, argin):
+        if len(argin) % 4:
+            PyTango.Except.throw_exception(
+                "Advacam_Error",
+                "Expected [x0, y0, width0, height0, x1, ...]",
+                "Advacam.setRoiCounters",
+            )
+        # frames are published as (width, height) arrays, x is the column
+        self.__roi_counters.setRois(numpy.reshape(argin, (-1, 4)))
+
+    # ------------------------------------------------------------------
+    #    readRoiCounters command:
+    #
+    #    Description: ROI counters of the frames in the ring after a frame
+    #    argin: DevLong last frame id already read, -1 for all
+    #    argout: DevVarDoubleArray one row per frame:
+    #            [frame id, sum0, ..., count0, ...]
+    # ------------------------------------------------------------------
+    @Core.DEB_MEMBER_FUNCT
+    def readRoiCounters(self, argin):
+        frame_ids, _, sums, counts = self.__roi_counters.read(argin)
+        return numpy.column_stack((frame_ids, sums, counts)).ravel()
+
+    # ------------------------------------------------------------------
+    #    restartSdk command:
+    #
+    #    Description: restart the pixet SDK worker process (isolated_sdk)
+    # ------------------------------------------------------------------
+    @Core.DEB_MEMBER_FUNCT
+    def restartSdk(self):
+        if not hasattr(_AdvacamCamera, "restartWorker"):
+            PyTango.Except.throw_exception(
+                "Advacam_Error",
+                "SDK does not run in a worker process (isolated_sdk property)",
+                "Advacam.restartSdk",
+            )
+        _AdvacamCamera.restartWorker()
+
+    # ------------------------------------------------------------------
+    #    startThresholdScan command:
+    #
+    #    Description: start an energy threshold scan
+    #    argin: DevVarDoubleArray [exposure time (s), threshold0 (keV), ...]
+    # ------------------------------------------------------------------
+    @Core.DEB_MEMBER_FUNCT
+    def startThresholdScan(self, argin):
+        if len(argin) < 3:
+            PyTango.Except.throw_exception(
+                "Advacam_Error",
+                "Expected [exposure time, threshold0, threshold1, ...]",
+                "Advacam.startThresholdScan",
+            )
+        _AdvacamCamera.startThresholdScan(argin[1:], argin[0])
+
+    @Core.DEB_MEMBER_FUNCT
+    def abortThresholdScan(self):
+        _AdvacamCamera.abortThresholdScan()
+
     # ------------------------------------------------------------------
     #    getAttrStringValueList command:
     #
@@ -104,7 +568,15 @@ class Advacam(PyTango.LatestDeviceImpl):
     # ==================================================================
     def __getattr__(self, name):
         # use AttrHelper
-        return AttrHelper.get_attr_4u(self, name, _AdvacamCamera)
+        method = AttrHelper.get_attr_4u(self, name, _AdvacamCamera)
+        if not tracer.enabled or not name.startswith(("read_", "write_")):
+            return method
+
+        def traced(*args):
+            with tracer.span(name, "tango"):
+                return method(*args)
+
+        return traced
 
 
 # ==================================================================
@@ -124,6 +596,96 @@ class AdvacamClass(PyTango.DeviceClass):
             [],
         ],
         "energy_threshold": [PyTango.DevDouble, "Energy threshold in keV", []],
+        "energy_calibration": [
+            PyTango.DevString,
+            "TPX3 ToT calibration (.npz or directory of Pixet calib[abct].txt)",
+            [],
+        ],
+        "buffer_memory_budget": [
+            PyTango.DevDouble,
+            "Lima buffers memory in MB, sized from the consumers lag if set",
+            [],
+        ],
+        "gap_policy": [
+            PyTango.DevString,
+            "On frames lost by the SDK: abort, blank or continue",
+            ["continue"],
+        ],
+        "statistics_push_period": [
+            PyTango.DevDouble,
+            "Min period in s between two pushes of the acquisition statistics",
+            [0.5],
+        ],
+        "isolated_sdk": [
+            PyTango.DevBoolean,
+            "Run the pixet SDK in a separate worker process",
+            [False],
+        ],
+        "refresh_period": [
+            PyTango.DevDouble,
+            "Sensor refresh period in s, done in the acquisition gaps, 0: none",
+            [0.0],
+        ],
+        "refresh_dose": [
+            PyTango.DevDouble,
+            "Sensor refresh after these counts, done in the acquisition gaps, 0: none",
+            [0.0],
+        ],
+        "conversion_threads": [
+            PyTango.DevLong,
+            "Threads converting the multi-chip frames per chip tile",
+            [1],
+        ],
+        "trace_file": [
+            PyTango.DevString,
+            "Chrome trace file written at each acquisition end, no trace if empty",
+            [],
+        ],
+        "replay_file": [
+            PyTango.DevString,
+            "Replay this recording instead of using the detector",
+            [],
+        ],
+        "stream_path": [
+            PyTango.DevString,
+            "Unix socket path where frames are streamed, no streaming if empty",
+            [],
+        ],
+        "stream_decimation": [
+            PyTango.DevLong,
+            "Only stream one frame every stream_decimation frames",
+            [1],
+        ],
+        "stream_high_water_mark": [
+            PyTango.DevLong,
+            "Max number of frames queued per stream client before dropping",
+            [16],
+        ],
+        "shm_ring_name": [
+            PyTango.DevString,
+            "Shared memory name where frames are mirrored, no mirroring if empty",
+            [],
+        ],
+        "shm_ring_slots": [
+            PyTango.DevLong,
+            "Number of frames kept in the shared memory ring",
+            [16],
+        ],
+        "spectrum_nb_bins": [
+            PyTango.DevLong,
+            "Number of bins of the accumulated spectra",
+            [1024],
+        ],
+        "spectrum_bin_width": [
+            PyTango.DevDouble,
+            "Bin width of the accumulated spectra (ToT or keV)",
+            [1.0],
+        ],
+        "roi_counter_slots": [
+            PyTango.DevLong,
+            "Number of frames kept in the ROI counters ring",
+            [10000],
+        ],
     }
 
     cmd_list = {
@@ -131,6 +693,45 @@ class AdvacamClass(PyTango.DeviceClass):
             [PyTango.DevString, "Attribute name"],
             [PyTango.DevVarStringArray, "Authorized String value list"],
         ],
+        "restartSdk": [[PyTango.DevVoid, ""], [PyTango.DevVoid, ""]],
+        "classifyPixels": [
+            [PyTango.DevVarDoubleArray, "[hot sigma, dead fraction, noisy factor]"],
+            [PyTango.DevVarLongArray, "[hot, dead, noisy] pixel counts"],
+        ],
+        "startThresholdScan": [
+            [PyTango.DevVarDoubleArray, "[exposure time (s), threshold0 (keV), ...]"],
+            [PyTango.DevVoid, ""],
+        ],
+        "abortThresholdScan": [[PyTango.DevVoid, ""], [PyTango.DevVoid, ""]],
+        "resetSpectrum": [[PyTango.DevVoid, ""], [PyTango.DevVoid, ""]],
+        "setSensorRefresh": [
+            [PyTango.DevVarDoubleArray, "[period (s), dose (counts), between frames]"],
+            [PyTango.DevVoid, ""],
+        ],
+        "setTimeSlicing": [
+            [
+                PyTango.DevVarDoubleArray,
+                "[nb slices (0: off), t_min (ns), t_max (ns), period (ns), ToT weighted]",
+            ],
+            [PyTango.DevVoid, ""],
+        ],
+        "resetTimeSlices": [[PyTango.DevVoid, ""], [PyTango.DevVoid, ""]],
+        "dumpTrace": [
+            [PyTango.DevString, "trace file, trace_file property if empty"],
+            [PyTango.DevString, "trace file written"],
+        ],
+        "setSpectrumRois": [
+            [PyTango.DevVarLongArray, "[x0, y0, width0, height0, x1, ...]"],
+            [PyTango.DevVoid, ""],
+        ],
+        "setRoiCounters": [
+            [PyTango.DevVarLongArray, "[x0, y0, width0, height0, x1, ...]"],
+            [PyTango.DevVoid, ""],
+        ],
+        "readRoiCounters": [
+            [PyTango.DevLong, "last frame id read, -1 for all"],
+            [PyTango.DevVarDoubleArray, "[frame id, sum0, ..., count0, ...] per frame"],
+        ],
     }
 
     attr_list = {
@@ -165,6 +766,52 @@ class AdvacamClass(PyTango.DeviceClass):
                 "description": "chip operation mode",
             },
         ],
+        "counter_output": [
+            [PyTango.DevString, PyTango.SCALAR, PyTango.READ_WRITE],
+            {
+                "description": "MPX3 published counter(s): counter0, counter1, "
+                "both (stacked) or window (counter0 - counter1)",
+            },
+        ],
+        "trace_enabled": [
+            [PyTango.DevBoolean, PyTango.SCALAR, PyTango.READ_WRITE],
+            {
+                "description": "record the acquisition timeline",
+            },
+        ],
+        "recording": [
+            [PyTango.DevString, PyTango.SCALAR, PyTango.READ_WRITE],
+            {
+                "description": "file where the raw frames are recorded, empty to stop",
+            },
+        ],
+        "recorded_frames": [
+            [PyTango.DevLong, PyTango.SCALAR, PyTango.READ],
+            {
+                "description": "frames written in the current recording",
+            },
+        ],
+        "energy_calibration": [
+            [PyTango.DevString, PyTango.SCALAR, PyTango.READ_WRITE],
+            {
+                "description": "TPX3 ToT calibration file/directory, empty if none",
+            },
+        ],
+        "energy_map": [
+            [PyTango.DevBoolean, PyTango.SCALAR, PyTango.READ_WRITE],
+            {
+                "description": "publish the calibrated energy (keV, float32) "
+                "instead of the ToT",
+            },
+        ],
+        "energy_conversion_time": [
+            [PyTango.DevDouble, PyTango.SCALAR, PyTango.READ],
+            {
+                "unit": "s",
+                "format": "%.6f",
+                "description": "mean per frame ToT to energy conversion time",
+            },
+        ],
         "sensed_bias_voltage": [
             [PyTango.DevDouble, PyTango.SCALAR, PyTango.READ],
             {
@@ -189,6 +836,304 @@ class AdvacamClass(PyTango.DeviceClass):
                 "description": "temperature",
             },
         ],
+        "fps": [
+            [PyTango.DevDouble, PyTango.SCALAR, PyTango.READ],
+            {
+                "unit": "Hz",
+                "format": "%.1f",
+                "description": "current frame rate",
+            },
+        ],
+        "frames_acquired": [
+            [PyTango.DevLong, PyTango.SCALAR, PyTango.READ],
+            {
+                "description": "frames acquired in the current acquisition",
+            },
+        ],
+        "frames_dropped": [
+            [PyTango.DevLong, PyTango.SCALAR, PyTango.READ],
+            {
+                "description": "frames lost in the current acquisition",
+            },
+        ],
+        "sdk_dropped_frames": [
+            [PyTango.DevLong, PyTango.SCALAR, PyTango.READ],
+            {
+                "description": "frames lost by the SDK (gaps in its frame numbers)",
+            },
+        ],
+        "ingest_dropped_frames": [
+            [PyTango.DevLong, PyTango.SCALAR, PyTango.READ],
+            {
+                "description": "frames lost in the conversion/copy to Lima",
+            },
+        ],
+        "overrun_frames": [
+            [PyTango.DevLong, PyTango.SCALAR, PyTango.READ],
+            {
+                "description": "frames refused by Lima (buffer overrun)",
+            },
+        ],
+        "refresh_duration": [
+            [PyTango.DevDouble, PyTango.SCALAR, PyTango.READ],
+            {
+                "unit": "s",
+                "format": "%.3f",
+                "description": "duration of the last sensor refresh",
+            },
+        ],
+        "time_to_refresh": [
+            [PyTango.DevDouble, PyTango.SCALAR, PyTango.READ],
+            {
+                "unit": "s",
+                "format": "%.1f",
+                "description": "time until the next sensor refresh is due, -1 if none scheduled",
+            },
+        ],
+        "refresh_count": [
+            [PyTango.DevLong, PyTango.SCALAR, PyTango.READ],
+            {
+                "description": "sensor refreshes done",
+            },
+        ],
+        "refresh_failures": [
+            [PyTango.DevLong, PyTango.SCALAR, PyTango.READ],
+            {
+                "description": "sensor refreshes failed, retried later",
+            },
+        ],
+        "refresh_error": [
+            [PyTango.DevString, PyTango.SCALAR, PyTango.READ],
+            {
+                "description": "last sensor refresh failure, empty after a successful refresh",
+            },
+        ],
+        "scan_mode": [
+            [PyTango.DevBoolean, PyTango.SCALAR, PyTango.READ_WRITE],
+            {
+                "description": "fast re-arm for step scans: persistent acquisition thread, unchanged settings not re-sent",
+            },
+        ],
+        "counter_depth": [
+            [PyTango.DevLong, PyTango.SCALAR, PyTango.READ_WRITE],
+            {
+                "unit": "bit",
+                "description": "MPX3 counter depth: 1, 6, 12 or 24 bits",
+            },
+        ],
+        "counter_depth_fps": [
+            [PyTango.DevDouble, PyTango.SPECTRUM, PyTango.READ, 4],
+            {
+                "unit": "Hz",
+                "description": "best frame rate measured at 1, 6, 12 and 24 bits, 0 if never used",
+            },
+        ],
+        "conversion_threads": [
+            [PyTango.DevLong, PyTango.SCALAR, PyTango.READ_WRITE],
+            {
+                "description": "threads converting the multi-chip frames per chip tile",
+            },
+        ],
+        "batch_mode": [
+            [PyTango.DevBoolean, PyTango.SCALAR, PyTango.READ_WRITE],
+            {
+                "description": "drain the SDK frames by batch from a thread",
+            },
+        ],
+        "batch_size_histogram": [
+            [PyTango.DevLong64, PyTango.SPECTRUM, PyTango.READ, 65],
+            {
+                "description": "batches drained per size (index), last bin: larger",
+            },
+        ],
+        "gap_policy": [
+            [PyTango.DevString, PyTango.SCALAR, PyTango.READ_WRITE],
+            {
+                "description": "on frames lost by the SDK: abort, blank or continue",
+            },
+        ],
+        "callback_latency_p99": [
+            [PyTango.DevDouble, PyTango.SCALAR, PyTango.READ],
+            {
+                "unit": "s",
+                "format": "%.6f",
+                "description": "99th percentile of the frame callback duration",
+            },
+        ],
+        "threshold_scan_running": [
+            [PyTango.DevBoolean, PyTango.SCALAR, PyTango.READ],
+            {
+                "description": "energy threshold scan in progress",
+            },
+        ],
+        "threshold_scan_progress": [
+            [PyTango.DevLong, PyTango.SCALAR, PyTango.READ],
+            {
+                "description": "thresholds done in the current scan",
+            },
+        ],
+        "threshold_scan_edge": [
+            [PyTango.DevFloat, PyTango.IMAGE, PyTango.READ, 4096, 4096],
+            {
+                "unit": "keV",
+                "description": "per pixel S-curve edge of the last threshold scan",
+            },
+        ],
+        "threshold_scan_width": [
+            [PyTango.DevFloat, PyTango.IMAGE, PyTango.READ, 4096, 4096],
+            {
+                "unit": "keV",
+                "description": "per pixel S-curve width of the last threshold scan",
+            },
+        ],
+        "pixel_calibration": [
+            [PyTango.DevBoolean, PyTango.SCALAR, PyTango.READ_WRITE],
+            {
+                "description": "per pixel mean/variance of the acquired frames (dark or flat)",
+            },
+        ],
+        "pixel_calibration_frames": [
+            [PyTango.DevLong, PyTango.SCALAR, PyTango.READ],
+            {
+                "description": "frames in the pixel statistics",
+            },
+        ],
+        "pixel_mean": [
+            [PyTango.DevDouble, PyTango.IMAGE, PyTango.READ, 4096, 4096],
+            {
+                "description": "per pixel mean of the pixel calibration frames",
+            },
+        ],
+        "pixel_variance": [
+            [PyTango.DevDouble, PyTango.IMAGE, PyTango.READ, 4096, 4096],
+            {
+                "description": "per pixel variance of the pixel calibration frames",
+            },
+        ],
+        "pixel_flags": [
+            [PyTango.DevUChar, PyTango.IMAGE, PyTango.READ, 4096, 4096],
+            {
+                "description": "classified pixels: 1 hot, 2 dead, 4 noisy (or'ed)",
+            },
+        ],
+        "pixel_stats_update_time": [
+            [PyTango.DevDouble, PyTango.SCALAR, PyTango.READ],
+            {
+                "unit": "s",
+                "format": "%.6f",
+                "description": "duration of the last pixel statistics update",
+            },
+        ],
+        "time_slices": [
+            [PyTango.DevDouble, PyTango.IMAGE, PyTango.READ, 4096, 65536],
+            {
+                "description": "ToA time slices stacked vertically (nb slices * width)",
+            },
+        ],
+        "time_slice_edges": [
+            [PyTango.DevDouble, PyTango.SPECTRUM, PyTango.READ, 65536],
+            {
+                "unit": "ns",
+                "description": "ToA edges of the time slices",
+            },
+        ],
+        "time_slice_repetitions": [
+            [PyTango.DevLong, PyTango.SCALAR, PyTango.READ],
+            {
+                "description": "frames accumulated in the time slices",
+            },
+        ],
+        "spectrum_enabled": [
+            [PyTango.DevBoolean, PyTango.SCALAR, PyTango.READ_WRITE],
+            {
+                "description": "accumulate the ToT/energy spectra of the frames",
+            },
+        ],
+        "spectrum": [
+            [PyTango.DevLong64, PyTango.SPECTRUM, PyTango.READ, 65536],
+            {
+                "description": "accumulated spectrum of the whole sensor",
+            },
+        ],
+        "spectrum_bins": [
+            [PyTango.DevDouble, PyTango.SPECTRUM, PyTango.READ, 65536],
+            {
+                "description": "lower edge of the spectrum bins",
+            },
+        ],
+        "roi_spectra": [
+            [PyTango.DevLong64, PyTango.IMAGE, PyTango.READ, 65536, 64],
+            {
+                "description": "accumulated spectra of the ROIs, one per row",
+            },
+        ],
+        "spectrum_update_time": [
+            [PyTango.DevDouble, PyTango.SCALAR, PyTango.READ],
+            {
+                "unit": "s",
+                "format": "%.6f",
+                "description": "spectra update time of the last frame",
+            },
+        ],
+        "roi_counters_enabled": [
+            [PyTango.DevBoolean, PyTango.SCALAR, PyTango.READ_WRITE],
+            {
+                "description": "compute the ROI counters of the frames",
+            },
+        ],
+        "roi_counter_frames": [
+            [PyTango.DevLong64, PyTango.SPECTRUM, PyTango.READ, 1000000],
+            {
+                "description": "frame ids in the ROI counters ring, oldest first",
+            },
+        ],
+        "roi_counter_sums": [
+            [PyTango.DevDouble, PyTango.IMAGE, PyTango.READ, 4096, 1000000],
+            {
+                "description": "ROI sums, one row per roi_counter_frames frame",
+            },
+        ],
+        "roi_counter_counts": [
+            [PyTango.DevLong64, PyTango.IMAGE, PyTango.READ, 4096, 1000000],
+            {
+                "description": "ROI hit pixels (counts > 0), one row per frame",
+            },
+        ],
+        "roi_counter_update_time": [
+            [PyTango.DevDouble, PyTango.SCALAR, PyTango.READ],
+            {
+                "unit": "s",
+                "format": "%.6f",
+                "description": "ROI counters update time of the last frame",
+            },
+        ],
+        "buffer_budget": [
+            [PyTango.DevDouble, PyTango.SCALAR, PyTango.READ_WRITE],
+            {
+                "unit": "MB",
+                "description": "Lima buffers memory budget, 0: Lima sizing",
+            },
+        ],
+        "buffer_count": [
+            [PyTango.DevLong, PyTango.SCALAR, PyTango.READ],
+            {
+                "description": "number of Lima buffers",
+            },
+        ],
+        "buffer_headroom": [
+            [PyTango.DevLong, PyTango.SCALAR, PyTango.READ],
+            {
+                "description": "Lima buffers above the estimated need, -1 if unknown",
+            },
+        ],
+        "buffer_fill_level": [
+            [PyTango.DevDouble, PyTango.SCALAR, PyTango.READ],
+            {
+                "unit": "%",
+                "format": "%.1f",
+                "description": "Lima buffers holding frames not yet processed/saved",
+            },
+        ],
     }
 
     def __init__(self, name):
@@ -201,11 +1146,15 @@ class AdvacamClass(PyTango.DeviceClass):
 # ----------------------------------------------------------------------------
 _AdvacamCamera = None
 _AdvacamInterface = None
+_AdvacamControl = None
 
 
-def get_control(config_path=None, device_id="", **keys):
+def get_control(
+    config_path=None, device_id="", isolated_sdk=False, replay_file=None, **keys
+):
     global _AdvacamCamera
     global _AdvacamInterface
+    global _AdvacamControl
 
     if config_path is None:
         print("Advacam will use factory configuration in '/opt/pixet/factory'")
@@ -213,9 +1162,14 @@ def get_control(config_path=None, device_id="", **keys):
         print(f"Advacam config path: {config_path} (device_id = {device_id})")
 
     if _AdvacamInterface is None:
-        _AdvacamInterface = Interface(config_path, device_id)
+        _AdvacamInterface = Interface(
+            config_path, device_id, isolated_sdk, replay_file or None
+        )
         _AdvacamCamera = _AdvacamInterface.camera
-    return Core.CtControl(_AdvacamInterface)
+    _AdvacamControl = Core.CtControl(_AdvacamInterface)
+    # the consumers lag is measured for the Lima buffers sizing
+    _AdvacamInterface.buffer_manager.attachControl(_AdvacamControl)
+    return _AdvacamControl
 
 
 def get_tango_specific_class_n_device():
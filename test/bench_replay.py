@@ -0,0 +1,97 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+# Ingest path (Camera callback -> Lima) benchmark on a recorded stream, no
+# detector needed but the pixet SDK and Lima must be installed:
+#   python test/bench_replay.py run.advrec --frames 10000 --fast
+#   python test/bench_replay.py run.advrec --frames 10000 --fast --batch
+#
+# A recording is made with Camera.startRecording(path) (or the Tango
+# recording attribute) during a real acquisition.
+
+import os
+import sys
+import time
+import argparse
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from Lima import Core
+from Advacam.Interface import Interface
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("recording")
+    parser.add_argument("--frames", type=int, default=1000)
+    parser.add_argument("--expo", type=float, default=0.001)
+    parser.add_argument(
+        "--fast", action="store_true", help="as fast as possible, not recorded timing"
+    )
+    parser.add_argument("--batch", action="store_true", help="batch mode")
+    args = parser.parse_args()
+
+    hwint = Interface(replay_file=args.recording)
+    camera = hwint.camera
+    camera.detector.realtime = not args.fast
+    camera.batch_mode = args.batch
+    ct = Core.CtControl(hwint)
+    acq = ct.acquisition()
+    acq.setAcqNbFrames(args.frames)
+    acq.setAcqExpoTime(args.expo)
+
+    ct.prepareAcq()
+    t0 = time.perf_counter()
+    ct.startAcq()
+    while ct.getStatus().AcquisitionStatus != Core.AcqReady:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - t0
+
+    stats = camera.statistics
+    last_image = ct.getStatus().ImageCounters.LastImageReady
+    print(f"{args.recording}: {camera.fullName} {camera.operation_mode}")
+    print(
+        f"{last_image + 1} frames ready in {elapsed:.3f} s: "
+        f"{(last_image + 1) / elapsed:.0f} fps"
+    )
+    print(
+        f"callback latency p99 {stats.latency_p99 * 1e6:.0f} us, "
+        f"dropped sdk {stats.sdk_dropped} ingest {stats.ingest_dropped} "
+        f"overrun {stats.overrun}"
+    )
+    if args.batch:
+        histogram = camera.batch_size_histogram
+        sizes = numpy.flatnonzero(histogram)
+        print(
+            "batch sizes: "
+            + ", ".join(f"{size}: {histogram[size]}" for size in sizes)
+        )
+    hwint.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
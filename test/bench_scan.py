@@ -0,0 +1,105 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+
+# Per point overhead of a step scan on the replay device, no detector
+# needed but the pixet SDK and Lima must be installed:
+#   python test/bench_scan.py --points 1000
+#   python test/bench_scan.py run.advrec --points 1000 --trigger IntTrigMult
+#
+# Each point sets the threshold (unchanged) and runs prepareAcq/startAcq
+# until Ready, without then with Camera.scan_mode.
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from Lima import Core
+from Advacam.Interface import Interface
+from soak_acq import synthetic_recording
+
+
+def scan(ct, camera, nb_points, nb_frames, multi):
+    threshold = camera.energy_threshold0
+    times = numpy.empty(nb_points)
+    for point in range(nb_points):
+        t0 = time.perf_counter()
+        camera.energy_threshold0 = threshold
+        ct.prepareAcq()
+        for i in range(nb_frames if multi else 1):
+            ct.startAcq()
+            if multi:
+                while ct.getStatus().ImageCounters.LastImageReady < i:
+                    time.sleep(0.0001)
+        while ct.getStatus().AcquisitionStatus != Core.AcqReady:
+            time.sleep(0.0001)
+        times[point] = time.perf_counter() - t0
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("recording", nargs="?", help="synthetic TPX3 frames if none")
+    parser.add_argument("--points", type=int, default=1000)
+    parser.add_argument("--frames", type=int, default=1, help="frames per point")
+    parser.add_argument("--expo", type=float, default=0.0001)
+    parser.add_argument("--trigger", choices=("IntTrig", "IntTrigMult"), default="IntTrig")
+    args = parser.parse_args()
+
+    recording = args.recording
+    if recording is None:
+        recording = os.path.join(tempfile.mkdtemp(), "scan.advrec")
+        synthetic_recording(recording)
+
+    hwint = Interface(replay_file=recording)
+    camera = hwint.camera
+    camera.detector.realtime = False
+    ct = Core.CtControl(hwint)
+    acq = ct.acquisition()
+    multi = args.trigger == "IntTrigMult"
+    acq.setTriggerMode(Core.IntTrigMult if multi else Core.IntTrig)
+    acq.setAcqNbFrames(args.frames)
+    acq.setAcqExpoTime(args.expo)
+
+    for scan_mode in (False, True):
+        camera.scan_mode = scan_mode
+        times = scan(ct, camera, args.points, args.frames, multi) * 1e3
+        print(
+            f"scan_mode {str(scan_mode):>5}: {args.points} points in {times.sum() / 1e3:.2f} s, "
+            f"per point mean {times.mean():.2f} ms, median {numpy.median(times):.2f} ms, "
+            f"p99 {numpy.percentile(times, 99):.2f} ms"
+        )
+    camera.scan_mode = False
+    hwint.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+# Consumer visible latency and throughput of the shared memory frame ring,
+# no detector needed:
+#   python test/bench_shm_ring.py --readers 2 --frames 5000 --fps 2000
+#
+# With python < 3.13 the forked readers share the resource tracker of the
+# writer, it may complain about an unknown segment when the ring is closed.
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from Advacam.shm_ring import SharedFrameRing, SharedFrameRingReader
+
+
+def reader(name, nb_frames, ready, results):
+    latencies = []
+    nb_invalid = 0
+    with SharedFrameRingReader(name) as ring:
+        ready.set()
+        for frame in ring.frames(timeout=2.0):
+            latencies.append(time.time() - frame.timestamp)
+            frame.data.sum()
+            if not frame.valid:
+                nb_invalid += 1
+            if frame.frame_id == nb_frames - 1:
+                break
+        results.put((numpy.array(latencies), ring.lost, nb_invalid))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--slots", type=int, default=16)
+    parser.add_argument("--width", type=int, default=256)
+    parser.add_argument("--height", type=int, default=256)
+    parser.add_argument("--fps", type=float, default=0, help="0: as fast as possible")
+    args = parser.parse_args()
+
+    frame = numpy.zeros((args.width, args.height), dtype=numpy.int16)
+    ring = SharedFrameRing(nb_slots=args.slots, slot_size=frame.nbytes)
+
+    results = multiprocessing.Queue()
+    procs = []
+    for i in range(args.readers):
+        ready = multiprocessing.Event()
+        p = multiprocessing.Process(
+            target=reader, args=(ring.name, args.frames, ready, results)
+        )
+        p.start()
+        ready.wait()
+        procs.append(p)
+
+    period = 1.0 / args.fps if args.fps else 0
+    t0 = time.perf_counter()
+    for i in range(args.frames):
+        frame[0, 0] = i
+        ring.newFrame(i, frame, time.time())
+        if period:
+            time.sleep(max(0, t0 + (i + 1) * period - time.perf_counter()))
+    elapsed = time.perf_counter() - t0
+
+    stats = [results.get() for p in procs]
+    for p in procs:
+        p.join()
+    ring.close()
+
+    print(f"{args.readers} readers, {args.slots} slots, frame {frame.shape} {frame.dtype}")
+    print(
+        f"written {args.frames} frames in {elapsed:.3f} s: "
+        f"{args.frames / elapsed:.0f} fps, {args.frames * frame.nbytes / elapsed / 1e6:.0f} MB/s"
+    )
+    for i, (latencies, lost, invalid) in enumerate(stats):
+        lat = latencies * 1e6
+        print(
+            f"  reader #{i}: read {len(lat)} lost {lost} overwritten while read {invalid}, "
+            f"latency median {numpy.median(lat):.0f} us p99 {numpy.percentile(lat, 99):.0f} us"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+# Throughput of the FramePublisher with N local subscribers, no detector
+# needed:
+#   python test/bench_streaming.py --subscribers 4 --frames 2000
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from Advacam.streaming import FramePublisher, FrameSubscriber
+
+
+def subscriber(path, results, slow):
+    nb_frames = 0
+    nb_bytes = 0
+    with FrameSubscriber(path) as sub:
+        for frame_id, timestamp, data in sub:
+            nb_frames += 1
+            nb_bytes += data.nbytes
+            if slow:
+                time.sleep(slow)
+    results.put((nb_frames, nb_bytes))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=4)
+    parser.add_argument("--slow", type=int, default=1, help="nb of slow subscribers")
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--width", type=int, default=256)
+    parser.add_argument("--height", type=int, default=256)
+    parser.add_argument("--hwm", type=int, default=16)
+    parser.add_argument("--fps", type=float, default=0, help="0: as fast as possible")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "advacam.sock")
+    publisher = FramePublisher(path, high_water_mark=args.hwm)
+    publisher.start()
+
+    results = multiprocessing.Queue()
+    procs = []
+    for i in range(args.subscribers):
+        slow = 0.01 if i < args.slow else 0
+        p = multiprocessing.Process(target=subscriber, args=(path, results, slow))
+        p.start()
+        procs.append(p)
+    while publisher.nb_subscribers < args.subscribers:
+        time.sleep(0.01)
+
+    frame = numpy.zeros((args.width, args.height), dtype=numpy.int16)
+    period = 1.0 / args.fps if args.fps else 0
+    cost = numpy.empty(args.frames)
+    t0 = time.perf_counter()
+    for i in range(args.frames):
+        t = time.perf_counter()
+        publisher.newFrame(i, frame, time.time())
+        cost[i] = time.perf_counter() - t
+        if period:
+            time.sleep(max(0, t0 + (i + 1) * period - time.perf_counter()))
+    elapsed = time.perf_counter() - t0
+
+    # let the fast subscribers drain their queue
+    time.sleep(0.5)
+    stats = publisher.getSubscriberStatistics()
+    publisher.stop()
+    received = [results.get() for p in procs]
+    for p in procs:
+        p.join()
+
+    print(f"{args.subscribers} subscribers ({args.slow} slow), hwm={args.hwm}")
+    print(
+        f"published {args.frames} frames {frame.shape} in {elapsed:.3f} s: "
+        f"{args.frames / elapsed:.0f} fps"
+    )
+    print(
+        f"newFrame() cost: mean {cost.mean() * 1e6:.1f} us, "
+        f"p99 {numpy.percentile(cost, 99) * 1e6:.1f} us, max {cost.max() * 1e6:.1f} us"
+    )
+    ok = True
+    for i, s in enumerate(stats):
+        print(
+            f"  subscriber #{i}: sent {s['sent']} dropped {s['dropped']} "
+            f"max queue {s['max_queue_depth']}"
+        )
+        if s["sent"] + s["dropped"] != args.frames:
+            ok = False
+    nb_received = sorted(r[0] for r in received)
+    print(f"frames received per subscriber: {nb_received}")
+    if not ok:
+        print("FAILED: sent + dropped != published")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+
+# Scaling of the per chip tile numpy stage with the number of threads on
+# WidePix geometries, no detector needed:
+#   python test/bench_tiles.py --geometry 2x10 2x15 --threads 1 2 4 8
+
+import os
+import sys
+import time
+import ctypes
+import argparse
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from Advacam.tiles import CHIP_SIZE, TileProcessor, chip_tiles, cast, subtract
+from Advacam.tot_calibration import TotCalibration
+
+
+def bench(func, nb_frames):
+    func()
+    t0 = time.perf_counter()
+    for i in range(nb_frames):
+        func()
+    return (time.perf_counter() - t0) / nb_frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--geometry", nargs="+", default=["2x10", "2x15"])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--frames", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = numpy.random.default_rng(0)
+    for geometry in args.geometry:
+        nb_rows, nb_cols = (int(n) for n in geometry.split("x"))
+        shape = (nb_rows * CHIP_SIZE, nb_cols * CHIP_SIZE)
+        tiles = chip_tiles(shape, nb_rows * nb_cols)
+        # 24 bits counters as delivered by the SDK
+        counter0 = rng.integers(0, 1 << 20, shape, dtype=numpy.int32)
+        counter1 = rng.integers(0, 1 << 20, shape, dtype=numpy.int32)
+        window = numpy.empty(shape, dtype=numpy.int32)
+        calib = TotCalibration(
+            rng.uniform(1.5, 2.5, shape),
+            rng.uniform(20, 40, shape),
+            rng.uniform(100, 300, shape),
+            rng.uniform(1, 4, shape),
+        )
+        tot = rng.integers(0, 200, shape, dtype=numpy.int16)
+        energy = numpy.empty(shape, dtype=numpy.float32)
+        # stands for a Lima frame buffer, reached through its address
+        raw = (ctypes.c_uint8 * energy.nbytes)()
+        lima = numpy.frombuffer(raw, dtype=energy.dtype).reshape(shape)
+        print(f"{geometry}: {shape[0]}x{shape[1]} pixels, {len(tiles)} tiles")
+        reference = {}
+        for nb_threads in args.threads:
+            processor = TileProcessor(nb_threads)
+            stages = {
+                "window c0-c1": lambda: processor.run(
+                    tiles, subtract, window, counter0, counter1
+                ),
+                "energy map": lambda: calib.toEnergy(
+                    tot, energy, processor=processor, tiles=tiles
+                ),
+                "copy to buffer": lambda: processor.run(tiles, cast, lima, energy),
+            }
+            results = {name: bench(func, args.frames) for name, func in stages.items()}
+            processor.close()
+            line = []
+            for name, dt in results.items():
+                reference.setdefault(name, dt)
+                line.append(f"{name} {dt * 1e3:6.2f} ms (x{reference[name] / dt:4.1f})")
+            print(f"  {nb_threads:2d} threads: " + "  ".join(line))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
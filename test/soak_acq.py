@@ -0,0 +1,261 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+
+# Soak and leak test of the acquisition path against the replay device, no
+# detector nor pixet SDK needed, Lima must be installed:
+#   python test/soak_acq.py --duration 14400
+#   python test/soak_acq.py run.advrec --duration 3600 --max-rss-growth 50
+#
+# Random cycles of prepare/start/stop: sequence lengths, IntTrig and
+# IntTrigMult, aborts with stopAcq, operation and batch mode changes. Every
+# report period the RSS, thread count, SDK frame references still open and
+# fps are printed; the run fails (exit code 1) as soon as a threshold is
+# crossed or an acquisition does not end.
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from Lima import Core
+from Advacam.Interface import Interface
+from Advacam.acquisition import Camera
+from Advacam.recorder import FrameRecorder
+
+SEQUENCE_LENGTHS = (1, 2, 10, 100, 1000)
+
+
+class _SyntheticFrame:
+    # TPX3 Event+iToT frame as the SDK gives it: iToT and Event subframes
+    def __init__(self, data, name="", sub_frames=()):
+        self.__data = data
+        self.__name = name
+        self.__sub_frames = list(sub_frames)
+
+    def subFrames(self):
+        return self.__sub_frames
+
+    def data(self):
+        return self.__data
+
+    def frameName(self):
+        return self.__name
+
+    def frameType(self):
+        # Camera.DT_I16
+        return 2
+
+    def destroy(self):
+        pass
+
+
+def synthetic_recording(path, nb_frames=100, lost=()):
+    # lost: SDK frame numbers (from 1) missing from the recording
+    info = {
+        "model": "TPX3",
+        "deviceType": 0,
+        "deviceID": "SOAK",
+        "fullName": "MiniPIX TPX3 SOAK",
+        "width": 256,
+        "height": 256,
+        "chipCount": 1,
+        "chipIDs": ["SOAK"],
+        "operationMode": int(Camera.PX_TPX3_OPM_EVENT_ITOT),
+        "threshold0": 5.0,
+        "threshold1": float("nan"),
+        "bias": 100.0,
+        "temperature": 40.0,
+    }
+    rng = numpy.random.default_rng(0)
+    values = [v for v in range(1, nb_frames + len(lost) + 1) if v not in lost]
+    with FrameRecorder(path, info) as recorder:
+        for value in values:
+            # at least one hit, blank frames stand out
+            event = rng.poisson(0.1, 256 * 256).astype(numpy.int16)
+            event[0] = 1
+            frame = _SyntheticFrame(
+                None,
+                sub_frames=(
+                    _SyntheticFrame(event * 10, "iToT"),
+                    _SyntheticFrame(event, "Event"),
+                ),
+            )
+            recorder.write(value, frame)
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class Soak:
+    def __init__(self, hwint, args):
+        self.hwint = hwint
+        self.camera = hwint.camera
+        self.ct = Core.CtControl(hwint)
+        self.acq = self.ct.acquisition()
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.cycles = 0
+        self.aborts = 0
+        self.frames = 0
+        self.fps = []
+
+    def __waitReady(self):
+        deadline = time.monotonic() + self.args.stuck_timeout
+        while self.ct.getStatus().AcquisitionStatus != Core.AcqReady:
+            if time.monotonic() > deadline:
+                raise RuntimeError(
+                    f"Acquisition stuck, camera status {self.camera.getStatus()}"
+                )
+            time.sleep(0.001)
+
+    def __waitImage(self, image):
+        deadline = time.monotonic() + self.args.stuck_timeout
+        while self.ct.getStatus().ImageCounters.LastImageReady < image:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Frame {image} never came")
+            time.sleep(0.0005)
+
+    def cycle(self):
+        rng = self.rng
+        camera = self.camera
+        if rng.random() < self.args.mode_change_rate:
+            camera.operation_mode = rng.choice(list(camera.OPERATION_MODES.values()))
+            camera.batch_mode = rng.random() < 0.5
+        nb_frames = rng.choice(SEQUENCE_LENGTHS)
+        multi = rng.random() < 0.3 and nb_frames <= 100
+        abort = rng.random() < self.args.abort_rate
+        self.acq.setTriggerMode(Core.IntTrigMult if multi else Core.IntTrig)
+        self.acq.setAcqNbFrames(nb_frames)
+        self.acq.setAcqExpoTime(self.args.expo)
+
+        self.ct.prepareAcq()
+        if multi:
+            stop_at = rng.randrange(nb_frames) if abort else nb_frames
+            for i in range(stop_at):
+                self.ct.startAcq()
+                self.__waitImage(i)
+        else:
+            self.ct.startAcq()
+            if abort:
+                time.sleep(rng.random() * nb_frames * self.args.expo)
+        if abort:
+            self.ct.stopAcq()
+            self.aborts += 1
+        self.__waitReady()
+        self.cycles += 1
+        self.frames += camera.statistics.frames_acquired
+        if not abort and not multi and nb_frames >= 100:
+            self.fps.append(camera.statistics.acq_fps)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("recording", nargs="?", help="synthetic TPX3 frames if none")
+    parser.add_argument("--duration", type=float, default=3600, help="s")
+    parser.add_argument("--report-period", type=float, default=60, help="s")
+    parser.add_argument("--warmup", type=float, default=60, help="s before the baseline")
+    parser.add_argument("--expo", type=float, default=0.0001)
+    parser.add_argument("--abort-rate", type=float, default=0.1)
+    parser.add_argument("--mode-change-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stuck-timeout", type=float, default=30, help="s")
+    parser.add_argument("--max-rss-growth", type=float, default=100, help="MB")
+    parser.add_argument("--max-thread-growth", type=int, default=2)
+    parser.add_argument("--max-open-frames", type=int, default=0)
+    parser.add_argument("--max-fps-drift", type=float, default=0.3, help="fraction")
+    args = parser.parse_args()
+
+    recording = args.recording
+    if recording is None:
+        recording = os.path.join(tempfile.mkdtemp(), "soak.advrec")
+        synthetic_recording(recording)
+
+    hwint = Interface(replay_file=recording)
+    hwint.camera.detector.realtime = False
+    soak = Soak(hwint, args)
+    detector = hwint.camera.detector
+
+    start = time.monotonic()
+    next_report = start + args.report_period
+    baseline = None
+    failure = None
+    print("time(s)  cycles  aborts  frames  rss(MB)  threads  open_frames  fps")
+    try:
+        while time.monotonic() - start < args.duration:
+            soak.cycle()
+            now = time.monotonic()
+            if now < next_report:
+                continue
+            next_report = now + args.report_period
+            fps = float(numpy.median(soak.fps)) if soak.fps else 0.0
+            soak.fps = []
+            sample = (rss_mb(), threading.active_count(), detector.open_frames, fps)
+            print(
+                f"{now - start:7.0f}  {soak.cycles:6d}  {soak.aborts:6d}  "
+                f"{soak.frames:6d}  {sample[0]:7.1f}  {sample[1]:7d}  "
+                f"{sample[2]:11d}  {sample[3]:.0f}",
+                flush=True,
+            )
+            if sample[2] > args.max_open_frames:
+                failure = f"{sample[2]} SDK frame references never destroyed"
+                break
+            if baseline is None:
+                if now - start >= args.warmup and fps:
+                    baseline = sample
+                continue
+            if sample[0] - baseline[0] > args.max_rss_growth:
+                failure = f"RSS grew by {sample[0] - baseline[0]:.1f} MB"
+            elif sample[1] - baseline[1] > args.max_thread_growth:
+                failure = f"{sample[1] - baseline[1]} more threads"
+            elif fps and abs(fps - baseline[3]) > args.max_fps_drift * baseline[3]:
+                failure = f"fps drifted from {baseline[3]:.0f} to {fps:.0f}"
+            if failure:
+                break
+    except RuntimeError as e:
+        failure = str(e)
+    finally:
+        hwint.quit()
+
+    if failure:
+        print(f"FAILED after {soak.cycles} cycles: {failure}")
+        return 1
+    print(f"OK: {soak.cycles} cycles, {soak.frames} frames, {soak.aborts} aborts")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+
+# Camera acquisitions on the replay device, through the SDK event
+# callback as with a detector: gap policies, batch drain and scan worker.
+# Lima is needed, the pixet SDK is not.
+
+import threading
+
+import pytest
+
+pytest.importorskip("Lima")
+
+from Advacam.acquisition import Camera
+from Advacam.listener import FrameListener
+from soak_acq import synthetic_recording
+
+TIMEOUT = 10
+
+
+class Frames(FrameListener):
+    def __init__(self):
+        self.ids = []
+        self.blanks = []
+        self.ended = threading.Event()
+
+    def prepareAcq(self):
+        self.ids = []
+        self.blanks = []
+        self.ended.clear()
+
+    def newFrame(self, frame_id, data, timestamp):
+        self.ids.append(frame_id)
+        if not data.any():
+            self.blanks.append(frame_id)
+
+    def endAcq(self):
+        self.ended.set()
+
+
+@pytest.fixture
+def replay(tmp_path):
+    cameras = []
+
+    def open_camera(nb_frames=10, lost=()):
+        path = str(tmp_path / f"replay{len(cameras)}.advrec")
+        synthetic_recording(path, nb_frames, lost)
+        camera = Camera(replay_file=path)
+        camera.detector.realtime = False
+        frames = Frames()
+        camera.registerFrameListener(frames)
+        cameras.append(camera)
+        return camera, frames
+
+    yield open_camera
+    for camera in cameras:
+        camera.scan_mode = False
+        camera.quit()
+        camera.detector.close()
+
+
+def acquire(camera, frames, nb_frames, status=Camera.READY):
+    camera.acq_nb_frames = nb_frames
+    camera.acq_expo_time = 0.001
+    camera.prepareAcq()
+    camera.startAcq()
+    assert frames.ended.wait(TIMEOUT)
+    assert camera.waitForStatus(status, TIMEOUT)
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_gap_continue(replay, batch):
+    # SDK frame 4 lost: the next frames are renumbered
+    camera, frames = replay(10, lost={4})
+    camera.batch_mode = batch
+    camera.gap_policy = "continue"
+    acquire(camera, frames, 10)
+    assert frames.ids == list(range(10))
+    assert frames.blanks == []
+    assert camera.statistics.sdk_dropped == 1
+    assert camera.detector.open_frames == 0
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_gap_blank(replay, batch):
+    # a blank frame keeps the Lima frame numbers on the SDK ones
+    camera, frames = replay(10, lost={4})
+    camera.batch_mode = batch
+    camera.gap_policy = "blank"
+    acquire(camera, frames, 10)
+    assert frames.ids == list(range(11))
+    assert frames.blanks == [3]
+    assert camera.statistics.sdk_dropped == 1
+    assert camera.detector.open_frames == 0
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_gap_abort(replay, batch):
+    camera, frames = replay(10, lost={4})
+    camera.batch_mode = batch
+    camera.gap_policy = "abort"
+    acquire(camera, frames, 10, status=Camera.ERROR)
+    # nothing after the gap, a batch holding it is not published
+    assert frames.ids == list(range(len(frames.ids)))
+    assert len(frames.ids) <= 3
+    if not batch:
+        assert frames.ids == [0, 1, 2]
+    assert camera.detector.open_frames == 0
+
+
+def test_batch_drain(replay):
+    camera, frames = replay(100)
+    camera.batch_mode = True
+    acquire(camera, frames, 100)
+    assert frames.ids == list(range(100))
+    histogram = camera.batch_size_histogram
+    nb_batches = sum(histogram)
+    assert nb_batches >= 1
+    assert sum(size * n for size, n in enumerate(histogram[:-1])) <= 100
+    assert camera.statistics.frames_acquired == 100
+    assert camera.detector.open_frames == 0
+
+
+def test_scan_worker(replay):
+    # back to back sequences on the persistent acquisition thread
+    camera, frames = replay(30)
+    camera.scan_mode = True
+    for i in range(3):
+        acquire(camera, frames, 10)
+        assert frames.ids == list(range(10))
+        assert camera.acquiredFrames == 10
+    threads = threading.active_count()
+    acquire(camera, frames, 10)
+    assert threading.active_count() == threads
+    camera.scan_mode = False
+    # the worker is gone, a plain sequence still runs
+    acquire(camera, frames, 5)
+    assert frames.ids == list(range(5))
@@ -0,0 +1,62 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import numpy
+
+from Advacam.pixel_stats import PixelStatistics, HOT, DEAD, NOISY
+
+
+def test_mean_variance():
+    rng = numpy.random.default_rng(1)
+    stack = rng.poisson(20, (50, 32, 48)).astype(numpy.uint16)
+    stats = PixelStatistics()
+    assert stats.mean().size == 0
+    for i, data in enumerate(stack):
+        stats.newFrame(i, data, 0.0)
+    assert stats.nb_frames == 50
+    numpy.testing.assert_allclose(stats.mean(), stack.mean(axis=0), rtol=1e-12)
+    numpy.testing.assert_allclose(
+        stats.variance(), stack.var(axis=0, ddof=1), rtol=1e-10
+    )
+
+    stats.prepareAcq()
+    assert stats.nb_frames == 0
+
+
+def test_classify():
+    rng = numpy.random.default_rng(2)
+    stats = PixelStatistics()
+    for i in range(100):
+        data = rng.poisson(100, (32, 32)).astype(numpy.float64)
+        data[3, 4] = 1000  # hot
+        data[5, 6] = 0  # dead
+        data[7, 8] = 100 + (300 if i % 2 else -90)  # noisy
+        stats.newFrame(i, data, 0.0)
+    flags = stats.classify(hot_sigma=5, dead_fraction=0.1, noisy_factor=3)
+    assert flags[3, 4] & HOT
+    assert flags[5, 6] & DEAD
+    assert flags[7, 8] & NOISY
+    assert numpy.count_nonzero(flags) == 3
+    # dead pixels only looked for in flat fields
+    assert not stats.classify(dead_fraction=0)[5, 6] & DEAD
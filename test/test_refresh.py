@@ -0,0 +1,86 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+
+import time
+
+import numpy
+
+from Advacam.refresh import RefreshScheduler
+
+
+class FakeDetector:
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    def doSensorRefresh(self):
+        self.calls += 1
+        result = self.results.pop(0) if self.results else 0
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def wait_for(predicate, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > end:
+            raise TimeoutError
+        time.sleep(0.01)
+
+
+def test_failure_keeps_dose_and_retries():
+    detector = FakeDetector([RuntimeError("no bias"), -3, 0])
+    refresh = RefreshScheduler(detector, dose=10, poll=0.01, retry_delay=0.05)
+    try:
+        refresh.newFrame(0, numpy.full((2, 2), 5), 0.0)
+        wait_for(lambda: refresh.nb_failures == 1)
+        assert refresh.nb_refreshes == 0
+        assert refresh.accumulated_dose == 20
+        assert "no bias" in str(refresh.error)
+
+        # a negative return code is a failure too
+        wait_for(lambda: refresh.nb_failures == 2)
+        assert "-3" in str(refresh.error)
+        assert refresh.accumulated_dose == 20
+
+        wait_for(lambda: refresh.nb_refreshes == 1)
+        assert refresh.error is None
+        assert refresh.accumulated_dose == 0
+        assert detector.calls == 3
+    finally:
+        refresh.close()
+
+
+def test_retry_delay():
+    detector = FakeDetector([RuntimeError("busy")])
+    refresh = RefreshScheduler(detector, period=0.01, poll=0.01, retry_delay=60)
+    try:
+        wait_for(lambda: refresh.nb_failures == 1)
+        time.sleep(0.2)
+        assert detector.calls == 1
+        assert refresh.time_to_refresh == 0
+    finally:
+        refresh.close()
@@ -0,0 +1,93 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import numpy
+import pytest
+
+from Advacam.roi_counters import RoiCounters
+from Advacam.spectrum import rectangle_mask
+
+
+def frames(nb_frames, shape=(64, 96), seed=0):
+    rng = numpy.random.default_rng(seed)
+    for i in range(nb_frames):
+        yield i, rng.poisson(0.7, shape).astype(numpy.int16)
+
+
+def test_rectangles_and_masks():
+    rects = [(0, 0, 5, 7), (10, 3, 20, 30), (90, 60, 10, 10), (3, 4, 1, 1)]
+    circle = numpy.hypot(*(numpy.mgrid[:64, :96] - [[[32]], [[48]]])) < 15
+    counters = RoiCounters(nb_slots=8)
+    counters.setRois(rects, {"circle": circle})
+    assert counters.names == ("rect0", "rect1", "rect2", "rect3", "circle")
+    for frame_id, data in frames(3):
+        counters.newFrame(frame_id, data, 0.0)
+        sums, counts = counters.read(frame_id - 1)[2:]
+        for k, (x, y, w, h) in enumerate(rects):
+            # rect2 is clipped by the frame
+            roi = data[y : y + h, x : x + w]
+            assert sums[0, k] == roi.sum()
+            assert counts[0, k] == numpy.count_nonzero(roi)
+        assert sums[0, -1] == data[circle].sum()
+        assert counts[0, -1] == numpy.count_nonzero(data[circle])
+
+
+def test_same_as_rectangle_mask():
+    counters = RoiCounters()
+    counters.setRois([(7, 2, 11, 13)], {"mask": rectangle_mask((64, 96), 7, 2, 11, 13)})
+    for frame_id, data in frames(2):
+        counters.newFrame(frame_id, data.astype(numpy.float32), 0.0)
+    sums, counts = counters.read()[2:]
+    numpy.testing.assert_array_equal(sums[:, 0], sums[:, 1])
+    numpy.testing.assert_array_equal(counts[:, 0], counts[:, 1])
+
+
+def test_ring():
+    counters = RoiCounters(nb_slots=4)
+    counters.setRois([(0, 0, 96, 64)])
+    for frame_id, data in frames(10):
+        counters.newFrame(frame_id, data, float(frame_id))
+    frame_ids, timestamps, sums, counts = counters.read()
+    # the last nb_slots frames, oldest first
+    numpy.testing.assert_array_equal(frame_ids, [6, 7, 8, 9])
+    numpy.testing.assert_array_equal(timestamps, [6, 7, 8, 9])
+    assert sums.shape == counts.shape == (4, 1)
+    assert list(counters.read(after=7)[0]) == [8, 9]
+    assert counters.nb_frames == 10
+
+    counters.prepareAcq()
+    assert counters.nb_frames == 0
+    assert len(counters.read()[0]) == 0
+
+
+def test_invalid_rois():
+    counters = RoiCounters()
+    with pytest.raises(ValueError):
+        counters.setRois([(0, 0, 0, 4)])
+    with pytest.raises(ValueError):
+        counters.setRois([(-1, 0, 2, 2)])
+    with pytest.raises(ValueError):
+        counters.setRois(masks={"empty": numpy.zeros((4, 4), dtype=bool)})
+    with pytest.raises(ValueError):
+        RoiCounters(nb_slots=0)
@@ -0,0 +1,77 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import uuid
+
+import numpy
+import pytest
+
+from Advacam.shm_ring import SharedFrameRing, SharedFrameRingReader
+
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameRing(f"advacam_test_{uuid.uuid4().hex[:8]}", 4, 64 * 64 * 4)
+    yield ring
+    ring.close()
+
+
+def test_write_read(ring):
+    with SharedFrameRingReader(ring.name) as reader:
+        assert reader.next(timeout=0) is None
+        data = numpy.arange(64 * 32, dtype=numpy.int32).reshape(64, 32)
+        ring.newFrame(7, data, 1.5)
+        frame = reader.next(timeout=0)
+        assert frame.frame_id == 7
+        assert frame.timestamp == 1.5
+        numpy.testing.assert_array_equal(frame.copy(), data)
+        assert frame.valid
+        assert reader.next(timeout=0) is None
+
+
+def test_overwritten_frames_counted(ring):
+    with SharedFrameRingReader(ring.name) as reader:
+        first = None
+        for i in range(10):
+            ring.newFrame(i, numpy.full((8, 8), i, dtype=numpy.uint16), 0.0)
+            if i == 0:
+                first = reader.latest()
+        # slot reused: the zero-copy view is no longer valid
+        assert not first.valid
+        frame_ids = [frame.frame_id for frame in reader.frames(timeout=0)]
+        assert frame_ids == [6, 7, 8, 9]
+        assert reader.lost == 6
+        assert reader.latest().frame_id == 9
+
+
+def test_skip(ring):
+    with SharedFrameRingReader(ring.name) as reader:
+        ring.newFrame(0, numpy.zeros(4, dtype=numpy.uint8), 0.0)
+        reader.skip()
+        assert reader.next(timeout=0) is None
+
+
+def test_frame_too_large(ring):
+    with pytest.raises(ValueError):
+        ring.newFrame(0, numpy.zeros((64, 64, 2), dtype=numpy.int32), 0.0)
@@ -0,0 +1,87 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import numpy
+import pytest
+
+from Advacam.spectrum import SpectrumAccumulator, rectangle_mask
+
+
+def test_spectrum():
+    rng = numpy.random.default_rng(3)
+    spectrum = SpectrumAccumulator(nb_bins=16, bin_width=2.0)
+    mask = rectangle_mask((20, 30), 5, 2, 10, 8)
+    spectrum.setRois({"roi": mask})
+    stack = rng.integers(0, 40, (5, 20, 30)).astype(numpy.int16)
+    for i, data in enumerate(stack):
+        spectrum.newFrame(i, data, 0.0)
+
+    def histogram(values):
+        values = values[values > 0]
+        return numpy.bincount(numpy.minimum(values // 2, 15), minlength=16)
+
+    numpy.testing.assert_array_equal(spectrum.spectrum(), histogram(stack.ravel()))
+    numpy.testing.assert_array_equal(
+        spectrum.roiSpectra()[0], histogram(stack[:, mask].ravel())
+    )
+    numpy.testing.assert_array_equal(spectrum.bins, numpy.arange(16) * 2.0)
+    assert spectrum.nb_frames == 5
+
+    spectrum.reset()
+    assert spectrum.spectrum().sum() == 0
+
+
+def test_energy_frames():
+    # float frames (energy map), overflows in the last bin
+    spectrum = SpectrumAccumulator(nb_bins=4, bin_width=0.5)
+    data = numpy.array([[0.0, 0.2, 0.7], [1.2, 1.9, 50.0]], dtype=numpy.float32)
+    spectrum.newFrame(0, data, 0.0)
+    numpy.testing.assert_array_equal(spectrum.spectrum(), [1, 1, 1, 2])
+
+
+def test_rectangle_mask():
+    mask = rectangle_mask((4, 6), 1, 2, 3, 1)
+    assert mask.sum() == 3
+    assert mask[2, 1:4].all()
+
+
+def test_invalid_binning():
+    with pytest.raises(ValueError):
+        SpectrumAccumulator(nb_bins=0)
+    with pytest.raises(ValueError):
+        SpectrumAccumulator(bin_width=0)
+
+
+def test_roi_shape_mismatch():
+    spectrum = SpectrumAccumulator(nb_bins=4)
+    with pytest.raises(ValueError):
+        spectrum.setRois({"roi": rectangle_mask((20, 30), 0, 0, 4, 4)}, (30, 20))
+    with pytest.raises(ValueError):
+        spectrum.setRois(
+            {"a": rectangle_mask((20, 30), 0, 0, 4, 4), "b": numpy.ones((4, 4))}
+        )
+    spectrum.setRois({"roi": rectangle_mask((20, 30), 0, 0, 4, 4)})
+    with pytest.raises(ValueError):
+        spectrum.newFrame(0, numpy.ones((10, 10), dtype=numpy.int16), 0.0)
+    assert spectrum.nb_frames == 0
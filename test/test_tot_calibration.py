@@ -0,0 +1,117 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2025
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+#
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+import numpy
+import pytest
+
+from Advacam.tiles import TileProcessor, chip_tiles
+from Advacam.tot_calibration import TotCalibration
+
+
+def surrogate(energy, a, b, c, t):
+    return a * energy + b - c / (energy - t)
+
+
+def calibration(shape=(8, 12), seed=4):
+    rng = numpy.random.default_rng(seed)
+    a = rng.uniform(1.5, 2.5, shape)
+    b = rng.uniform(20, 40, shape)
+    c = rng.uniform(100, 300, shape)
+    t = rng.uniform(1, 4, shape)
+    return a, b, c, t
+
+
+def test_inverse_of_surrogate():
+    a, b, c, t = calibration()
+    energy = numpy.random.default_rng(5).uniform(8, 60, a.shape)
+    tot = surrogate(energy, a, b, c, t)
+    calib = TotCalibration(a, b, c, t)
+    numpy.testing.assert_allclose(calib.toEnergy(tot), energy, rtol=1e-3)
+    assert calib.nb_conversions == 1
+
+    y, x = numpy.nonzero(numpy.ones(a.shape, dtype=bool))
+    hits = calib.hitsToEnergy(x, y, tot[y, x])
+    numpy.testing.assert_allclose(hits, energy[y, x], rtol=1e-3)
+
+
+def test_no_hit_and_uncalibrated():
+    a, b, c, t = calibration()
+    a[0, 0] = 0
+    tot = numpy.full(a.shape, 100.0)
+    tot[1, 1] = 0
+    energy = TotCalibration(a, b, c, t).toEnergy(tot)
+    assert energy.dtype == numpy.float32
+    assert energy[0, 0] == 0
+    assert energy[1, 1] == 0
+    assert (energy[2:] > 0).all()
+
+
+def test_from_npz(tmp_path):
+    a, b, c, t = calibration()
+    path = tmp_path / "calib.npz"
+    numpy.savez(path, a=a, b=b, c=c, t=t)
+    calib = TotCalibration.fromFile(str(path), shape=a.shape)
+    assert calib.shape == a.shape
+    with pytest.raises(ValueError):
+        TotCalibration.fromFile(str(path), shape=(4, 4))
+
+
+def test_invalid():
+    a, b, c, t = calibration()
+    with pytest.raises(ValueError):
+        TotCalibration(a, b, c, t[:4])
+    with pytest.raises(ValueError):
+        TotCalibration(a, b, c, t).toEnergy(numpy.zeros(5))
+
+
+def test_hits_non_square():
+    # 4 rows of 6 pixels: x up to 5, y up to 3
+    a, b, c, t = calibration(shape=(4, 6))
+    energy = numpy.random.default_rng(6).uniform(8, 60, a.shape)
+    tot = surrogate(energy, a, b, c, t)
+    calib = TotCalibration(a, b, c, t)
+    x = numpy.array([5, 0, 3])
+    y = numpy.array([3, 2, 0])
+    hits = calib.hitsToEnergy(x, y, tot[y, x])
+    numpy.testing.assert_allclose(hits, energy[y, x], rtol=1e-3)
+    numpy.testing.assert_allclose(hits, calib.toEnergy(tot)[y, x], rtol=1e-6)
+
+
+def test_tiles():
+    # 2x3 chips of 4x4 pixels, converted by 3 threads
+    a, b, c, t = calibration(shape=(8, 12))
+    energy = numpy.random.default_rng(7).uniform(8, 60, a.shape)
+    tot = surrogate(energy, a, b, c, t).astype(numpy.int16)
+    tot[0, :5] = 0
+    calib = TotCalibration(a, b, c, t)
+    processor = TileProcessor(3)
+    try:
+        tiles = chip_tiles(a.shape, 6, chip_size=4)
+        assert len(tiles) == 6
+        tiled = calib.toEnergy(tot.ravel(), processor=processor, tiles=tiles)
+    finally:
+        processor.close()
+    assert tiled.shape == (a.size,)
+    numpy.testing.assert_array_equal(tiled, calib.toEnergy(tot.ravel()))
+    assert (tiled[:5] == 0).all()